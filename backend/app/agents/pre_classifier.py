@@ -0,0 +1,274 @@
+"""Lexicon and naive Bayes fast path for obvious positives; modes: off, shadow, on."""
+
+import json
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# Only short reviews are eligible; long ones tend to mix praise with complaints
+MAX_FAST_PATH_WORDS = 40
+
+POSITIVE_WORDS = frozenset(
+    {
+        "amazing",
+        "awesome",
+        "beautiful",
+        "best",
+        "brilliant",
+        "delicious",
+        "delighted",
+        "excellent",
+        "exceptional",
+        "fantastic",
+        "fast",
+        "friendly",
+        "good",
+        "great",
+        "happy",
+        "helpful",
+        "impressed",
+        "incredible",
+        "love",
+        "loved",
+        "lovely",
+        "outstanding",
+        "perfect",
+        "pleasant",
+        "professional",
+        "quick",
+        "recommend",
+        "recommended",
+        "satisfied",
+        "smooth",
+        "superb",
+        "thank",
+        "thanks",
+        "wonderful",
+    }
+)
+
+NEGATIVE_WORDS = frozenset(
+    {
+        "awful",
+        "bad",
+        "broken",
+        "cold",
+        "complaint",
+        "damaged",
+        "delay",
+        "delayed",
+        "disappointed",
+        "disappointing",
+        "dirty",
+        "disgusting",
+        "expensive",
+        "horrible",
+        "issue",
+        "issues",
+        "late",
+        "mediocre",
+        "missing",
+        "overpriced",
+        "poor",
+        "problem",
+        "problems",
+        "refund",
+        "rude",
+        "slow",
+        "terrible",
+        "unacceptable",
+        "unhappy",
+        "worst",
+        "wrong",
+    }
+)
+
+# Any of these can flip or qualify the sentiment of nearby praise
+NEGATIONS = frozenset(
+    {"no", "not", "nor", "never", "nothing", "hardly", "barely", "without"}
+)
+CONTRASTS = frozenset(
+    {"but", "however", "although", "though", "except", "unfortunately", "yet"}
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a review"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def lexicon_positive_confidence(tokens: List[str]) -> float:
+    """Confidence that a short review is unambiguously positive, per the lexicon"""
+    if any(
+        token in NEGATIONS or token in CONTRASTS or token.endswith("n't")
+        for token in tokens
+    ):
+        return 0.0
+    if any(token in NEGATIVE_WORDS for token in tokens):
+        return 0.0
+    positive_hits = sum(1 for token in tokens if token in POSITIVE_WORDS)
+    if not positive_hits:
+        return 0.0
+    return 1.0 - 0.5 ** (positive_hits + 1)
+
+
+class NaiveBayesSentimentModel:
+    """Multinomial naive Bayes for "positive" vs "other", trained on stored analyses"""
+
+    def __init__(
+        self,
+        class_log_prior: Dict[str, float],
+        token_log_prob: Dict[str, Dict[str, float]],
+        unknown_log_prob: Dict[str, float],
+    ):
+        self.class_log_prior = class_log_prior
+        self.token_log_prob = token_log_prob
+        self.unknown_log_prob = unknown_log_prob
+
+    @classmethod
+    def fit(
+        cls,
+        texts: Iterable[str],
+        labels: Iterable[bool],
+        alpha: float = 1.0,
+        min_count: int = 2,
+    ) -> "NaiveBayesSentimentModel":
+        """Fit on review texts labelled True when the stored analysis was positive"""
+        counts = {"positive": Counter(), "other": Counter()}
+        documents = Counter()
+        for text, is_positive in zip(texts, labels):
+            label = "positive" if is_positive else "other"
+            counts[label].update(tokenize(text))
+            documents[label] += 1
+
+        total = counts["positive"] + counts["other"]
+        vocabulary = {token for token, count in total.items() if count >= min_count}
+        total_documents = sum(documents.values())
+
+        class_log_prior = {}
+        token_log_prob = {}
+        unknown_log_prob = {}
+        for label in ("positive", "other"):
+            class_log_prior[label] = math.log(
+                (documents[label] + 1) / (total_documents + 2)
+            )
+            label_total = sum(counts[label][token] for token in vocabulary)
+            denominator = label_total + alpha * (len(vocabulary) + 1)
+            token_log_prob[label] = {
+                token: math.log((counts[label][token] + alpha) / denominator)
+                for token in vocabulary
+            }
+            unknown_log_prob[label] = math.log(alpha / denominator)
+
+        return cls(class_log_prior, token_log_prob, unknown_log_prob)
+
+    def predict_proba(self, tokens: List[str]) -> float:
+        """Probability that a tokenized review is positive"""
+        scores = {}
+        for label in ("positive", "other"):
+            log_probs = self.token_log_prob[label]
+            unknown = self.unknown_log_prob[label]
+            scores[label] = self.class_log_prior[label] + sum(
+                log_probs.get(token, unknown) for token in tokens
+            )
+        return 1.0 / (1.0 + math.exp(min(scores["other"] - scores["positive"], 700)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "type": "naive_bayes",
+            "class_log_prior": self.class_log_prior,
+            "token_log_prob": self.token_log_prob,
+            "unknown_log_prob": self.unknown_log_prob,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NaiveBayesSentimentModel":
+        return cls(
+            data["class_log_prior"], data["token_log_prob"], data["unknown_log_prob"]
+        )
+
+
+_model_instance: Optional[NaiveBayesSentimentModel] = None
+_model_loaded = False
+
+shadow_stats = {
+    "predictions": 0,
+    "agreements": 0,
+}
+
+
+def get_model() -> Optional[NaiveBayesSentimentModel]:
+    """Load the offline-trained model configured by PRE_CLASSIFIER_MODEL_PATH, if any"""
+    global _model_instance, _model_loaded
+    if not _model_loaded:
+        _model_loaded = True
+        if settings.pre_classifier_model_path:
+            try:
+                with open(settings.pre_classifier_model_path, encoding="utf-8") as f:
+                    _model_instance = NaiveBayesSentimentModel.from_dict(json.load(f))
+                logger.info(
+                    "🧮 Pre-classifier model loaded from "
+                    f"{settings.pre_classifier_model_path}"
+                )
+            except Exception as e:
+                logger.error(
+                    f"❌ Failed to load pre-classifier model, using lexicon: {str(e)}"
+                )
+    return _model_instance
+
+
+def classify_review(review_text: str) -> Tuple[str, float]:
+    """Return ("positive", confidence) for reviews eligible for the fast path, else
+    ("unknown", 0.0)"""
+    tokens = tokenize(review_text)
+    if not tokens or len(tokens) > MAX_FAST_PATH_WORDS:
+        return "unknown", 0.0
+
+    model = get_model()
+    confidence = (
+        model.predict_proba(tokens) if model else lexicon_positive_confidence(tokens)
+    )
+    if confidence <= 0.0:
+        return "unknown", 0.0
+    return "positive", round(confidence, 4)
+
+
+def is_confident(confidence: float) -> bool:
+    return confidence >= settings.pre_classifier_threshold
+
+
+def record_shadow_result(confidence: float, llm_sentiment: str) -> None:
+    """Compare a confident shadow prediction with the LLM's sentiment and log the
+    running agreement"""
+    shadow_stats["predictions"] += 1
+    agreed = llm_sentiment == "positive"
+    if agreed:
+        shadow_stats["agreements"] += 1
+    rate = shadow_stats["agreements"] / shadow_stats["predictions"]
+    logger.info(
+        f"🕶️ Pre-classifier shadow: predicted positive ({confidence:.2f}), "
+        f"LLM said {llm_sentiment} - {'agree' if agreed else 'disagree'} "
+        f"(agreement {rate:.1%} over {shadow_stats['predictions']})"
+    )
+
+
+def get_pre_classifier_stats() -> Dict[str, Any]:
+    """Mode, threshold and shadow-mode agreement counters"""
+    predictions = shadow_stats["predictions"]
+    return {
+        "mode": settings.pre_classifier_mode,
+        "threshold": settings.pre_classifier_threshold,
+        "model": "naive_bayes" if get_model() else "lexicon",
+        **shadow_stats,
+        "agreement_rate": shadow_stats["agreements"] / predictions
+        if predictions
+        else None,
+    }
@@ -0,0 +1,199 @@
+"""Prompt templates for the review analysis agent.
+
+Bump the matching entry in review_agent.PROMPT_VERSIONS when editing a template.
+"""
+
+SENTIMENT_PROMPT_TEMPLATE = """You are an expert at analyzing customer review sentiment across all industries and business types.
+        
+            Analyze the sentiment of the review and provide:
+            1. Overall sentiment: positive, negative, or neutral
+            2. Confidence score (0.0 to 1.0)
+            3. Brief reasoning
+
+            {format_instructions}
+            
+            Review to analyze:
+            Customer: {customer_name}
+            Rating: {rating}/5
+            Review: {review_text}
+            """
+
+
+CATEGORIZATION_PROMPT_TEMPLATE = """You are an expert at categorizing customer feedback across all industries and business types.
+        
+        Analyze the review and identify which categories apply. The categories are universal and can apply to any business:
+        - quality: Issues with product/service quality, defects, or standards
+        - service: Customer service, staff behavior, responsiveness
+        - pricing: Cost concerns, value for money, billing issues
+        - delivery: Shipping, logistics, timing, fulfillment
+        - usability: Ease of use, user interface, accessibility
+        - communication: Information clarity, updates, transparency
+        - performance: Speed, reliability, functionality, uptime
+        - support: Help resources, documentation, technical assistance
+        - experience: Overall customer journey, satisfaction, emotions
+        - other: Issues that don't fit the above categories
+
+        Available categories: {categories}
+
+        Also extract the key specific issues mentioned.
+
+        {format_instructions}
+        
+        Review to categorize:
+        {review_text}
+        Sentiment: {sentiment}
+        """
+
+
+URGENCY_PROMPT_TEMPLATE = """You are an expert at assessing the urgency of customer feedback across all industries.
+        
+        Based on the review sentiment, issues, and context, determine the urgency level:
+        - critical: Safety concerns, security issues, extremely angry customers, potential legal/PR issues, service outages
+        - high: Very unsatisfied customers, multiple serious issues, loss of functionality, demand immediate attention
+        - medium: Moderately unsatisfied, specific fixable issues, feature requests, minor bugs
+        - low: Minor issues, positive feedback with suggestions, general improvements
+
+        Choose from: {urgency_levels}
+
+        {format_instructions}
+        
+        Review Analysis:
+        Sentiment: {sentiment} (confidence: {sentiment_score})
+        Categories: {categories}
+        Key Issues: {key_issues}
+        Original Review: {review_text}
+        """
+
+
+FUSED_ANALYSIS_PROMPT_TEMPLATE = """You are an expert at analyzing customer feedback across all industries and business types.
+        
+        Analyze the review and provide:
+        1. Overall sentiment: positive, negative, or neutral
+        2. Confidence score for the sentiment (0.0 to 1.0)
+        3. The categories that apply, chosen from: {categories}
+           - quality: Issues with product/service quality, defects, or standards
+           - service: Customer service, staff behavior, responsiveness
+           - pricing: Cost concerns, value for money, billing issues
+           - delivery: Shipping, logistics, timing, fulfillment
+           - usability: Ease of use, user interface, accessibility
+           - communication: Information clarity, updates, transparency
+           - performance: Speed, reliability, functionality, uptime
+           - support: Help resources, documentation, technical assistance
+           - experience: Overall customer journey, satisfaction, emotions
+           - other: Issues that don't fit the above categories
+        4. The key specific issues mentioned
+        5. The urgency level, chosen from: {urgency_levels}
+           - critical: Safety concerns, security issues, extremely angry customers, potential legal/PR issues, service outages
+           - high: Very unsatisfied customers, multiple serious issues, loss of functionality, demand immediate attention
+           - medium: Moderately unsatisfied, specific fixable issues, feature requests, minor bugs
+           - low: Minor issues, positive feedback with suggestions, general improvements
+        6. Brief reasoning
+
+        {format_instructions}
+        
+        Review to analyze:
+        Customer: {customer_name}
+        Rating: {rating}/5
+        Review: {review_text}
+        """
+
+
+BATCH_ANALYSIS_PROMPT_TEMPLATE = """You are an expert at analyzing customer feedback across all industries and business types.
+        
+        You will receive several reviews, each introduced by its Row ID. For every review provide:
+        1. Overall sentiment: positive, negative, or neutral
+        2. Confidence score for the sentiment (0.0 to 1.0)
+        3. The categories that apply, chosen from: {categories}
+           - quality: Issues with product/service quality, defects, or standards
+           - service: Customer service, staff behavior, responsiveness
+           - pricing: Cost concerns, value for money, billing issues
+           - delivery: Shipping, logistics, timing, fulfillment
+           - usability: Ease of use, user interface, accessibility
+           - communication: Information clarity, updates, transparency
+           - performance: Speed, reliability, functionality, uptime
+           - support: Help resources, documentation, technical assistance
+           - experience: Overall customer journey, satisfaction, emotions
+           - other: Issues that don't fit the above categories
+        4. The key specific issues mentioned
+        5. The urgency level, chosen from: {urgency_levels}
+           - critical: Safety concerns, security issues, extremely angry customers, potential legal/PR issues, service outages
+           - high: Very unsatisfied customers, multiple serious issues, loss of functionality, demand immediate attention
+           - medium: Moderately unsatisfied, specific fixable issues, feature requests, minor bugs
+           - low: Minor issues, positive feedback with suggestions, general improvements
+        6. Brief reasoning
+
+        Return exactly one entry in "analyses" per review, with its row_id copied verbatim.
+        Analyze every review independently of the others.
+
+        {format_instructions}
+        
+        Reviews to analyze:
+        {reviews}
+        """
+
+
+EMAIL_PROMPT_TEMPLATE = """You are a world-class customer support agent responsible for writing personalized, empathetic, and professional emails to customers based on their feedback.
+
+            **Context:**
+            - Customer Name: {customer_name}
+            - Service Name: {service_name}
+            - Service Email: {service_email}
+            - Review Sentiment: {sentiment}
+            - Urgency: {urgency_level}
+            - Key Issues Identified: {key_issues}
+            - Original Review: {review_text}
+
+            **Your Task:**
+            Generate a complete email (subject and body) to send to the customer. The tone and content should be guided by the "Response Type".
+
+            **Response Type:** {response_type}
+
+            **Guidelines for Different Response Types:**
+
+            *   **critical_response**:
+                *   Acknowledge the severity of the issue immediately.
+                *   Express deep concern.
+                *   Offer immediate actions like a call with a manager, a full refund, and a complimentary return visit.
+                *   Keep it concise and action-oriented.
+                *   Example tone: "We are deeply concerned about your recent experience..."
+
+            *   **quality_concern**:
+                *   Apologize for not meeting quality standards.
+                *   Mention that feedback has been shared with the quality team.
+                *   Outline steps being taken (e.g., process review).
+                *   Offer a complimentary return experience to demonstrate improvement.
+                *   Example tone: "We sincerely apologize that our quality did not meet your expectations."
+
+            *   **service_concern**:
+                *   Apologize for the service lapse.
+                *   Mention that feedback has been discussed with the service team and extra training is being implemented.
+                *   Offer a complimentary service on the next visit to make it right.
+                *   Example tone: "We are sorry to hear that our service did not meet your expectations."
+            
+            *   **general_concern**:
+                *   Thank the customer for their feedback.
+                *   Acknowledge their concerns and state that they have been shared with management.
+                *   Reassure them that you are taking steps to improve.
+                *   Invite them back to experience the improvements.
+                *   Example tone: "Thank you for sharing your feedback about your experience..."
+            
+            *   **delivery_concern**:
+                *   Apologize for delivery issues.
+                *   Mention that you've reviewed the issue with logistics.
+                *   Offer a delivery credit or priority handling for the next order.
+                *   Example tone: "We sincerely apologize for the delivery issues you experienced."
+
+            *   **support_concern**:
+                *   Apologize for the support experience.
+                *   Mention that support training and processes are being improved.
+                *   Encourage them to contact support again for proper assistance.
+                *   Example tone: "Thank you for your feedback regarding your support experience."
+
+            **Final Output Instructions:**
+            - Write the email body in plain text, not markdown.
+            - Ensure the tone is appropriate for the situation.
+            - Personalize the email using the customer's name and the specific issues they raised.
+            - Sign off with the "{service_name}".
+
+            {format_instructions}
+            """
@@ -1,15 +1,52 @@
+import asyncio
+import json
 import logging
-from typing import Dict, List, Any, TypedDict, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
+import random
+import time
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypedDict,
+)
+
 import google.generativeai as genai
-from pydantic import BaseModel
-from app.models.review import UrgencyLevel, ReviewCategory
-from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from langgraph.graph import StateGraph, END
-from app.core.config import settings
-from app.services.email_service import send_email
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langgraph.graph import END, StateGraph
+from pydantic import BaseModel
 
+from app.agents.pre_classifier import (
+    classify_review,
+    is_confident,
+    record_shadow_result,
+)
+from app.agents.prompts import (
+    BATCH_ANALYSIS_PROMPT_TEMPLATE,
+    CATEGORIZATION_PROMPT_TEMPLATE,
+    EMAIL_PROMPT_TEMPLATE,
+    FUSED_ANALYSIS_PROMPT_TEMPLATE,
+    SENTIMENT_PROMPT_TEMPLATE,
+    URGENCY_PROMPT_TEMPLATE,
+)
+from app.core.config import settings
+from app.models.review import Review, ReviewCategory, SentimentType, UrgencyLevel
+from app.services.email_outbox_service import enqueue_email, make_idempotency_key
+from app.services.llm_cache import get_llm_cache, make_cache_key
+from app.services.llm_throttle import get_llm_throttle, is_retryable_error
+from app.services.metrics import (
+    observe_llm_call,
+    observe_node,
+    record_node_error,
+    record_node_fallbacks,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -18,18 +55,58 @@ class SentimentAnalysis(BaseModel):
     sentiment: str
     confidence: float
 
+
 class IssueCategorizationAnalysis(BaseModel):
     categories: List[str]
     key_issues: List[str]
 
+
 class UrgencyAnalysis(BaseModel):
     urgency_level: str
     reasoning: str
 
+
+class FusedReviewAnalysis(BaseModel):
+    sentiment: str
+    confidence: float
+    categories: List[str]
+    key_issues: List[str]
+    urgency_level: str
+    reasoning: str
+
+
+class BatchItemAnalysis(FusedReviewAnalysis):
+    row_id: str
+
+
+class BatchAnalysis(BaseModel):
+    analyses: List[BatchItemAnalysis]
+
+
 class GeneratedEmail(BaseModel):
     subject: str
     body: str
 
+
+def merge_errors(left: str, right: str) -> str:
+    """State reducer for 'error': every distinct message from concurrent branches"""
+    if not right or right == left:
+        return left
+    if not left or right.startswith(left):
+        return right
+    return f"{left}; {right}"
+
+
+def merge_fallbacks(left: List[str], right: List[str]) -> List[str]:
+    """State reducer for 'fallbacks': union of fallen-back fields, first-seen order"""
+    return left + [field for field in right if field not in left]
+
+
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """State reducer for per-node metrics: union of keys, newer values win"""
+    return {**left, **right}
+
+
 class ReviewAnalysisState(TypedDict):
     review_text: str
     customer_name: str
@@ -41,62 +118,422 @@ class ReviewAnalysisState(TypedDict):
     categories: List[str]
     key_issues: List[str]
     should_send_email: bool
+    email_queued: bool
+    # Alias of email_queued, the key clients read before emails went through the outbox
     email_sent: bool
     type_of_email_template: str
     analysis_complete: bool
-    error: str
+    error: Annotated[str, merge_errors]
+    fallbacks: Annotated[List[str], merge_fallbacks]
+    node_retries: Annotated[Dict[str, int], merge_dicts]
+    node_latency_ms: Annotated[Dict[str, float], merge_dicts]
+    deadline_at: float
+    pre_classified: bool
+    pre_classifier_confidence: float
+
+
+LLM_MODEL = "gemini-2.0-flash-exp"
+LLM_TEMPERATURE = 0.1
+
+# Seconds the startup check waits for Gemini to look up the model
+LLM_CHECK_TIMEOUT_SECONDS = 10
+
+# Bump a node's version whenever its prompt template changes so cached results are not
+# reused
+PROMPT_VERSIONS = {
+    "analyze_sentiment": "1",
+    "categorize_issues": "1",
+    "determine_urgency": "1",
+    "analyze_review_fused": "1",
+    "analyze_reviews_batch": "1",
+    "generate_email_content": "1",
+}
+
+CATEGORY_OPTIONS = ", ".join(cat.value for cat in ReviewCategory)
+URGENCY_OPTIONS = ", ".join(level.value for level in UrgencyLevel)
+VALID_SENTIMENTS = frozenset(s.value for s in SentimentType)
+VALID_CATEGORIES = frozenset(cat.value for cat in ReviewCategory)
+VALID_URGENCY_LEVELS = frozenset(level.value for level in UrgencyLevel)
+
+# Node name -> (prompt template, input variables, output schema)
+CHAIN_SPECS: Dict[str, Tuple[str, List[str], Type[BaseModel]]] = {
+    "analyze_sentiment": (
+        SENTIMENT_PROMPT_TEMPLATE,
+        ["customer_name", "rating", "review_text"],
+        SentimentAnalysis,
+    ),
+    "categorize_issues": (
+        CATEGORIZATION_PROMPT_TEMPLATE,
+        ["categories", "review_text", "sentiment"],
+        IssueCategorizationAnalysis,
+    ),
+    "determine_urgency": (
+        URGENCY_PROMPT_TEMPLATE,
+        [
+            "urgency_levels",
+            "sentiment",
+            "sentiment_score",
+            "categories",
+            "key_issues",
+            "review_text",
+        ],
+        UrgencyAnalysis,
+    ),
+    "analyze_review_fused": (
+        FUSED_ANALYSIS_PROMPT_TEMPLATE,
+        ["categories", "urgency_levels", "customer_name", "rating", "review_text"],
+        FusedReviewAnalysis,
+    ),
+    "analyze_reviews_batch": (
+        BATCH_ANALYSIS_PROMPT_TEMPLATE,
+        ["categories", "urgency_levels", "reviews"],
+        BatchAnalysis,
+    ),
+    "generate_email_content": (
+        EMAIL_PROMPT_TEMPLATE,
+        [
+            "customer_name",
+            "service_name",
+            "service_email",
+            "sentiment",
+            "urgency_level",
+            "key_issues",
+            "review_text",
+            "response_type",
+        ],
+        GeneratedEmail,
+    ),
+}
+
+RAW_OUTPUT_NODES = frozenset({"analyze_review_fused", "analyze_reviews_batch"})
+
+# Analysis fields produced by the analysis nodes, before the email decision
+ANALYSIS_FIELDS = [
+    "sentiment",
+    "sentiment_score",
+    "categories",
+    "key_issues",
+    "urgency_level",
+    "error",
+    "fallbacks",
+]
+
+# Pre-classifier outcome, carried along with precomputed analyses when present
+PRE_CLASSIFIER_FIELDS = ["pre_classified", "pre_classifier_confidence"]
 
+REVIEW_DEADLINE_GRACE_SECONDS = 10
 
 _llm_instance: Optional[Any] = None
+_chain_registry: Optional[Dict[str, Any]] = None
+
 
 def get_llm() -> Any:
     """Get or create LLM instance"""
     global _llm_instance
     if _llm_instance is None:
         genai.configure(api_key=settings.google_api_key)
-        
-        generative_model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
+
+        generative_model = genai.GenerativeModel(LLM_MODEL)
+
         _llm_instance = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",
+            model=LLM_MODEL,
             client=genai,
             google_api_key=settings.google_api_key,
-            temperature=0.1,
+            temperature=LLM_TEMPERATURE,
         )
         _llm_instance._generative_model = generative_model
     return _llm_instance
 
 
+def build_chain(node: str, llm: Any) -> Any:
+    """Build the prompt | llm | parser runnable for a node"""
+    template, input_variables, output_model = CHAIN_SPECS[node]
+    parser = PydanticOutputParser(pydantic_object=output_model)
+
+    prompt = PromptTemplate(
+        template=template,
+        input_variables=input_variables,
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+
+    # Fused and batched analyses validate their raw output field by field instead of
+    # failing as a whole
+    if node in RAW_OUTPUT_NODES:
+        return prompt | llm | StrOutputParser()
+    return prompt | llm | parser
+
+
+def get_chain(node: str) -> Any:
+    """Get the precompiled chain for a node, building the registry once on first use"""
+    global _chain_registry
+    if _chain_registry is None:
+        llm = get_llm()
+        _chain_registry = {name: build_chain(name, llm) for name in CHAIN_SPECS}
+    return _chain_registry[node]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for rate limiting and batch packing (about four characters
+    per token)"""
+    return len(text) // 4 + 1
+
+
+def estimate_prompt_tokens(node: str, inputs: Dict[str, Any]) -> int:
+    """Estimate the prompt tokens of a node call for the tokens/min limiter"""
+    return estimate_tokens(CHAIN_SPECS[node][0]) + sum(
+        estimate_tokens(str(value)) for value in inputs.values()
+    )
+
+
+def retry_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff delay for a retry attempt (0-based)"""
+    ceiling = min(
+        settings.llm_retry_max_delay_seconds,
+        settings.llm_retry_base_delay_seconds * (2**attempt),
+    )
+    return random.uniform(0, ceiling)
+
+
+def record_llm_call(
+    state: Optional[ReviewAnalysisState], node: str, retries: int, started: float
+) -> None:
+    """Record a node's LLM retry count and latency in the review state"""
+    if state is None:
+        return
+    state["node_retries"] = {**state.get("node_retries", {}), node: retries}
+    state["node_latency_ms"] = {
+        **state.get("node_latency_ms", {}),
+        node: round((time.monotonic() - started) * 1000, 1),
+    }
+
+
+async def invoke_llm(
+    node: str,
+    chain: Any,
+    inputs: Dict[str, Any],
+    state: Optional[ReviewAnalysisState] = None,
+) -> Any:
+    """Invoke a node's chain through the shared rate limiter, with a per-call timeout
+    and jittered exponential backoff retries for retryable errors, bounded by the review
+    deadline
+    """
+    throttle = get_llm_throttle()
+    estimated_tokens = estimate_prompt_tokens(node, inputs)
+    deadline_at = state.get("deadline_at") if state else None
+    started = time.monotonic()
+    attempt = 0
+
+    while True:
+        timeout = settings.llm_node_timeout_seconds
+        if deadline_at:
+            timeout = min(timeout, deadline_at - time.monotonic())
+            if timeout <= 0:
+                record_llm_call(state, node, attempt, started)
+                raise asyncio.TimeoutError(
+                    f"Review deadline exceeded before {node} completed"
+                )
+
+        try:
+            async with throttle.slot(estimated_tokens):
+                call_started = time.perf_counter()
+                outcome = "error"
+                try:
+                    result = await asyncio.wait_for(
+                        chain.ainvoke(inputs), timeout=timeout
+                    )
+                    outcome = "ok"
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                    raise
+                finally:
+                    observe_llm_call(node, outcome, time.perf_counter() - call_started)
+            record_llm_call(state, node, attempt, started)
+            return result
+
+        except Exception as e:
+            delay = retry_delay(attempt)
+            out_of_time = (
+                deadline_at is not None and time.monotonic() + delay >= deadline_at
+            )
+            if (
+                attempt >= settings.llm_max_retries
+                or not is_retryable_error(e)
+                or out_of_time
+            ):
+                record_llm_call(state, node, attempt, started)
+                raise
+            attempt += 1
+            logger.warning(
+                f"🔁 Retrying {node} in {delay:.2f}s "
+                f"(attempt {attempt}/{settings.llm_max_retries}): "
+                f"{type(e).__name__} {str(e)}"
+            )
+            await asyncio.sleep(delay)
+
+
+async def invoke_cached_chain(
+    node: str,
+    chain: Any,
+    inputs: Dict[str, Any],
+    output_model: Optional[Type[BaseModel]] = None,
+    state: Optional[ReviewAnalysisState] = None,
+    validate: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """Invoke a node's chain, serving repeated inputs from the LLM result cache.
+
+    Results are cached only once they validate against output_model and pass
+    validate, so an unparseable response is retried on the next call instead of
+    being served from the cache.
+    """
+    cache = get_llm_cache()
+    key = None
+    if cache is not None:
+        key = make_cache_key(
+            node, PROMPT_VERSIONS[node], LLM_MODEL, LLM_TEMPERATURE, inputs
+        )
+        cached = await cache.get(key)
+        if cached is not None:
+            logger.debug(f"💾 LLM cache hit for {node}")
+            return output_model(**cached) if output_model else cached
+
+    result = await invoke_llm(node, chain, inputs, state)
+    if output_model is not None and not isinstance(result, output_model):
+        # Structured output comes back as a dict, or None when the answer did not parse
+        result = output_model.model_validate(result)
+
+    if cache is not None:
+        if validate is None or validate(result):
+            await cache.set(
+                key, result.model_dump() if isinstance(result, BaseModel) else result
+            )
+        else:
+            logger.debug(f"💾 Not caching unparseable {node} response")
+    return result
+
+
+def set_analysis_entry(workflow: StateGraph, analysis_entry: str) -> None:
+    """Enter the graph at analysis_entry, behind the pre-classifier when enabled"""
+    if settings.pre_classifier_mode == "off":
+        workflow.set_entry_point(analysis_entry)
+        return
+
+    workflow.add_node("pre_classify", pre_classify)
+    workflow.set_entry_point("pre_classify")
+    workflow.add_conditional_edges(
+        "pre_classify", should_run_analysis, {"analyze": analysis_entry, END: END}
+    )
+
+
 def create_review_analysis_graph() -> StateGraph:
     """Create the LangGraph workflow for review analysis"""
     workflow = StateGraph(ReviewAnalysisState)
-    
+
     # Add nodes
     workflow.add_node("analyze_sentiment", analyze_sentiment)
     workflow.add_node("categorize_issues", categorize_issues)
     workflow.add_node("determine_urgency", determine_urgency)
     workflow.add_node("decide_email_action", decide_email_action)
     workflow.add_node("generate_email_content", generate_email_content)
-    
+
     # Define the flow
-    workflow.set_entry_point("analyze_sentiment")
+    set_analysis_entry(workflow, "analyze_sentiment")
     workflow.add_edge("analyze_sentiment", "categorize_issues")
     workflow.add_edge("categorize_issues", "determine_urgency")
     workflow.add_edge("determine_urgency", "decide_email_action")
-    
+
     workflow.add_conditional_edges(
         "decide_email_action",
         should_generate_email,
-        {
-            "generate_email_content": "generate_email_content",
-            END: END
-        }
+        {"generate_email_content": "generate_email_content", END: END},
+    )
+    workflow.add_edge("generate_email_content", END)
+
+    return workflow.compile()
+
+
+def create_fused_review_analysis_graph() -> StateGraph:
+    """Create the LangGraph workflow that analyzes a review with a single LLM call"""
+    workflow = StateGraph(ReviewAnalysisState)
+
+    # Add nodes
+    workflow.add_node("analyze_review_fused", analyze_review_fused)
+    workflow.add_node("decide_email_action", decide_email_action)
+    workflow.add_node("generate_email_content", generate_email_content)
+
+    # Define the flow
+    set_analysis_entry(workflow, "analyze_review_fused")
+    workflow.add_edge("analyze_review_fused", "decide_email_action")
+
+    workflow.add_conditional_edges(
+        "decide_email_action",
+        should_generate_email,
+        {"generate_email_content": "generate_email_content", END: END},
+    )
+    workflow.add_edge("generate_email_content", END)
+
+    return workflow.compile()
+
+
+def create_prefilled_review_analysis_graph() -> StateGraph:
+    """Create the LangGraph workflow for reviews whose analysis was computed upstream"""
+    workflow = StateGraph(ReviewAnalysisState)
+
+    # Add nodes
+    workflow.add_node("decide_email_action", decide_email_action)
+    workflow.add_node("generate_email_content", generate_email_content)
+
+    # Define the flow
+    workflow.set_entry_point("decide_email_action")
+
+    workflow.add_conditional_edges(
+        "decide_email_action",
+        should_generate_email,
+        {"generate_email_content": "generate_email_content", END: END},
+    )
+    workflow.add_edge("generate_email_content", END)
+
+    return workflow.compile()
+
+
+def create_parallel_review_analysis_graph() -> StateGraph:
+    """Create the LangGraph workflow running sentiment and categorization in parallel"""
+    workflow = StateGraph(ReviewAnalysisState)
+
+    # Add nodes
+    workflow.add_node("fan_out_analysis", fan_out_analysis)
+    workflow.add_node("analyze_sentiment", analyze_sentiment_branch)
+    workflow.add_node("categorize_issues", categorize_issues_branch)
+    workflow.add_node("join_analysis", join_analysis)
+    workflow.add_node("determine_urgency", determine_urgency)
+    workflow.add_node("decide_email_action", decide_email_action)
+    workflow.add_node("generate_email_content", generate_email_content)
+
+    # Define the flow: fan out to both branches, join before urgency
+    set_analysis_entry(workflow, "fan_out_analysis")
+    workflow.add_edge("fan_out_analysis", "analyze_sentiment")
+    workflow.add_edge("fan_out_analysis", "categorize_issues")
+    workflow.add_edge(["analyze_sentiment", "categorize_issues"], "join_analysis")
+    workflow.add_edge("join_analysis", "determine_urgency")
+    workflow.add_edge("determine_urgency", "decide_email_action")
+
+    workflow.add_conditional_edges(
+        "decide_email_action",
+        should_generate_email,
+        {"generate_email_content": "generate_email_content", END: END},
     )
     workflow.add_edge("generate_email_content", END)
-    
+
     return workflow.compile()
 
 
+def should_run_analysis(state: ReviewAnalysisState) -> str:
+    """Skip the LLM analysis when the pre-classifier already settled the review."""
+    if state.get("pre_classified"):
+        return END
+    else:
+        return "analyze"
+
+
 def should_generate_email(state: ReviewAnalysisState) -> str:
     """Determine whether to generate an email or end the process."""
     if state.get("should_send_email"):
@@ -105,187 +542,555 @@ def should_generate_email(state: ReviewAnalysisState) -> str:
         return END
 
 
+def pre_classified_fields(confidence: float) -> Dict[str, Any]:
+    """Analysis fields for a review the pre-classifier found confidently positive"""
+    return {
+        "sentiment": "positive",
+        "sentiment_score": confidence,
+        "categories": [],
+        "key_issues": [],
+        "urgency_level": "low",
+        "error": "",
+        "fallbacks": [],
+        "pre_classified": True,
+        "pre_classifier_confidence": confidence,
+    }
+
+
+@observe_node("pre_classify")
+async def pre_classify(state: ReviewAnalysisState) -> ReviewAnalysisState:
+    """Score the review with the local pre-classifier; in "on" mode a confident positive
+    skips the LLM nodes"""
+    label, confidence = classify_review(state["review_text"])
+    state["pre_classifier_confidence"] = confidence
+
+    if (
+        settings.pre_classifier_mode == "on"
+        and label == "positive"
+        and is_confident(confidence)
+    ):
+        state.update(pre_classified_fields(confidence))
+        state["should_send_email"] = False
+        state["type_of_email_template"] = None
+        state["analysis_complete"] = True
+        logger.info(
+            f"⚡ Fast path for {state['customer_name']}: positive ({confidence:.2f}), "
+            "LLM analysis skipped"
+        )
+
+    return state
+
+
+@observe_node("analyze_sentiment")
 async def analyze_sentiment(state: ReviewAnalysisState) -> ReviewAnalysisState:
     """Analyze the sentiment of the review"""
-    logger.debug(f"🎭 Starting sentiment analysis for customer: {state['customer_name']}")
-    
+    logger.debug(
+        f"🎭 Starting sentiment analysis for customer: {state['customer_name']}"
+    )
+
     try:
-        parser = PydanticOutputParser(pydantic_object=SentimentAnalysis)
-        
-        prompt = PromptTemplate(
-            template="""You are an expert at analyzing customer review sentiment across all industries and business types.
-        
-            Analyze the sentiment of the review and provide:
-            1. Overall sentiment: positive, negative, or neutral
-            2. Confidence score (0.0 to 1.0)
-            3. Brief reasoning
-
-            {format_instructions}
-            
-            Review to analyze:
-            Customer: {customer_name}
-            Rating: {rating}/5
-            Review: {review_text}
-            """,
-            input_variables=["customer_name", "rating", "review_text"],
-            partial_variables={"format_instructions": parser.get_format_instructions()}
+        chain = get_chain("analyze_sentiment")
+
+        analysis = await invoke_cached_chain(
+            "analyze_sentiment",
+            chain,
+            {
+                "customer_name": state["customer_name"],
+                "rating": state.get("rating", "Not provided"),
+                "review_text": state["review_text"],
+            },
+            SentimentAnalysis,
+            state,
         )
-        
-        llm = get_llm()
-        
-        chain = prompt | llm | parser
-        
-        analysis = await chain.ainvoke({
-            "customer_name": state['customer_name'],
-            "rating": state.get('rating', 'Not provided'),
-            "review_text": state['review_text']
-        })
-        
+
         state["sentiment"] = analysis.sentiment
         state["sentiment_score"] = analysis.confidence
-        
-        logger.info(f"🎭 Sentiment for {state['customer_name']}: {state['sentiment']} ({state['sentiment_score']:.2f})")
-        
+
+        logger.info(
+            f"🎭 Sentiment for {state['customer_name']}: {state['sentiment']} "
+            f"({state['sentiment_score']:.2f})"
+        )
+
     except Exception as e:
         logger.error(f"❌ Error analyzing sentiment: {e}")
+        record_node_error("analyze_sentiment", ["sentiment", "confidence"])
         state["error"] = f"Sentiment analysis error: {str(e)}"
+        state["fallbacks"] = merge_fallbacks(
+            state.get("fallbacks", []), ["sentiment", "confidence"]
+        )
         state["sentiment"] = "neutral"
         state["sentiment_score"] = 0.0
-    
+
     return state
 
 
+@observe_node("categorize_issues")
 async def categorize_issues(state: ReviewAnalysisState) -> ReviewAnalysisState:
     """Categorize the specific issues mentioned in the review"""
-    logger.debug(f"🏷️ Starting issue categorization for customer: {state['customer_name']}")
-    
+    logger.debug(
+        f"🏷️ Starting issue categorization for customer: {state['customer_name']}"
+    )
+
     try:
-        categories = [cat.value for cat in ReviewCategory]
-        
-        parser = PydanticOutputParser(pydantic_object=IssueCategorizationAnalysis)
-        
-        prompt = PromptTemplate(
-            template="""You are an expert at categorizing customer feedback across all industries and business types.
-        
-        Analyze the review and identify which categories apply. The categories are universal and can apply to any business:
-        - quality: Issues with product/service quality, defects, or standards
-        - service: Customer service, staff behavior, responsiveness
-        - pricing: Cost concerns, value for money, billing issues
-        - delivery: Shipping, logistics, timing, fulfillment
-        - usability: Ease of use, user interface, accessibility
-        - communication: Information clarity, updates, transparency
-        - performance: Speed, reliability, functionality, uptime
-        - support: Help resources, documentation, technical assistance
-        - experience: Overall customer journey, satisfaction, emotions
-        - other: Issues that don't fit the above categories
-
-        Available categories: {categories}
-
-        Also extract the key specific issues mentioned.
-
-        {format_instructions}
-        
-        Review to categorize:
-        {review_text}
-        Sentiment: {sentiment}
-        """,
-            input_variables=["categories", "review_text", "sentiment"],
-            partial_variables={"format_instructions": parser.get_format_instructions()}
+        chain = get_chain("categorize_issues")
+
+        analysis = await invoke_cached_chain(
+            "categorize_issues",
+            chain,
+            {
+                "categories": CATEGORY_OPTIONS,
+                "review_text": state["review_text"],
+                "sentiment": state["sentiment"],
+            },
+            IssueCategorizationAnalysis,
+            state,
         )
-        
-        llm = get_llm()
-        
-        chain = prompt | llm | parser
-        
-        analysis = await chain.ainvoke({
-            "categories": ', '.join(categories),
-            "review_text": state['review_text'],
-            "sentiment": state['sentiment']
-        })
-        
+
         state["categories"] = analysis.categories
         state["key_issues"] = analysis.key_issues
-        
-        logger.info(f"🏷️ Categorization for {state['customer_name']}: {state['categories']} ({len(state['key_issues'])} issues)")
-        
+
+        logger.info(
+            f"🏷️ Categorization for {state['customer_name']}: {state['categories']} "
+            f"({len(state['key_issues'])} issues)"
+        )
+
     except Exception as e:
-        logger.error(f"❌ Categorization error for customer {state['customer_name']}: {str(e)}")
+        logger.error(
+            f"❌ Categorization error for customer {state['customer_name']}: {str(e)}"
+        )
+        record_node_error("categorize_issues", ["categories", "key_issues"])
         state["error"] = f"Categorization error: {str(e)}"
+        state["fallbacks"] = merge_fallbacks(
+            state.get("fallbacks", []), ["categories", "key_issues"]
+        )
         state["categories"] = ["other"]
         state["key_issues"] = []
-    
+
     return state
 
 
+@observe_node("determine_urgency")
 async def determine_urgency(state: ReviewAnalysisState) -> ReviewAnalysisState:
     """Determine the urgency level of the review"""
-    logger.debug(f"🔥 Starting urgency determination for customer: {state['customer_name']}")
-    
+    logger.debug(
+        f"🔥 Starting urgency determination for customer: {state['customer_name']}"
+    )
+
     try:
-        urgency_levels = [level.value for level in UrgencyLevel]
-        
-        parser = PydanticOutputParser(pydantic_object=UrgencyAnalysis)
-        
-        prompt = PromptTemplate(
-            template="""You are an expert at assessing the urgency of customer feedback across all industries.
-        
-        Based on the review sentiment, issues, and context, determine the urgency level:
-        - critical: Safety concerns, security issues, extremely angry customers, potential legal/PR issues, service outages
-        - high: Very unsatisfied customers, multiple serious issues, loss of functionality, demand immediate attention
-        - medium: Moderately unsatisfied, specific fixable issues, feature requests, minor bugs
-        - low: Minor issues, positive feedback with suggestions, general improvements
-
-        Choose from: {urgency_levels}
-
-        {format_instructions}
-        
-        Review Analysis:
-        Sentiment: {sentiment} (confidence: {sentiment_score})
-        Categories: {categories}
-        Key Issues: {key_issues}
-        Original Review: {review_text}
-        """,
-            input_variables=["urgency_levels", "sentiment", "sentiment_score", "categories", "key_issues", "review_text"],
-            partial_variables={"format_instructions": parser.get_format_instructions()}
+        chain = get_chain("determine_urgency")
+
+        analysis = await invoke_cached_chain(
+            "determine_urgency",
+            chain,
+            {
+                "urgency_levels": URGENCY_OPTIONS,
+                "sentiment": state["sentiment"],
+                "sentiment_score": state["sentiment_score"],
+                "categories": ", ".join(state["categories"]),
+                "key_issues": ", ".join(state["key_issues"]),
+                "review_text": state["review_text"],
+            },
+            UrgencyAnalysis,
+            state,
         )
-        
-        llm = get_llm()
-        
-        chain = prompt | llm | parser
-        
-        analysis = await chain.ainvoke({
-            "urgency_levels": ', '.join(urgency_levels),
-            "sentiment": state['sentiment'],
-            "sentiment_score": state['sentiment_score'],
-            "categories": ', '.join(state['categories']),
-            "key_issues": ', '.join(state['key_issues']),
-            "review_text": state['review_text']
-        })
-        
+
         state["urgency_level"] = analysis.urgency_level
-        
+
         logger.info(f"🔥 Urgency for {state['customer_name']}: {state['urgency_level']}")
-        
+
     except Exception as e:
-        logger.error(f"❌ Urgency determination error for customer {state['customer_name']}: {str(e)}")
+        logger.error(
+            "❌ Urgency determination error for customer "
+            f"{state['customer_name']}: {str(e)}"
+        )
+        record_node_error("determine_urgency", ["urgency_level"])
         state["error"] = f"Urgency determination error: {str(e)}"
+        state["fallbacks"] = merge_fallbacks(
+            state.get("fallbacks", []), ["urgency_level"]
+        )
         state["urgency_level"] = "medium"
-    
+
+    return state
+
+
+# Defaults mirror the fallbacks used by the sequential nodes
+FUSED_FIELD_DEFAULTS: Dict[str, Any] = {
+    "sentiment": "neutral",
+    "confidence": 0.0,
+    "categories": ["other"],
+    "key_issues": [],
+    "urgency_level": "medium",
+}
+
+
+def _extract_json_object(text: str) -> Dict[str, Any]:
+    """Extract the outermost JSON object from an LLM response, ignoring code fences"""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        payload = json.loads(text[start : end + 1])
+    except json.JSONDecodeError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def parse_fused_analysis(text: str) -> Tuple[Dict[str, Any], List[str]]:
+    """Validate a fused analysis response field by field.
+
+    Returns the parsed values and the names of the fields that fell back to defaults.
+    """
+    return validate_fused_fields(_extract_json_object(text))
+
+
+def is_complete_fused_analysis(text: str) -> bool:
+    """Whether every field of a fused analysis response parsed without a fallback"""
+    _, fallbacks = parse_fused_analysis(text)
+    return not fallbacks
+
+
+def validate_fused_fields(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Validate one fused analysis object field by field, defaulting invalid fields"""
+    values: Dict[str, Any] = {}
+    fallbacks: List[str] = []
+
+    sentiment = str(payload.get("sentiment", "")).strip().lower()
+    if sentiment in VALID_SENTIMENTS:
+        values["sentiment"] = sentiment
+    else:
+        fallbacks.append("sentiment")
+
+    try:
+        values["confidence"] = min(max(float(payload["confidence"]), 0.0), 1.0)
+    except (KeyError, TypeError, ValueError):
+        fallbacks.append("confidence")
+
+    raw_categories = payload.get("categories")
+    if isinstance(raw_categories, list):
+        categories = [str(c).strip().lower() for c in raw_categories]
+        categories = [c for c in categories if c in VALID_CATEGORIES]
+        # An empty list is a valid answer (e.g. praise without issues); only unknown
+        # values fall back
+        if categories or not raw_categories:
+            values["categories"] = categories
+    if "categories" not in values:
+        fallbacks.append("categories")
+
+    raw_issues = payload.get("key_issues")
+    if isinstance(raw_issues, list):
+        values["key_issues"] = [str(issue) for issue in raw_issues]
+    else:
+        fallbacks.append("key_issues")
+
+    urgency = str(payload.get("urgency_level", "")).strip().lower()
+    if urgency in VALID_URGENCY_LEVELS:
+        values["urgency_level"] = urgency
+    else:
+        fallbacks.append("urgency_level")
+
+    for field in fallbacks:
+        values[field] = FUSED_FIELD_DEFAULTS[field]
+
+    return values, fallbacks
+
+
+def _branch_update(
+    state: ReviewAnalysisState, result: ReviewAnalysisState, owned_keys: List[str]
+) -> Dict[str, Any]:
+    """Build the partial update of a parallel branch: only the keys it owns, plus any
+    new error or fallbacks, merged with the other branch's by the state reducers"""
+    update = {
+        key: result[key] for key in owned_keys + ["node_retries", "node_latency_ms"]
+    }
+    if result.get("error") != state.get("error"):
+        update["error"] = result["error"]
+    if result.get("fallbacks") != state.get("fallbacks"):
+        update["fallbacks"] = result["fallbacks"]
+    return update
+
+
+async def analyze_sentiment_branch(state: ReviewAnalysisState) -> Dict[str, Any]:
+    """Parallel branch of analyze_sentiment that only writes the sentiment keys"""
+    result = await analyze_sentiment(dict(state))
+    return _branch_update(state, result, ["sentiment", "sentiment_score"])
+
+
+async def categorize_issues_branch(state: ReviewAnalysisState) -> Dict[str, Any]:
+    """Parallel branch of categorize_issues that only writes the category keys"""
+    # Sentiment is computed concurrently, so the prompt gets no hint
+    result = await categorize_issues({**state, "sentiment": "not yet determined"})
+    return _branch_update(state, result, ["categories", "key_issues"])
+
+
+async def fan_out_analysis(state: ReviewAnalysisState) -> Dict[str, Any]:
+    """Fan-out point that starts the parallel branches"""
+    return {}
+
+
+async def join_analysis(state: ReviewAnalysisState) -> Dict[str, Any]:
+    """Join point of the parallel branches before urgency is determined"""
+    logger.debug(
+        f"🔗 Sentiment and categorization joined for customer: {state['customer_name']}"
+    )
+    return {}
+
+
+@observe_node("analyze_review_fused")
+async def analyze_review_fused(state: ReviewAnalysisState) -> ReviewAnalysisState:
+    """Analyze sentiment, issue categories and urgency of the review in one LLM call"""
+    logger.debug(f"🧩 Starting fused analysis for customer: {state['customer_name']}")
+
+    response_text = ""
+    try:
+        chain = get_chain("analyze_review_fused")
+
+        response_text = await invoke_cached_chain(
+            "analyze_review_fused",
+            chain,
+            {
+                "categories": CATEGORY_OPTIONS,
+                "urgency_levels": URGENCY_OPTIONS,
+                "customer_name": state["customer_name"],
+                "rating": state.get("rating", "Not provided"),
+                "review_text": state["review_text"],
+            },
+            state=state,
+            validate=is_complete_fused_analysis,
+        )
+
+    except Exception as e:
+        logger.error(
+            f"❌ Fused analysis error for customer {state['customer_name']}: {str(e)}"
+        )
+        record_node_error("analyze_review_fused")
+        state["error"] = f"Fused analysis error: {str(e)}"
+
+    values, fallbacks = parse_fused_analysis(response_text)
+
+    state["sentiment"] = values["sentiment"]
+    state["sentiment_score"] = values["confidence"]
+    state["categories"] = values["categories"]
+    state["key_issues"] = values["key_issues"]
+    state["urgency_level"] = values["urgency_level"]
+    state["fallbacks"] = state.get("fallbacks", []) + fallbacks
+
+    if fallbacks:
+        record_node_fallbacks("analyze_review_fused", fallbacks)
+        logger.warning(
+            f"⚠️ Fused analysis for {state['customer_name']} fell back on: "
+            f"{', '.join(fallbacks)}"
+        )
+        if not state.get("error"):
+            state["error"] = f"Fused analysis parsing fallback: {', '.join(fallbacks)}"
+
+    logger.info(
+        f"🧩 Fused analysis for {state['customer_name']}: {state['sentiment']} "
+        f"({state['sentiment_score']:.2f}), {state['categories']}, "
+        f"urgency {state['urgency_level']}"
+    )
+
     return state
 
 
+def pack_review_batches(
+    reviews: List[Dict[str, Any]],
+    max_batch_size: int,
+    token_budget: int,
+) -> List[List[Dict[str, Any]]]:
+    """Pack reviews into batches bounded by review count and estimated prompt tokens"""
+    batches: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    current_tokens = 0
+
+    for review in reviews:
+        review_tokens = estimate_tokens(review["customer_name"]) + estimate_tokens(
+            review["review_text"]
+        )
+        if current and (
+            len(current) >= max_batch_size
+            or current_tokens + review_tokens > token_budget
+        ):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(review)
+        current_tokens += review_tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def format_batch_reviews(reviews: List[Dict[str, Any]]) -> str:
+    """Render reviews for the batch prompt, each introduced by its row ID"""
+    return "\n---\n".join(
+        f"Row ID: {review['row_id']}\nCustomer: {review['customer_name']}\n"
+        f"Review: {review['review_text']}"
+        for review in reviews
+    )
+
+
+def parse_batch_analysis(text: str) -> Dict[str, Tuple[Dict[str, Any], List[str]]]:
+    """Parse a batch analysis response into validated fields and fallbacks by row ID"""
+    start = text.find("[")
+    object_start = text.find("{")
+    items: Any = []
+    try:
+        if object_start != -1 and (start == -1 or object_start < start):
+            items = _extract_json_object(text).get("analyses", [])
+        elif start != -1:
+            items = json.loads(text[start : text.rfind("]") + 1])
+    except json.JSONDecodeError:
+        items = []
+
+    parsed: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+    if not isinstance(items, list):
+        return parsed
+    for item in items:
+        if isinstance(item, dict) and "row_id" in item:
+            parsed[str(item["row_id"]).strip()] = validate_fused_fields(item)
+    return parsed
+
+
+def _batch_item_cache_key(review: Dict[str, Any]) -> str:
+    return make_cache_key(
+        "analyze_reviews_batch",
+        PROMPT_VERSIONS["analyze_reviews_batch"],
+        LLM_MODEL,
+        LLM_TEMPERATURE,
+        {
+            "customer_name": review["customer_name"],
+            "review_text": review["review_text"],
+        },
+    )
+
+
+async def analyze_review_fields(review: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze one review with the fused node and return only the analysis fields"""
+    state = build_initial_state(
+        review_text=review["review_text"],
+        customer_name=review["customer_name"],
+        customer_email=review["customer_email"],
+    )
+    state = await analyze_review_fused(state)
+    return {field: state[field] for field in ANALYSIS_FIELDS}
+
+
+@observe_node("analyze_reviews_batch")
+async def analyze_reviews_batch(
+    reviews: List[Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """Analyze several reviews with a single LLM call.
+
+    Each review needs row_id, customer_name, customer_email and review_text. Returns the
+    analysis fields keyed by row ID; reviews missing from the response or with fields
+    that could not be parsed are re-analyzed individually.
+    """
+    logger.info(f"📦 Batch analysis of {len(reviews)} reviews")
+
+    cache = get_llm_cache()
+    results: Dict[str, Dict[str, Any]] = {}
+    pending: List[Dict[str, Any]] = []
+    shadow_confidences: Dict[str, float] = {}
+
+    for review in reviews:
+        if settings.pre_classifier_mode != "off":
+            label, confidence = classify_review(review["review_text"])
+            if settings.pre_classifier_mode == "shadow":
+                shadow_confidences[review["row_id"]] = confidence
+            elif label == "positive" and is_confident(confidence):
+                results[review["row_id"]] = pre_classified_fields(confidence)
+                continue
+
+        cached = await cache.get(_batch_item_cache_key(review)) if cache else None
+        if cached is not None:
+            results[review["row_id"]] = cached
+        else:
+            pending.append(review)
+
+    if pending:
+        await analyze_pending_batch(pending, results, cache)
+
+    # analyze_review compares shadow predictions with these results, as the graph does
+    for row_id, confidence in shadow_confidences.items():
+        results[row_id] = {**results[row_id], "pre_classifier_confidence": confidence}
+
+    return results
+
+
+async def analyze_pending_batch(
+    pending: List[Dict[str, Any]],
+    results: Dict[str, Dict[str, Any]],
+    cache: Any,
+) -> None:
+    """Analyze reviews without a cached result in one LLM call, adding to results"""
+    parsed: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+    try:
+        chain = get_chain("analyze_reviews_batch")
+
+        response_text = await invoke_llm(
+            "analyze_reviews_batch",
+            chain,
+            {
+                "categories": CATEGORY_OPTIONS,
+                "urgency_levels": URGENCY_OPTIONS,
+                "reviews": format_batch_reviews(pending),
+            },
+        )
+        parsed = parse_batch_analysis(response_text)
+
+    except Exception as e:
+        logger.error(f"❌ Batch analysis error for {len(pending)} reviews: {str(e)}")
+        record_node_error("analyze_reviews_batch")
+
+    retry: List[Dict[str, Any]] = []
+    for review in pending:
+        values, fallbacks = parsed.get(review["row_id"], (None, None))
+        if values is None or fallbacks:
+            retry.append(review)
+            continue
+        analysis = {
+            "sentiment": values["sentiment"],
+            "sentiment_score": values["confidence"],
+            "categories": values["categories"],
+            "key_issues": values["key_issues"],
+            "urgency_level": values["urgency_level"],
+            "error": "",
+            "fallbacks": [],
+        }
+        results[review["row_id"]] = analysis
+        if cache:
+            await cache.set(_batch_item_cache_key(review), analysis)
+
+    if retry:
+        # Reviews the batch could not answer fall back to individual fused analysis
+        record_node_fallbacks("analyze_reviews_batch", ["review"], len(retry))
+        logger.warning(
+            f"⚠️ Batch response incomplete, re-analyzing {len(retry)} of "
+            f"{len(pending)} reviews individually"
+        )
+        retried = await asyncio.gather(
+            *(analyze_review_fields(review) for review in retry)
+        )
+        for review, analysis in zip(retry, retried):
+            results[review["row_id"]] = analysis
+
+
+@observe_node("decide_email_action")
 async def decide_email_action(state: ReviewAnalysisState) -> ReviewAnalysisState:
     """Decide whether to send an email and which template to use"""
     logger.debug(f"🤔 Deciding email action for {state['customer_name']}")
     try:
         # Only send emails for negative reviews with medium+ urgency
-        should_send = (
-            state["sentiment"] == "negative" and
-            state["urgency_level"] in ["medium", "high", "critical"]
-        )
-        
+        should_send = state["sentiment"] == "negative" and state["urgency_level"] in [
+            "medium",
+            "high",
+            "critical",
+        ]
+
         state["should_send_email"] = should_send
-        
+
         if should_send:
             # Determine email template based on categories and urgency
             if state["urgency_level"] == "critical":
@@ -300,155 +1105,126 @@ async def decide_email_action(state: ReviewAnalysisState) -> ReviewAnalysisState
                 state["type_of_email_template"] = "support_concern"
             else:
                 state["type_of_email_template"] = "general_concern"
-            logger.info(f"✅ Email will be sent to {state['customer_name']} (template: {state['type_of_email_template']})")
+            logger.info(
+                f"✅ Email will be sent to {state['customer_name']} "
+                f"(template: {state['type_of_email_template']})"
+            )
         else:
             state["type_of_email_template"] = None
             state["analysis_complete"] = True
-            logger.info(f"📪 Email not required for {state['customer_name']}. Conditions not met.")
-        
+            logger.info(
+                f"📪 Email not required for {state['customer_name']}. "
+                "Conditions not met."
+            )
+
     except Exception as e:
-        logger.error(f"❌ Email decision error for customer {state['customer_name']}: {str(e)}")
+        logger.error(
+            f"❌ Email decision error for customer {state['customer_name']}: {str(e)}"
+        )
+        record_node_error("decide_email_action")
         state["error"] = f"Email decision error: {str(e)}"
-    
+
     return state
 
 
+@observe_node("generate_email_content")
 async def generate_email_content(state: ReviewAnalysisState) -> ReviewAnalysisState:
     """Generate a personalized email response based on the analysis."""
     logger.debug(f"📧 Starting email generation for customer: {state['customer_name']}")
 
     try:
-        parser = PydanticOutputParser(pydantic_object=GeneratedEmail)
-
-        prompt = PromptTemplate(
-            template="""You are a world-class customer support agent responsible for writing personalized, empathetic, and professional emails to customers based on their feedback.
-
-            **Context:**
-            - Customer Name: {customer_name}
-            - Service Name: {service_name}
-            - Service Email: {service_email}
-            - Review Sentiment: {sentiment}
-            - Urgency: {urgency_level}
-            - Key Issues Identified: {key_issues}
-            - Original Review: {review_text}
-
-            **Your Task:**
-            Generate a complete email (subject and body) to send to the customer. The tone and content should be guided by the "Response Type".
-
-            **Response Type:** {response_type}
-
-            **Guidelines for Different Response Types:**
-
-            *   **critical_response**:
-                *   Acknowledge the severity of the issue immediately.
-                *   Express deep concern.
-                *   Offer immediate actions like a call with a manager, a full refund, and a complimentary return visit.
-                *   Keep it concise and action-oriented.
-                *   Example tone: "We are deeply concerned about your recent experience..."
-
-            *   **quality_concern**:
-                *   Apologize for not meeting quality standards.
-                *   Mention that feedback has been shared with the quality team.
-                *   Outline steps being taken (e.g., process review).
-                *   Offer a complimentary return experience to demonstrate improvement.
-                *   Example tone: "We sincerely apologize that our quality did not meet your expectations."
-
-            *   **service_concern**:
-                *   Apologize for the service lapse.
-                *   Mention that feedback has been discussed with the service team and extra training is being implemented.
-                *   Offer a complimentary service on the next visit to make it right.
-                *   Example tone: "We are sorry to hear that our service did not meet your expectations."
-            
-            *   **general_concern**:
-                *   Thank the customer for their feedback.
-                *   Acknowledge their concerns and state that they have been shared with management.
-                *   Reassure them that you are taking steps to improve.
-                *   Invite them back to experience the improvements.
-                *   Example tone: "Thank you for sharing your feedback about your experience..."
-            
-            *   **delivery_concern**:
-                *   Apologize for delivery issues.
-                *   Mention that you've reviewed the issue with logistics.
-                *   Offer a delivery credit or priority handling for the next order.
-                *   Example tone: "We sincerely apologize for the delivery issues you experienced."
-
-            *   **support_concern**:
-                *   Apologize for the support experience.
-                *   Mention that support training and processes are being improved.
-                *   Encourage them to contact support again for proper assistance.
-                *   Example tone: "Thank you for your feedback regarding your support experience."
-
-            **Final Output Instructions:**
-            - Write the email body in plain text, not markdown.
-            - Ensure the tone is appropriate for the situation.
-            - Personalize the email using the customer's name and the specific issues they raised.
-            - Sign off with the "{service_name}".
-
-            {format_instructions}
-            """,
-            input_variables=[
-                "customer_name", "service_name", "service_email",
-                "sentiment", "urgency_level", "key_issues", "review_text",
-                "response_type"
-            ],
-            partial_variables={"format_instructions": parser.get_format_instructions()}
+        chain = get_chain("generate_email_content")
+
+        analysis = await invoke_cached_chain(
+            "generate_email_content",
+            chain,
+            {
+                "customer_name": state["customer_name"],
+                "service_name": settings.from_name,
+                "service_email": settings.from_email,
+                "sentiment": state["sentiment"],
+                "urgency_level": state["urgency_level"],
+                "key_issues": "\n- ".join(state["key_issues"]),
+                "review_text": state["review_text"],
+                "response_type": state["type_of_email_template"],
+            },
+            GeneratedEmail,
+            state,
         )
-        
-        llm = get_llm()
-        chain = prompt | llm | parser
-
-        analysis = await chain.ainvoke({
-            "customer_name": state['customer_name'],
-            "service_name": settings.from_name,
-            "service_email": settings.from_email,
-            "sentiment": state['sentiment'],
-            "urgency_level": state['urgency_level'],
-            "key_issues": '\n- '.join(state['key_issues']),
-            "review_text": state['review_text'],
-            "response_type": state['type_of_email_template']
-        })
 
         logger.info(f"✅ Email content generated for {state['customer_name']}")
 
-        email_sent_successfully = await send_email(
-            to_email=state['customer_email'],
+        # Delivery happens in the outbox dispatcher, outside the graph run
+        state["email_queued"] = state["email_sent"] = await enqueue_email(
+            to_email=state["customer_email"],
             subject=analysis.subject,
-            body=analysis.body
+            body=analysis.body,
+            idempotency_key=make_idempotency_key(
+                state["customer_email"],
+                state["review_text"],
+                state["type_of_email_template"],
+            ),
+            review_text_hash=Review.hash_review_text(state["review_text"]),
         )
-        state['email_sent'] = email_sent_successfully
 
     except Exception as e:
-        logger.error(f"❌ Email generation error for customer {state['customer_name']}: {str(e)}")
+        logger.error(
+            f"❌ Email generation error for customer {state['customer_name']}: {str(e)}"
+        )
+        record_node_error("generate_email_content")
         state["error"] = f"Email generation error: {str(e)}"
-        state['email_sent'] = False
+        state["email_queued"] = state["email_sent"] = False
 
     state["analysis_complete"] = True
     return state
 
 
-# Global graph instance for reuse
-_graph_instance: Optional[StateGraph] = None
+GRAPH_FACTORIES = {
+    "sequential": create_review_analysis_graph,
+    "fused": create_fused_review_analysis_graph,
+    "parallel": create_parallel_review_analysis_graph,
+    # Used internally for analysis fields computed upstream, e.g. by batched uploads
+    "prefilled": create_prefilled_review_analysis_graph,
+}
 
+# Global graph instances for reuse, one per analysis mode
+_graph_instances: Dict[str, StateGraph] = {}
 
-def get_review_analysis_graph() -> StateGraph:
-    """Get or create the review analysis graph"""
-    global _graph_instance
-    if _graph_instance is None:
-        _graph_instance = create_review_analysis_graph()
-    return _graph_instance
 
+def get_review_analysis_graph(mode: Optional[str] = None) -> StateGraph:
+    """Get or create the review analysis graph for the configured analysis mode"""
+    mode = mode or settings.analysis_mode
+    if mode not in GRAPH_FACTORIES:
+        raise ValueError(
+            f"Unknown analysis mode: {mode}. "
+            f"Available modes: {', '.join(GRAPH_FACTORIES)}"
+        )
+    if mode not in _graph_instances:
+        _graph_instances[mode] = GRAPH_FACTORIES[mode]()
+    return _graph_instances[mode]
 
-async def analyze_review(
-    review_text: str, 
-    customer_name: str, 
-    customer_email: str,
-    rating: int = None
-) -> Dict[str, Any]:
-    """Analyze a review and return the complete analysis"""
-    
-    logger.info(f"🚀 Analyzing review for: {customer_name}")
-    
-    initial_state = ReviewAnalysisState(
+
+def warm_up_review_agent() -> None:
+    """Build the LLM client, chain registry and configured analysis graph ahead of the
+    first review"""
+    get_chain(next(iter(CHAIN_SPECS)))
+    get_review_analysis_graph()
+
+
+def check_llm_access() -> None:
+    """Look up LLM_MODEL with the configured API key; raises if the key is rejected or
+    the model is unknown"""
+    get_llm()
+    genai.get_model(
+        f"models/{LLM_MODEL}", request_options={"timeout": LLM_CHECK_TIMEOUT_SECONDS}
+    )
+
+
+def build_initial_state(
+    review_text: str, customer_name: str, customer_email: str, rating: int = None
+) -> ReviewAnalysisState:
+    """Build the graph input state for a review"""
+    return ReviewAnalysisState(
         review_text=review_text,
         customer_name=customer_name,
         customer_email=customer_email,
@@ -459,17 +1235,70 @@ async def analyze_review(
         categories=[],
         key_issues=[],
         should_send_email=False,
+        email_queued=False,
         email_sent=False,
         type_of_email_template="",
         analysis_complete=False,
-        error=""
+        error="",
+        fallbacks=[],
+        node_retries={},
+        node_latency_ms={},
+        deadline_at=time.monotonic() + settings.review_deadline_seconds,
+        pre_classified=False,
+        pre_classifier_confidence=0.0,
     )
-    
-    graph = get_review_analysis_graph()
-    result = await graph.ainvoke(initial_state)
-    
-    logger.info(f"🎉 Analysis complete for {customer_name}: Sentiment={result['sentiment']}, Urgency={result['urgency_level']}, EmailSent={result['email_sent']}")
-    
+
+
+async def analyze_review(
+    review_text: str,
+    customer_name: str,
+    customer_email: str,
+    rating: int = None,
+    precomputed_analysis: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Analyze a review and return the complete analysis.
+
+    When precomputed_analysis holds the analysis fields (e.g. from
+    analyze_reviews_batch), only the email decision and generation steps are run.
+    """
+
+    logger.info(f"🚀 Analyzing review for: {customer_name}")
+
+    initial_state = build_initial_state(
+        review_text, customer_name, customer_email, rating
+    )
+
+    if precomputed_analysis:
+        initial_state.update(
+            {field: precomputed_analysis[field] for field in ANALYSIS_FIELDS}
+        )
+        initial_state.update(
+            {
+                field: precomputed_analysis[field]
+                for field in PRE_CLASSIFIER_FIELDS
+                if field in precomputed_analysis
+            }
+        )
+        graph = get_review_analysis_graph("prefilled")
+    else:
+        graph = get_review_analysis_graph()
+
+    # Hard backstop in case a non-LLM step (e.g. SMTP) hangs past the review deadline
+    result = await asyncio.wait_for(
+        graph.ainvoke(initial_state),
+        timeout=settings.review_deadline_seconds + REVIEW_DEADLINE_GRACE_SECONDS,
+    )
+
+    if settings.pre_classifier_mode == "shadow" and is_confident(
+        result.get("pre_classifier_confidence", 0.0)
+    ):
+        record_shadow_result(result["pre_classifier_confidence"], result["sentiment"])
+
+    logger.info(
+        f"🎉 Analysis complete for {customer_name}: Sentiment={result['sentiment']}, "
+        f"Urgency={result['urgency_level']}, EmailQueued={result['email_queued']}"
+    )
+
     return {
         "sentiment": result["sentiment"],
         "sentiment_score": result["sentiment_score"],
@@ -477,8 +1306,13 @@ async def analyze_review(
         "categories": result["categories"],
         "key_issues": result["key_issues"],
         "should_send_email": result["should_send_email"],
-        "email_sent": result["email_sent"],
+        "email_queued": result["email_queued"],
+        "email_sent": result["email_queued"],
         "type_of_email_template": result["type_of_email_template"],
         "analysis_complete": result["analysis_complete"],
-        "error": result.get("error", "")
-    }
\ No newline at end of file
+        "error": result.get("error", ""),
+        "fallbacks": result.get("fallbacks", []),
+        "node_retries": result.get("node_retries", {}),
+        "node_latency_ms": result.get("node_latency_ms", {}),
+        "pre_classified": result.get("pre_classified", False),
+    }
@@ -1,5 +1,8 @@
 import logging
+
 from fastapi import HTTPException
+
+from app.services.email_outbox_service import get_outbox_stats
 from app.services.email_service import test_email_connection
 
 logger = logging.getLogger(__name__)
@@ -11,8 +14,19 @@ async def test_email_service():
         is_connected = await test_email_connection()
         return {
             "email_service": "connected" if is_connected else "disconnected",
-            "message": "Email service test completed"
+            "message": "Email service test completed",
         }
     except Exception as e:
         logger.error(f"❌ Email test failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Email test failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Email test failed: {str(e)}")
+
+
+async def get_email_outbox_status():
+    """Get outbox email counts by status and dispatcher counters"""
+    try:
+        return await get_outbox_stats()
+    except Exception as e:
+        logger.error(f"❌ Failed to read email outbox: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Failed to read email outbox: {str(e)}"
+        )
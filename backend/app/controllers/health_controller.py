@@ -1,9 +1,42 @@
 import logging
+
 from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from app.agents.pre_classifier import get_pre_classifier_stats
+from app.services.llm_cache import get_llm_cache
+from app.services.llm_throttle import get_llm_throttle
+from app.services.metrics import render_metrics
+from app.services.startup_service import get_readiness
 
 logger = logging.getLogger(__name__)
 
 
 async def get_health_check():
     """Health check endpoint - returns 204 if healthy"""
-    return Response(status_code=204) 
\ No newline at end of file
+    return Response(status_code=204)
+
+
+async def get_readiness_check():
+    """Readiness - 200 once MongoDB is up, 503 while starting; SMTP and LLM status are
+    reported only"""
+    readiness = get_readiness()
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503, content=readiness
+    )
+
+
+async def get_llm_stats():
+    """Gemini rate limits, adaptive concurrency, cache and pre-classifier counters"""
+    cache = get_llm_cache()
+    return {
+        "throttle": get_llm_throttle().get_stats(),
+        "cache": cache.get_stats() if cache else None,
+        "pre_classifier": get_pre_classifier_stats(),
+    }
+
+
+async def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
@@ -1,31 +1,155 @@
+import json
 import logging
+from typing import Any, Dict, Optional
+
 from fastapi import HTTPException, UploadFile
-from app.services.file_service import process_excel_reviews
+from fastapi.responses import StreamingResponse
 
 logger = logging.getLogger(__name__)
 
+# The upload services pull in pandas, LangChain and LangGraph, so they are imported on
+# first use (or by the startup preload) instead of when the app starts
+
 
 async def upload_excel_reviews(
     file: UploadFile,
 ):
     """Upload Excel file with customer reviews for batch processing"""
+    from app.services.file_service import process_excel_reviews
+
     try:
         logger.info(f"📁 Received Excel file upload: {file.filename}")
-        
+
         result = await process_excel_reviews(
             file=file,
         )
-        
-        logger.info(f"✅ Excel processing complete: {result['processed']}/{result['total_rows']} reviews processed")
-        
+
+        logger.info(
+            f"✅ Excel processing complete: {result['processed']}/"
+            f"{result['total_rows']} reviews processed"
+        )
+
         return {
             "message": "Excel file processed successfully",
             "filename": file.filename,
-            "results": result
+            "results": result,
         }
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"❌ Excel upload failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Excel upload failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Excel upload failed: {str(e)}")
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_excel_reviews(
+    file: UploadFile,
+):
+    """Start an upload job for an Excel file and stream its events as Server-Sent
+    Events.
+
+    The first event carries the job ID; a ("reconnect", ...) event means the client
+    should continue from its cursor on /upload-jobs/{job_id}/events.
+    """
+    from app.services.job_service import create_upload_job, iter_upload_job_events
+
+    try:
+        logger.info(f"📁 Received Excel file upload for streaming: {file.filename}")
+
+        job = await create_upload_job(file=file)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Excel stream upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Excel upload failed: {str(e)}")
+
+    job_id = str(job.id)
+
+    async def event_stream():
+        yield format_sse("job", {"job_id": job_id, "filename": file.filename})
+        async for event, data in iter_upload_job_events(job_id):
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def create_upload_reviews_job(
+    file: UploadFile,
+):
+    """Start background processing of an Excel file and return the job ID"""
+    from app.services.job_service import create_upload_job
+
+    try:
+        logger.info(
+            f"📁 Received Excel file upload for background processing: {file.filename}"
+        )
+
+        job = await create_upload_job(file=file)
+
+        return {
+            "message": "Excel file accepted for processing",
+            "filename": file.filename,
+            "job_id": str(job.id),
+            "status": job.status,
+            "total_rows": job.total_rows,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Excel upload job creation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Excel upload failed: {str(e)}")
+
+
+async def get_upload_job_status(job_id: str):
+    """Get status and progress counters of an upload job"""
+    from app.services.job_service import get_upload_job, upload_job_summary
+
+    job = await get_upload_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Upload job not found: {job_id}")
+
+    return upload_job_summary(job)
+
+
+async def stream_upload_job_events(job_id: str, cursor: Optional[str] = None):
+    """Stream a job's row results and progress as Server-Sent Events after cursor"""
+    from app.services.job_service import get_upload_job, iter_upload_job_events
+
+    if await get_upload_job(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Upload job not found: {job_id}")
+
+    async def event_stream():
+        async for event, data in iter_upload_job_events(job_id, cursor):
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def list_upload_job_results(job_id: str, page: int, page_size: int):
+    """Get a page of per-row results of an upload job"""
+    from app.services.job_service import get_upload_job, get_upload_job_results
+
+    job = await get_upload_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Upload job not found: {job_id}")
+
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        **(await get_upload_job_results(job_id, page, page_size)),
+    }
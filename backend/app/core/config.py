@@ -1,4 +1,5 @@
-from typing import List
+from typing import List, Literal, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -6,28 +7,117 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # AI Configuration
     google_api_key: str = Field(..., env="GOOGLE_API_KEY")
-    
+
     # MongoDB Configuration
     mongodb_url: str = Field("mongodb://localhost:27017", env="MONGODB_URL")
     mongodb_database: str = Field("Cluster0", env="MONGODB_DATABASE")
-    
+
     # Email Configuration
     smtp_host: str = Field(..., env="SMTP_HOST")
     smtp_port: int = Field(587, env="SMTP_PORT")
     smtp_user: str = Field(..., env="SMTP_USER")
     smtp_password: str = Field(..., env="SMTP_PASSWORD")
+    # Persistent SMTP sessions: pool size, messages sent before a session is recycled (0
+    # = no limit) and idle time after which a session is checked with NOOP before reuse
+    smtp_pool_size: int = Field(4, env="SMTP_POOL_SIZE")
+    smtp_max_messages_per_connection: int = Field(
+        100, env="SMTP_MAX_MESSAGES_PER_CONNECTION"
+    )
+    smtp_idle_check_seconds: float = Field(30.0, env="SMTP_IDLE_CHECK_SECONDS")
+    # Email outbox: emails claimed per round, idle poll interval, attempts before
+    # dead-lettering, first retry delay (doubling per attempt) and claim lease
+    email_outbox_batch_size: int = Field(20, env="EMAIL_OUTBOX_BATCH_SIZE")
+    email_outbox_poll_seconds: float = Field(5.0, env="EMAIL_OUTBOX_POLL_SECONDS")
+    email_outbox_max_attempts: int = Field(5, env="EMAIL_OUTBOX_MAX_ATTEMPTS")
+    email_outbox_retry_base_seconds: float = Field(
+        30.0, env="EMAIL_OUTBOX_RETRY_BASE_SECONDS"
+    )
+    email_outbox_lease_seconds: float = Field(300.0, env="EMAIL_OUTBOX_LEASE_SECONDS")
+    # Send-rate governor: global messages/sec, messages/min per recipient domain and the
+    # minimum seconds between two emails to one recipient (0 disables each limit)
+    email_messages_per_second: float = Field(5.0, env="EMAIL_MESSAGES_PER_SECOND")
+    email_domain_messages_per_minute: float = Field(
+        60.0, env="EMAIL_DOMAIN_MESSAGES_PER_MINUTE"
+    )
+    email_recipient_cooldown_seconds: float = Field(
+        3600.0, env="EMAIL_RECIPIENT_COOLDOWN_SECONDS"
+    )
     from_email: str = Field(..., env="FROM_EMAIL")
     from_name: str = Field(..., env="FROM_NAME")
-    
+
+    # Processing Settings
+    upload_concurrency: int = Field(1, env="UPLOAD_CONCURRENCY")
+    # Largest .xlsx/CSV upload in MB. The upload is kept in /tmp, which is memory on
+    # Cloud Run and shares the container limit with the parser, so raise it with the
+    # memory limit
+    upload_max_file_size_mb: int = Field(40, env="UPLOAD_MAX_FILE_SIZE_MB")
+    # Review analysis graph: "sequential" (one LLM call per node), "fused" (single call)
+    # or "parallel" (sentiment and categorization run concurrently)
+    analysis_mode: Literal["sequential", "fused", "parallel"] = Field(
+        "sequential", env="ANALYSIS_MODE"
+    )
+    # Batched analysis for uploads: reviews packed per LLM request (0 disables batching)
+    # and the estimated prompt token budget of one batch
+    upload_batch_size: int = Field(0, env="UPLOAD_BATCH_SIZE")
+    upload_batch_token_budget: int = Field(8000, env="UPLOAD_BATCH_TOKEN_BUDGET")
+    # Rows of an upload sharing a customer email are collapsed before processing: "last"
+    # or "first" row wins, or "concatenate" merges their reviews into the last row
+    upload_duplicate_policy: str = Field("last", env="UPLOAD_DUPLICATE_POLICY")
+    # Upload rows are saved with bulk upserts of up to this many reviews (0 saves each
+    # review on its own), flushed at least every REVIEW_WRITE_FLUSH_SECONDS
+    review_write_batch_size: int = Field(100, env="REVIEW_WRITE_BATCH_SIZE")
+    review_write_flush_seconds: float = Field(1.0, env="REVIEW_WRITE_FLUSH_SECONDS")
+
+    # Local pre-classifier for obvious positive reviews: "off", "shadow" (log agreement
+    # with the LLM only) or "on" (confident positives skip the LLM nodes)
+    pre_classifier_mode: Literal["off", "shadow", "on"] = Field(
+        "off", env="PRE_CLASSIFIER_MODE"
+    )
+    pre_classifier_threshold: float = Field(0.85, env="PRE_CLASSIFIER_THRESHOLD")
+    # Optional model trained offline with train_pre_classifier.py; the built-in lexicon
+    # is used otherwise
+    pre_classifier_model_path: Optional[str] = Field(
+        None, env="PRE_CLASSIFIER_MODEL_PATH"
+    )
+
+    # LLM Result Cache
+    llm_cache_enabled: bool = Field(True, env="LLM_CACHE_ENABLED")
+    llm_cache_max_entries: int = Field(10000, env="LLM_CACHE_MAX_ENTRIES")
+    llm_cache_ttl_seconds: int = Field(7 * 24 * 3600, env="LLM_CACHE_TTL_SECONDS")
+    # Optional persistent cache tier shared by all instances
+    redis_url: Optional[str] = Field(None, env="REDIS_URL")
+
+    # LLM Rate Limiting (0 disables a bucket) and adaptive concurrency bounds
+    llm_requests_per_minute: int = Field(1000, env="LLM_REQUESTS_PER_MINUTE")
+    llm_tokens_per_minute: int = Field(1000000, env="LLM_TOKENS_PER_MINUTE")
+    llm_initial_concurrency: int = Field(8, env="LLM_INITIAL_CONCURRENCY")
+    llm_min_concurrency: int = Field(1, env="LLM_MIN_CONCURRENCY")
+    llm_max_concurrency: int = Field(64, env="LLM_MAX_CONCURRENCY")
+
+    # LLM Timeouts and Retries
+    llm_node_timeout_seconds: float = Field(30.0, env="LLM_NODE_TIMEOUT_SECONDS")
+    llm_max_retries: int = Field(3, env="LLM_MAX_RETRIES")
+    llm_retry_base_delay_seconds: float = Field(0.5, env="LLM_RETRY_BASE_DELAY_SECONDS")
+    llm_retry_max_delay_seconds: float = Field(8.0, env="LLM_RETRY_MAX_DELAY_SECONDS")
+    # Overall time budget for analysing one review across all nodes
+    review_deadline_seconds: float = Field(120.0, env="REVIEW_DEADLINE_SECONDS")
+
     # Application Settings
     debug: bool = Field(True, env="DEBUG")
     cors_origins: List[str] = Field(
-        ["http://localhost:3000", "http://localhost:8501", "http://127.0.0.1:8501", "http://localhost:8080", "http://127.0.0.1:8080"], env="CORS_ORIGINS"
+        [
+            "http://localhost:3000",
+            "http://localhost:8501",
+            "http://127.0.0.1:8501",
+            "http://localhost:8080",
+            "http://127.0.0.1:8080",
+        ],
+        env="CORS_ORIGINS",
     )
-    
+
     class Config:
         env_file = ".env"
         case_sensitive = False
 
 
-settings = Settings() 
\ No newline at end of file
+settings = Settings()
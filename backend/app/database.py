@@ -1,9 +1,16 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from beanie import init_beanie
 import logging
 from typing import Optional
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
 from app.core.config import settings
+from app.models.email_outbox import OutboxEmail
 from app.models.review import Review
+from app.models.upload_job import UploadJob, UploadJobResult
+from app.services.metrics import MongoCommandMetrics
 
 logger = logging.getLogger(__name__)
 
@@ -11,19 +18,25 @@ logger = logging.getLogger(__name__)
 client: Optional[AsyncIOMotorClient] = None
 database = None
 
+# Unique index on reviews.customer_email, created by ensure_review_email_index rather
+# than Beanie so startup can skip it while duplicate reviews exist
+REVIEW_EMAIL_INDEX = "customer_email_1"
+
 
 async def connect_to_mongo():
     """Create database connection"""
     global client, database
     try:
         logger.info("Connecting to MongoDB...")
-        client = AsyncIOMotorClient(settings.mongodb_url)
+        client = AsyncIOMotorClient(
+            settings.mongodb_url, event_listeners=[MongoCommandMetrics()]
+        )
         database = client[settings.mongodb_database]
-        
+
         # Test connection
-        await client.admin.command('ping')
+        await client.admin.command("ping")
         logger.info("✅ Connected to MongoDB successfully")
-        
+
         return True
     except Exception as e:
         logger.error(f"❌ Failed to connect to MongoDB: {e}")
@@ -38,13 +51,76 @@ async def close_mongo_connection():
         logger.info("👋 Disconnected from MongoDB")
 
 
+async def count_duplicate_review_emails(collection) -> int:
+    """Number of customer emails with more than one review"""
+    result = await collection.aggregate(
+        [
+            {"$group": {"_id": "$customer_email", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$count": "emails"},
+        ],
+        allowDiskUse=True,
+    ).to_list(1)
+    return result[0]["emails"] if result else 0
+
+
+async def ensure_review_email_index(collection=None) -> bool:
+    """Create the unique customer_email index on reviews, replacing an old non-unique
+    one.
+
+    While some email still has several reviews the unique index cannot be built: nothing
+    is deleted, an error is logged and the reviews are left for
+    merge_duplicate_reviews.py. Every step is safe to repeat, so instances starting
+    together can all run it. Returns whether the unique index exists.
+    """
+    collection = (
+        collection if collection is not None else database[Review.Settings.name]
+    )
+    index = (await collection.index_information()).get(REVIEW_EMAIL_INDEX)
+    if index is not None and index.get("unique"):
+        return True
+
+    duplicates = await count_duplicate_review_emails(collection)
+    if duplicates:
+        logger.error(
+            f"❌ {duplicates} customer emails have more than one review, so the unique "
+            "customer_email "
+            f"index was not created; run merge_duplicate_reviews.py to merge them"
+        )
+        if index is None:
+            # Lookups by email stay indexed until the duplicates are merged
+            await collection.create_index(
+                [("customer_email", ASCENDING)], name=REVIEW_EMAIL_INDEX
+            )
+        return False
+
+    if index is not None:
+        try:
+            await collection.drop_index(REVIEW_EMAIL_INDEX)
+        except OperationFailure:
+            # Fine if another instance starting at the same time replaced it first
+            index = (await collection.index_information()).get(REVIEW_EMAIL_INDEX)
+            if index is not None and not index.get("unique"):
+                raise
+        logger.info(
+            "🔑 Dropped non-unique customer_email index to recreate it as unique"
+        )
+
+    await collection.create_index(
+        [("customer_email", ASCENDING)], name=REVIEW_EMAIL_INDEX, unique=True
+    )
+    logger.info("🔑 Unique customer_email index is in place")
+    return True
+
+
 async def init_database():
-    """Initialize database with Beanie"""    
+    """Initialize database with Beanie"""
     try:
         await init_beanie(
             database=database,
-            document_models=[Review]
+            document_models=[Review, UploadJob, UploadJobResult, OutboxEmail],
         )
+        await ensure_review_email_index()
         logger.info("✅ Beanie initialized successfully")
         return True
     except Exception as e:
@@ -61,7 +137,7 @@ async def check_database_connection() -> bool:
     """Check if database connection is working"""
     try:
         if client:
-            await client.admin.command('ping')
+            await client.admin.command("ping")
             return True
         return False
     except Exception as e:
@@ -72,4 +148,4 @@ async def check_database_connection() -> bool:
 # For backward compatibility during migration
 def get_db():
     """Deprecated: MongoDB doesn't need session management like SQLAlchemy"""
-    pass 
\ No newline at end of file
+    pass
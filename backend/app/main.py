@@ -1,50 +1,132 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+# isort: off
+# Imported first so the cold-start clock includes the framework and LLM imports below
+from app.services.startup_service import (
+    cancel_startup_checks,
+    elapsed_ms,
+    record_first_request,
+    start_startup_checks,
+)
+
+# isort: on
+
+import asyncio
+import logging
+import sys
 from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+
 from app.core.config import settings
-from app.database import connect_to_mongo, close_mongo_connection, init_database
-from app.services.email_service import test_email_connection
+from app.database import close_mongo_connection, connect_to_mongo, init_database
 from app.routes import api_router
-import logging
-import uvicorn
+from app.services.email_outbox_service import (
+    start_email_dispatcher,
+    stop_email_dispatcher,
+)
+from app.services.email_service import close_smtp_pool, test_email_connection
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
 )
 
 logger = logging.getLogger(__name__)
 
 
+async def check_mongodb() -> bool:
+    """Connect to MongoDB, initialize Beanie and start the workers that depend on it"""
+    mongo_connected = await connect_to_mongo()
+    logger.info(
+        f"🗄️  MongoDB: {'✅ Connected' if mongo_connected else '❌ Connection failed'}"
+    )
+    if not mongo_connected:
+        return False
+
+    beanie_initialized = await init_database()
+    logger.info(
+        "📄 Beanie: "
+        f"{'✅ Initialized' if beanie_initialized else '❌ Initialization failed'}"
+    )
+    if beanie_initialized:
+        start_email_dispatcher()
+    return beanie_initialized
+
+
+async def check_email() -> bool:
+    email_healthy = await test_email_connection()
+    logger.info(
+        f"📧 Email service: {'✅ Connected' if email_healthy else '❌ Connection failed'}"
+    )
+    return email_healthy
+
+
+def preload_review_pipeline() -> None:
+    """Import the pandas/LangChain/LangGraph review pipeline, build the Gemini client,
+    chains and graph, and check that Gemini accepts the API key and knows the model"""
+    from app.agents.review_agent import check_llm_access, warm_up_review_agent
+    from app.services import job_service  # noqa: F401
+
+    warm_up_review_agent()
+    check_llm_access()
+
+
+async def check_llm() -> bool:
+    """Preload the review pipeline off the event loop while health checks are already
+    served.
+
+    A rejected API key or unknown model raises, and the check reports the error."""
+    await asyncio.to_thread(preload_review_pipeline)
+    logger.info(f"🤖 AI Agent initialized with Gemini")
+    return True
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     logger.info("🚀 Starting AI Customer Feedback Management System")
-    
-    mongo_connected = await connect_to_mongo()
-    logger.info(f"🗄️  MongoDB: {'✅ Connected' if mongo_connected else '❌ Connection failed'}")
-    
-    if mongo_connected:
-        beanie_initialized = await init_database()
-        logger.info(f"📄 Beanie: {'✅ Initialized' if beanie_initialized else '❌ Initialization failed'}")
-    
-    email_healthy = await test_email_connection()
-    logger.info(f"📧 Email service: {'✅ Connected' if email_healthy else '❌ Connection failed'}")
-    
-    logger.info(f"🤖 AI Agent initialized with Gemini Pro")
-    logger.info("🎉 Application startup complete!")
-    
+
+    # Checks run concurrently in the background; /health/ready reports their progress
+    start_startup_checks(
+        {
+            "mongodb": check_mongodb,
+            "smtp": check_email,
+            "llm": check_llm,
+        }
+    )
+
+    logger.info(
+        f"🎉 Application startup complete in {elapsed_ms()} ms, "
+        "checks continue in the background"
+    )
+
     yield
-    
+
     logger.info("👋 Shutting down application")
+    await cancel_startup_checks()
+    # Upload jobs and write buffers can only exist once the review pipeline was imported
+    if "app.services.job_service" in sys.modules:
+        from app.services.job_service import shutdown_upload_jobs
+
+        await shutdown_upload_jobs()
+    if "app.services.review_service" in sys.modules:
+        from app.services.review_service import flush_review_write_buffers
+
+        await flush_review_write_buffers()
+    await stop_email_dispatcher()
+    await close_smtp_pool()
     await close_mongo_connection()
 
 
 app = FastAPI(
     title="AI Customer Feedback Management System",
-    description="Automatically analyze customer reviews and send personalized follow-up emails",
+    description=(
+        "Automatically analyze customer reviews and send personalized follow-up "
+        "emails"
+    ),
     version="1.0.0",
     lifespan=lifespan,
     docs_url="/docs" if settings.debug else None,
@@ -59,8 +141,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def log_cold_start(request: Request, call_next):
+    record_first_request(request.url.path)
+    return await call_next(request)
+
+
 app.include_router(api_router)
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
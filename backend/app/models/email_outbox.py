@@ -0,0 +1,45 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class OutboxEmailStatus(str, Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD_LETTER = "dead_letter"
+
+
+class OutboxEmail(Document):
+    idempotency_key: str
+    to_email: str
+    # Lowercased to_email, which the recipient cooldown matches on
+    to_email_normalized: Optional[str] = None
+    subject: str
+    body: str
+    # Hash of the review text the email answers
+    review_text_hash: Optional[str] = None
+    status: OutboxEmailStatus = Field(default=OutboxEmailStatus.PENDING)
+    attempts: int = 0
+    last_error: Optional[str] = None
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    locked_until: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+
+    class Settings:
+        name = "email_outbox"
+        indexes = [
+            IndexModel([("idempotency_key", ASCENDING)], unique=True),
+            IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+            # Last email sent to a recipient, for the recipient cooldown
+            IndexModel([("to_email_normalized", ASCENDING), ("sent_at", ASCENDING)]),
+        ]
+
+    def __repr__(self) -> str:
+        return f"<OutboxEmail(id={self.id}, to={self.to_email}, status={self.status})>"
@@ -1,8 +1,10 @@
+import hashlib
 from datetime import datetime
 from enum import Enum
-from typing import Optional, List
-from beanie import Document
-from pydantic import Field
+from typing import List, Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel, Field
 
 
 class SentimentType(str, Enum):
@@ -33,23 +35,41 @@ class ReviewCategory(str, Enum):
 
 class Review(Document):
     customer_name: str = Field(..., min_length=1, max_length=255)
-    customer_email: str = Field(..., pattern=r'^[^@]+@[^@]+\.[^@]+$')
+    customer_email: str = Field(..., pattern=r"^[^@]+@[^@]+\.[^@]+$")
     review_text: str = Field(..., min_length=1)
+    review_text_hash: Optional[str] = None
     ai_processed: bool = Field(default=False)
     ai_processing_error: Optional[str] = None
     ai_analysis_data: Optional[dict] = None
+    # Whether the latest analysis queued an email, and whether that email has been
+    # delivered. An update that queues a new email resets email_sent until the new one
+    # is delivered
+    email_queued: bool = Field(default=False)
     email_sent: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
-    
+
     class Settings:
         name = "reviews"
-        indexes = [
-            "customer_email",
-            "created_at",
-            "ai_processed",
-            "email_sent"
-        ]
-    
+        # The unique customer_email index that upserts by email rely on is created by
+        # ensure_review_email_index, once no email has several reviews
+        indexes = ["created_at", "ai_processed", "email_sent"]
+
+    @staticmethod
+    def hash_review_text(review_text: str) -> str:
+        """Content hash used to detect unchanged review text"""
+        return hashlib.sha256(review_text.encode("utf-8")).hexdigest()
+
     def __repr__(self) -> str:
-        return f"<Review(id={self.id}, customer={self.customer_name})>" 
\ No newline at end of file
+        return f"<Review(id={self.id}, customer={self.customer_name})>"
+
+
+class ExistingReview(BaseModel):
+    """Projection of a stored review with the fields needed for a new upload row"""
+
+    id: PydanticObjectId = Field(alias="_id")
+    customer_name: str
+    customer_email: str
+    review_text_hash: Optional[str] = None
+    ai_processing_error: Optional[str] = None
+    ai_analysis_data: Optional[dict] = None
@@ -0,0 +1,67 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class UploadJobStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class UploadJob(Document):
+    filename: str
+    status: UploadJobStatus = Field(default=UploadJobStatus.PENDING)
+    # 0 until the job has read through the file
+    total_rows: int = 0
+    rows_completed: int = 0
+    processed: int = 0
+    unchanged: int = 0
+    emails_queued: int = 0
+    error_count: int = 0
+    duplicate_count: int = 0
+    sentiment_summary: dict = Field(
+        default_factory=lambda: {"positive": 0, "negative": 0, "neutral": 0}
+    )
+    save_errors: List[str] = Field(default_factory=list)
+    failure_reason: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Refreshed by the instance running the job; a stale one means the job was lost
+    heartbeat_at: Optional[datetime] = None
+
+    class Settings:
+        name = "upload_jobs"
+        indexes = ["status", "created_at"]
+
+    def __repr__(self) -> str:
+        return (
+            f"<UploadJob(id={self.id}, filename={self.filename}, status={self.status})>"
+        )
+
+
+class UploadJobResult(Document):
+    job_id: str
+    row_number: int
+    review: Optional[dict] = None
+    error: Optional[str] = None
+    duplicate: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "upload_job_results"
+        indexes = [
+            IndexModel([("job_id", ASCENDING), ("row_number", ASCENDING)]),
+            # Progress streams read new results in insertion order
+            IndexModel([("job_id", ASCENDING), ("_id", ASCENDING)]),
+        ]
+
+    def __repr__(self) -> str:
+        return f"<UploadJobResult(job_id={self.job_id}, row={self.row_number})>"
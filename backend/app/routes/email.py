@@ -1,5 +1,6 @@
 from fastapi import APIRouter
-from app.controllers.email_controller import test_email_service
+
+from app.controllers.email_controller import get_email_outbox_status, test_email_service
 
 router = APIRouter()
 
@@ -7,4 +8,10 @@ router = APIRouter()
 @router.post("/test")
 async def test_email_service_route():
     """Test email service connection"""
-    return await test_email_service() 
\ No newline at end of file
+    return await test_email_service()
+
+
+@router.get("/outbox")
+async def email_outbox_status_route():
+    """Outbox email counts by status and dispatcher counters"""
+    return await get_email_outbox_status()
@@ -1,5 +1,11 @@
 from fastapi import APIRouter
-from app.controllers.health_controller import get_health_check
+
+from app.controllers.health_controller import (
+    get_health_check,
+    get_llm_stats,
+    get_metrics,
+    get_readiness_check,
+)
 
 router = APIRouter()
 
@@ -7,4 +13,23 @@ router = APIRouter()
 @router.get("/health")
 async def health_check():
     """Health check endpoint - returns 204 if healthy"""
-    return await get_health_check() 
\ No newline at end of file
+    return await get_health_check()
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Startup check status - 503 until the instance can serve requests"""
+    return await get_readiness_check()
+
+
+@router.get("/health/llm")
+async def llm_stats():
+    """LLM rate limiter, concurrency, cache and pre-classifier metrics"""
+    return await get_llm_stats()
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus metrics: node, LLM, SMTP and MongoDB latency histograms, upload rows,
+    node errors, LLM throttle, email send governor and outbox counters"""
+    return await get_metrics()
@@ -1,5 +1,15 @@
-from fastapi import APIRouter, UploadFile, File
-from app.controllers.reviews_controller import upload_excel_reviews
+from typing import Optional
+
+from fastapi import APIRouter, File, Query, UploadFile
+
+from app.controllers.reviews_controller import (
+    create_upload_reviews_job,
+    get_upload_job_status,
+    list_upload_job_results,
+    stream_excel_reviews,
+    stream_upload_job_events,
+    upload_excel_reviews,
+)
 
 router = APIRouter()
 
@@ -9,4 +19,46 @@ async def upload_excel_reviews_route(
     file: UploadFile = File(...),
 ):
     """Upload Excel file with customer reviews for batch processing"""
-    return await upload_excel_reviews(file=file) 
\ No newline at end of file
+    return await upload_excel_reviews(file=file)
+
+
+@router.post("/upload-excel/stream")
+async def upload_excel_reviews_stream_route(
+    file: UploadFile = File(...),
+):
+    """Upload Excel file as a background job and stream its per-row results as
+    Server-Sent Events"""
+    return await stream_excel_reviews(file=file)
+
+
+@router.post("/upload-jobs", status_code=202)
+async def create_upload_job_route(
+    file: UploadFile = File(...),
+):
+    """Upload Excel file and process it in the background; returns a job ID"""
+    return await create_upload_reviews_job(file=file)
+
+
+@router.get("/upload-jobs/{job_id}")
+async def get_upload_job_route(job_id: str):
+    """Get status and progress of an upload job"""
+    return await get_upload_job_status(job_id)
+
+
+@router.get("/upload-jobs/{job_id}/events")
+async def get_upload_job_events_route(
+    job_id: str,
+    cursor: Optional[str] = Query(None),
+):
+    """Stream row results and progress of an upload job as Server-Sent Events"""
+    return await stream_upload_job_events(job_id, cursor)
+
+
+@router.get("/upload-jobs/{job_id}/results")
+async def get_upload_job_results_route(
+    job_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(100, ge=1, le=1000),
+):
+    """Get paginated per-row results of an upload job"""
+    return await list_upload_job_results(job_id, page, page_size)
@@ -0,0 +1,428 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from prometheus_client.core import CounterMetricFamily
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.models.email_outbox import OutboxEmail, OutboxEmailStatus
+from app.models.review import Review
+from app.services.email_service import (
+    RecipientCooldownError,
+    deliver_email,
+    get_send_governor,
+)
+from app.services.metrics import register_stats_collector
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between two delivery attempts of one email
+MAX_RETRY_DELAY_SECONDS = 3600
+
+# Emails are queued before their review's buffered write lands. Delivery waits this long
+# between checks, for at most REVIEW_WAIT_MAX_SECONDS, so the write cannot reset
+# email_sent after delivery set it
+REVIEW_WAIT_SECONDS = 2
+REVIEW_WAIT_MAX_SECONDS = 60
+
+
+def normalize_recipient(to_email: str) -> str:
+    """Address compared across emails, case-insensitive like the send-rate governor"""
+    return to_email.strip().lower()
+
+
+def make_idempotency_key(to_email: str, review_text: str, email_type: str) -> str:
+    """Key allowing one email per customer, review text and response type"""
+    return hashlib.sha256(
+        f"{normalize_recipient(to_email)}\n{email_type}\n{review_text}".encode("utf-8")
+    ).hexdigest()
+
+
+async def enqueue_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    idempotency_key: str,
+    review_text_hash: Optional[str] = None,
+) -> bool:
+    """Store an email in the outbox for the dispatcher to deliver.
+
+    review_text_hash identifies the review text the email answers; delivery sets
+    email_sent on the customer's review only while it still has that text. Returns False
+    when the same email was already queued.
+    """
+    try:
+        await OutboxEmail(
+            idempotency_key=idempotency_key,
+            to_email=to_email,
+            to_email_normalized=normalize_recipient(to_email),
+            subject=subject,
+            body=body,
+            review_text_hash=review_text_hash,
+        ).insert()
+    except DuplicateKeyError:
+        logger.info(f"📭 Email to {to_email} is already in the outbox, not queued again")
+        return False
+
+    logger.info(f"📬 Email to {to_email} queued in the outbox")
+    if _dispatcher is not None:
+        _dispatcher.wake()
+    return True
+
+
+class EmailOutboxDispatcher:
+    """Background task delivering outbox emails in batches.
+
+    Emails are claimed atomically with a lease, so several app instances can share
+    one outbox and an email claimed by a process that died is picked up again once
+    its lease expires. Failed deliveries are retried with exponential backoff and
+    dead-lettered after max_attempts. An email to a recipient the outbox already sent
+    an email to within recipient_cooldown_seconds is deferred until the window ends,
+    whichever instance sent it and even across restarts.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_seconds: float,
+        max_attempts: int,
+        retry_base_seconds: float,
+        lease_seconds: float,
+        recipient_cooldown_seconds: float = 0,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.recipient_cooldown_seconds = recipient_cooldown_seconds
+        self.sent = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.deferred = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                batch = await self._claim_batch()
+            except Exception as e:
+                logger.error(f"❌ Failed to read the email outbox: {str(e)}")
+                batch = []
+
+            if batch:
+                await asyncio.gather(*(self._deliver(email) for email in batch))
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim_batch(self) -> List[Dict[str, Any]]:
+        collection = OutboxEmail.get_motor_collection()
+        now = datetime.utcnow()
+        batch = []
+        for _ in range(self.batch_size):
+            email = await collection.find_one_and_update(
+                {
+                    "$or": [
+                        {
+                            "status": OutboxEmailStatus.PENDING.value,
+                            "next_attempt_at": {"$lte": now},
+                        },
+                        # Claimed by a process that stopped before finishing
+                        {
+                            "status": OutboxEmailStatus.SENDING.value,
+                            "locked_until": {"$lte": now},
+                        },
+                    ]
+                },
+                {
+                    "$set": {
+                        "status": OutboxEmailStatus.SENDING.value,
+                        "locked_until": now + timedelta(seconds=self.lease_seconds),
+                        "updated_at": now,
+                    }
+                },
+                sort=[("next_attempt_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if email is None:
+                break
+            batch.append(email)
+        return batch
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(
+            self.retry_base_seconds * 2 ** (attempts - 1), MAX_RETRY_DELAY_SECONDS
+        )
+
+    async def _renew_lease(self, email_id: Any) -> None:
+        """Extend the claim on an email every third of the lease until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            now = datetime.utcnow()
+            try:
+                await OutboxEmail.get_motor_collection().update_one(
+                    {"_id": email_id, "status": OutboxEmailStatus.SENDING.value},
+                    {
+                        "$set": {
+                            "locked_until": now + timedelta(seconds=self.lease_seconds),
+                            "updated_at": now,
+                        }
+                    },
+                )
+            except Exception as e:
+                logger.warning(
+                    f"⚠️ Failed to renew the lease of email {email_id}: {str(e)}"
+                )
+
+    async def _send_holding_lease(self, email: Dict[str, Any]) -> None:
+        """Deliver an email, renewing its lease so a long governor wait does not let
+        another dispatcher claim and send it again"""
+        renewal = asyncio.create_task(self._renew_lease(email["_id"]))
+        try:
+            await deliver_email(email["to_email"], email["subject"], email["body"])
+        finally:
+            renewal.cancel()
+
+    async def _check_recipient_cooldown(self, email: Dict[str, Any]) -> None:
+        """Raise RecipientCooldownError when the outbox sent the recipient another email
+        within the cooldown window"""
+        if self.recipient_cooldown_seconds <= 0:
+            return
+        now = datetime.utcnow()
+        recipient = email.get("to_email_normalized") or normalize_recipient(
+            email["to_email"]
+        )
+        last_sent = await OutboxEmail.get_motor_collection().find_one(
+            {
+                "to_email_normalized": recipient,
+                "status": OutboxEmailStatus.SENT.value,
+                "sent_at": {
+                    "$gt": now - timedelta(seconds=self.recipient_cooldown_seconds)
+                },
+                "_id": {"$ne": email["_id"]},
+            },
+            projection={"sent_at": 1},
+            sort=[("sent_at", DESCENDING)],
+        )
+        if last_sent is not None:
+            elapsed = (now - last_sent["sent_at"]).total_seconds()
+            raise RecipientCooldownError(
+                email["to_email"], self.recipient_cooldown_seconds - elapsed
+            )
+
+    @staticmethod
+    def _review_filter(email: Dict[str, Any]) -> Dict[str, Any]:
+        """The customer's review, as long as it still has the text the email answers"""
+        review_filter = {"customer_email": email["to_email"]}
+        # Emails queued before the hash was stored match the customer's review
+        if email.get("review_text_hash"):
+            review_filter["review_text_hash"] = email["review_text_hash"]
+        return review_filter
+
+    async def _review_pending(self, email: Dict[str, Any]) -> bool:
+        """Whether the email is recent and the review it answers is not saved yet"""
+        if datetime.utcnow() - email["created_at"] >= timedelta(
+            seconds=REVIEW_WAIT_MAX_SECONDS
+        ):
+            return False
+        review = await Review.get_motor_collection().find_one(
+            self._review_filter(email), projection={"_id": 1}
+        )
+        return review is None
+
+    async def _deliver(self, email: Dict[str, Any]) -> None:
+        attempts = email["attempts"] + 1
+        try:
+            if await self._review_pending(email):
+                now = datetime.utcnow()
+                await OutboxEmail.get_motor_collection().update_one(
+                    {"_id": email["_id"]},
+                    {
+                        "$set": {
+                            "status": OutboxEmailStatus.PENDING.value,
+                            "next_attempt_at": now
+                            + timedelta(seconds=REVIEW_WAIT_SECONDS),
+                            "locked_until": None,
+                            "updated_at": now,
+                        }
+                    },
+                )
+                return
+        except Exception as e:
+            # Deliver anyway; only the review's email_sent flag depends on the wait
+            logger.warning(
+                f"⚠️ Could not check the review of email {email['_id']}: {str(e)}"
+            )
+
+        try:
+            # The governor's own cooldown only knows the sends of this process
+            await self._check_recipient_cooldown(email)
+            await self._send_holding_lease(email)
+        except RecipientCooldownError as e:
+            # Not a failed attempt: requeue for when the recipient's cooldown ends
+            now = datetime.utcnow()
+            update = {
+                "status": OutboxEmailStatus.PENDING.value,
+                "next_attempt_at": now + timedelta(seconds=e.retry_after),
+                "locked_until": None,
+                "updated_at": now,
+            }
+            self.deferred += 1
+            logger.info(
+                f"⏳ Email to {email['to_email']} deferred for {e.retry_after:.0f}s "
+                "by recipient cooldown"
+            )
+        except Exception as e:
+            now = datetime.utcnow()
+            update = {
+                "attempts": attempts,
+                "last_error": str(e),
+                "locked_until": None,
+                "updated_at": now,
+            }
+            if attempts >= self.max_attempts:
+                update["status"] = OutboxEmailStatus.DEAD_LETTER.value
+                self.dead_lettered += 1
+                logger.error(
+                    f"💀 Email to {email['to_email']} dead-lettered after {attempts} "
+                    f"attempts: {str(e)}"
+                )
+            else:
+                delay = self._retry_delay(attempts)
+                update["status"] = OutboxEmailStatus.PENDING.value
+                update["next_attempt_at"] = now + timedelta(seconds=delay)
+                self.retried += 1
+                logger.warning(
+                    f"⚠️ Email to {email['to_email']} failed (attempt {attempts}), "
+                    f"retrying in {delay:.0f}s: {str(e)}"
+                )
+        else:
+            now = datetime.utcnow()
+            update = {
+                "status": OutboxEmailStatus.SENT.value,
+                "attempts": attempts,
+                "last_error": None,
+                "locked_until": None,
+                "sent_at": now,
+                "updated_at": now,
+            }
+            self.sent += 1
+
+        try:
+            await OutboxEmail.get_motor_collection().update_one(
+                {"_id": email["_id"]}, {"$set": update}
+            )
+        except Exception as e:
+            # The lease expires and the email is claimed again
+            logger.error(
+                f"❌ Failed to record delivery of email {email['_id']}: {str(e)}"
+            )
+
+        if update["status"] == OutboxEmailStatus.SENT.value:
+            await self._mark_review_emailed(email)
+
+    async def _mark_review_emailed(self, email: Dict[str, Any]) -> None:
+        # A review updated with new text since has its own email to wait for
+        try:
+            await Review.get_motor_collection().update_one(
+                self._review_filter(email), {"$set": {"email_sent": True}}
+            )
+        except Exception as e:
+            logger.error(
+                f"❌ Failed to mark the review of {email['to_email']} as emailed: "
+                f"{str(e)}"
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "deferred": self.deferred,
+        }
+
+
+_dispatcher: Optional[EmailOutboxDispatcher] = None
+
+
+def start_email_dispatcher() -> None:
+    """Start draining the outbox in the background"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = EmailOutboxDispatcher(
+            batch_size=settings.email_outbox_batch_size,
+            poll_seconds=settings.email_outbox_poll_seconds,
+            max_attempts=settings.email_outbox_max_attempts,
+            retry_base_seconds=settings.email_outbox_retry_base_seconds,
+            lease_seconds=settings.email_outbox_lease_seconds,
+            recipient_cooldown_seconds=settings.email_recipient_cooldown_seconds,
+        )
+        _dispatcher.start()
+        logger.info("📮 Email outbox dispatcher started")
+
+
+async def stop_email_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+        _dispatcher = None
+
+
+register_stats_collector(
+    lambda: _dispatcher.get_stats() if _dispatcher else None,
+    [
+        (
+            CounterMetricFamily,
+            "email_outbox_deliveries",
+            "Outbox delivery attempts of this process, by outcome",
+            (
+                "outcome",
+                {
+                    "sent": "sent",
+                    "retried": "retried",
+                    "dead_lettered": "dead_lettered",
+                    "deferred": "deferred",
+                },
+            ),
+        ),
+    ],
+)
+
+
+async def get_outbox_stats() -> Dict[str, Any]:
+    """Outbox emails by status, this process's dispatcher counters and send-rate
+    governor state"""
+    counts = {status.value: 0 for status in OutboxEmailStatus}
+    async for row in OutboxEmail.get_motor_collection().aggregate(
+        [
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]
+    ):
+        counts[row["_id"]] = row["count"]
+    return {
+        "emails": counts,
+        "dispatcher": _dispatcher.get_stats() if _dispatcher else None,
+        "governor": get_send_governor().get_stats(),
+    }
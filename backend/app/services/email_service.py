@@ -1,77 +1,437 @@
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional
+
+import aiosmtplib
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 
 from app.core.config import settings
+from app.services.llm_throttle import TokenBucket
+from app.services.metrics import observe_smtp_send, register_stats_collector
 
 logger = logging.getLogger(__name__)
 
+# Recipients tracked before expired cooldowns are pruned
+COOLDOWN_PRUNE_THRESHOLD = 10000
+# Recipient domains tracked before idle domain buckets are evicted
+DOMAIN_PRUNE_THRESHOLD = 1000
 
-async def send_email(
-    to_email: str,
-    subject: str,
-    body: str,
-    **kwargs
-) -> bool:
-    """Send an email using the specified template"""
-    try:
-        logger.info(f"📧 Sending email to {to_email}")
-        
-        # Create email message
-        message = MIMEMultipart()
-        message['From'] = f"{settings.from_name} <{settings.from_email}>"
-        message['To'] = to_email
-        message['Subject'] = subject    
-        
-        # Add body
-        message.attach(MIMEText(body.strip(), "plain"))
-        
-        # Send email
-        kwargs = {
-            "hostname": settings.smtp_host,
-            "port": settings.smtp_port,
-            "username": settings.smtp_user,
-            "password": settings.smtp_password,
+# Raised when the server has closed a pooled session since it was last used
+STALE_SESSION_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError)
+
+
+class RecipientCooldownError(Exception):
+    """The recipient was emailed too recently; the send should be retried after
+    retry_after seconds"""
+
+    def __init__(self, to_email: str, retry_after: float):
+        super().__init__(
+            f"{to_email} is in its cooldown window for another {retry_after:.0f}s"
+        )
+        self.to_email = to_email
+        self.retry_after = retry_after
+
+
+class SendRateGovernor:
+    """Limits outgoing email globally, per recipient domain and per recipient.
+
+    Sends wait for the global messages/sec and per-domain messages/min buckets. A
+    recipient emailed within the cooldown window raises RecipientCooldownError so the
+    caller can requeue the message. A limit of 0 disables it. The cooldown only covers
+    sends of this process; the outbox dispatcher also checks the emails it has sent.
+    """
+
+    def __init__(
+        self,
+        messages_per_second: float,
+        domain_messages_per_minute: float,
+        recipient_cooldown_seconds: float,
+    ):
+        self.global_bucket = (
+            TokenBucket(
+                messages_per_second * 60, capacity=max(1.0, messages_per_second)
+            )
+            if messages_per_second > 0
+            else None
+        )
+        self.domain_messages_per_minute = domain_messages_per_minute
+        self.recipient_cooldown_seconds = recipient_cooldown_seconds
+        self.domain_buckets: Dict[str, TokenBucket] = {}
+        self.evicted_domain_waits = 0
+        self.last_sent: Dict[str, float] = {}
+        self.waiting = 0
+        self.deferred = 0
+
+    def _domain_bucket(self, to_email: str) -> Optional[TokenBucket]:
+        if self.domain_messages_per_minute <= 0:
+            return None
+        domain = to_email.rsplit("@", 1)[-1].lower()
+        if domain not in self.domain_buckets:
+            if len(self.domain_buckets) > DOMAIN_PRUNE_THRESHOLD:
+                self._evict_idle_domains()
+            self.domain_buckets[domain] = TokenBucket(
+                self.domain_messages_per_minute,
+                capacity=max(1.0, self.domain_messages_per_minute / 60),
+            )
+        return self.domain_buckets[domain]
+
+    def _evict_idle_domains(self) -> None:
+        for domain, bucket in list(self.domain_buckets.items()):
+            if bucket.is_idle():
+                self.evicted_domain_waits += bucket.waits
+                del self.domain_buckets[domain]
+
+    def _check_cooldown(self, to_email: str) -> None:
+        if self.recipient_cooldown_seconds <= 0:
+            return
+        now = time.monotonic()
+        if len(self.last_sent) > COOLDOWN_PRUNE_THRESHOLD:
+            self.last_sent = {
+                recipient: sent
+                for recipient, sent in self.last_sent.items()
+                if now - sent < self.recipient_cooldown_seconds
+            }
+        recipient = to_email.lower()
+        last_sent = self.last_sent.get(recipient)
+        if last_sent is not None and now - last_sent < self.recipient_cooldown_seconds:
+            self.deferred += 1
+            raise RecipientCooldownError(
+                to_email, self.recipient_cooldown_seconds - (now - last_sent)
+            )
+        # Claimed before waiting, so concurrent sends to the recipient are deferred too
+        self.last_sent[recipient] = now
+
+    async def acquire(self, to_email: str) -> None:
+        """Wait until a message to to_email may be sent"""
+        self._check_cooldown(to_email)
+        self.waiting += 1
+        try:
+            if self.global_bucket:
+                await self.global_bucket.acquire(1)
+            domain_bucket = self._domain_bucket(to_email)
+            if domain_bucket:
+                await domain_bucket.acquire(1)
+        except BaseException:
+            # Nothing was sent, e.g. the wait was cancelled at shutdown
+            self.release(to_email)
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self, to_email: str) -> None:
+        """Clear the cooldown claimed for a failed send, so its retry is not deferred"""
+        self.last_sent.pop(to_email.lower(), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "messages_per_second": self.global_bucket.rate
+            if self.global_bucket
+            else None,
+            "global_tokens_available": self.global_bucket.available()
+            if self.global_bucket
+            else None,
+            "global_waits": self.global_bucket.waits if self.global_bucket else 0,
+            "domain_messages_per_minute": self.domain_messages_per_minute or None,
+            "domains_tracked": len(self.domain_buckets),
+            "domain_waits": self.evicted_domain_waits
+            + sum(bucket.waits for bucket in self.domain_buckets.values()),
+            "waiting": self.waiting,
+            "recipient_cooldown_seconds": self.recipient_cooldown_seconds or None,
+            "recipients_in_cooldown": sum(
+                1
+                for sent in self.last_sent.values()
+                if now - sent < self.recipient_cooldown_seconds
+            ),
+            "deferred": self.deferred,
         }
+
+
+_send_governor: Optional[SendRateGovernor] = None
+
+
+def get_send_governor() -> SendRateGovernor:
+    """Get or create the rate governor shared by all sends"""
+    global _send_governor
+    if _send_governor is None:
+        _send_governor = SendRateGovernor(
+            messages_per_second=settings.email_messages_per_second,
+            domain_messages_per_minute=settings.email_domain_messages_per_minute,
+            recipient_cooldown_seconds=settings.email_recipient_cooldown_seconds,
+        )
+    return _send_governor
+
+
+register_stats_collector(
+    lambda: get_send_governor().get_stats(),
+    [
+        (
+            GaugeMetricFamily,
+            "email_governor_waiting",
+            "Sends waiting for a rate-limit bucket",
+            "waiting",
+        ),
+        (
+            CounterMetricFamily,
+            "email_governor_deferred",
+            "Sends deferred by this process's recipient cooldown",
+            "deferred",
+        ),
+        (
+            GaugeMetricFamily,
+            "email_recipients_in_cooldown",
+            "Recipients emailed by this process within the cooldown",
+            "recipients_in_cooldown",
+        ),
+        (
+            GaugeMetricFamily,
+            "email_governor_domains_tracked",
+            "Recipient domains with a rate-limit bucket",
+            "domains_tracked",
+        ),
+        (
+            GaugeMetricFamily,
+            "email_global_tokens_available",
+            "Tokens left in the global send bucket",
+            "global_tokens_available",
+        ),
+        (
+            CounterMetricFamily,
+            "email_rate_limit_waits",
+            "Sends that waited for a rate-limit bucket",
+            ("scope", {"global": "global_waits", "domain": "domain_waits"}),
+        ),
+    ],
+)
+
+
+class PooledSMTPConnection:
+    """An authenticated SMTP session with its usage counters"""
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """Pool of persistent, authenticated SMTP sessions reused across messages.
+
+    Sessions idle for longer than idle_check_seconds are checked with NOOP before reuse
+    and replaced when stale. A message that fails because the server closed a reused
+    session is sent again once on a new session. A session is closed after
+    max_messages_per_connection messages, the usual per-connection limit of SMTP
+    providers.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str],
+        password: Optional[str],
+        size: int,
+        max_messages_per_connection: int,
+        idle_check_seconds: float,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = max(1, size)
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_check_seconds = idle_check_seconds
+        self.connections_opened = 0
+        self.reconnects = 0
+        self.messages_sent = 0
+        self._idle: List[PooledSMTPConnection] = []
+        self._in_use = 0
+        self._slots = asyncio.Semaphore(self.size)
+
+    async def _connect(self) -> PooledSMTPConnection:
         # Use direct TLS for port 465, STARTTLS for 587
-        if settings.smtp_port == 465:
-            kwargs["use_tls"] = True
-        elif settings.smtp_port == 587:
-            kwargs["start_tls"] = True
-
-        await aiosmtplib.send(message, **kwargs)
-        
-        logger.info(f"✅ Email sent to {to_email}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"❌ Failed to send email: {str(e)}")
-        return False
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.port == 465,
+            start_tls=True if self.port == 587 else None,
+        )
+        await client.connect()
+        connection = PooledSMTPConnection(client)
+        if self.username:
+            try:
+                await client.login(self.username, self.password)
+            except BaseException:
+                # Otherwise every failed login leaves an open socket behind
+                await self._discard(connection)
+                raise
+        self.connections_opened += 1
+        return connection
+
+    async def _is_healthy(self, connection: PooledSMTPConnection) -> bool:
+        if not connection.client.is_connected:
+            return False
+        if time.monotonic() - connection.last_used < self.idle_check_seconds:
+            return True
+        try:
+            await connection.client.noop()
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, connection: PooledSMTPConnection) -> None:
+        try:
+            await connection.client.quit()
+        except Exception:
+            connection.client.close()
+
+    @asynccontextmanager
+    async def connection(self, fresh: bool = False):
+        """Hold a healthy session for sending, returning it to the pool afterwards.
+        With fresh=True a new session is opened instead of reusing an idle one."""
+        async with self._slots:
+            connection = None
+            while not fresh and self._idle and connection is None:
+                candidate = self._idle.pop()
+                if await self._is_healthy(candidate):
+                    connection = candidate
+                else:
+                    self.reconnects += 1
+                    await self._discard(candidate)
+            if connection is None:
+                connection = await self._connect()
+
+            self._in_use += 1
+            try:
+                yield connection
+            except BaseException:
+                # The session state is unknown after a failed command
+                await self._discard(connection)
+                raise
+            else:
+                connection.last_used = time.monotonic()
+                if connection.messages_sent >= self.max_messages_per_connection > 0:
+                    await self._discard(connection)
+                else:
+                    self._idle.append(connection)
+            finally:
+                self._in_use -= 1
+
+    async def send_message(self, message: Message) -> None:
+        """Send a message, retrying once on a new session if a reused one was closed by
+        the server"""
+        reused = False
+        try:
+            async with self.connection() as connection:
+                reused = connection.messages_sent > 0
+                await self._send(connection, message)
+        except STALE_SESSION_ERRORS:
+            # Reused within idle_check_seconds, so it was not checked with NOOP first
+            if not reused:
+                raise
+            self.reconnects += 1
+            async with self.connection(fresh=True) as connection:
+                await self._send(connection, message)
+
+    async def _send(self, connection: PooledSMTPConnection, message: Message) -> None:
+        await connection.client.send_message(message)
+        connection.messages_sent += 1
+        self.messages_sent += 1
+
+    async def close(self) -> None:
+        """Quit all idle sessions"""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "connections_opened": self.connections_opened,
+            "reconnects": self.reconnects,
+            "messages_sent": self.messages_sent,
+        }
+
+
+_smtp_pool: Optional[SMTPConnectionPool] = None
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Get or create the SMTP connection pool shared by all sends"""
+    global _smtp_pool
+    if _smtp_pool is None:
+        _smtp_pool = SMTPConnectionPool(
+            hostname=settings.smtp_host,
+            port=settings.smtp_port,
+            username=settings.smtp_user,
+            password=settings.smtp_password,
+            size=settings.smtp_pool_size,
+            max_messages_per_connection=settings.smtp_max_messages_per_connection,
+            idle_check_seconds=settings.smtp_idle_check_seconds,
+        )
+    return _smtp_pool
+
+
+async def close_smtp_pool() -> None:
+    if _smtp_pool is not None:
+        await _smtp_pool.close()
+
+
+async def deliver_email(to_email: str, subject: str, body: str) -> None:
+    """Send an email, raising if it fails or RecipientCooldownError if it must wait"""
+    governor = get_send_governor()
+    await governor.acquire(to_email)
+
+    logger.info(f"📧 Sending email to {to_email}")
+
+    # Create email message
+    message = MIMEMultipart()
+    message["From"] = f"{settings.from_name} <{settings.from_email}>"
+    message["To"] = to_email
+    message["Subject"] = subject
+
+    # Add body
+    message.attach(MIMEText(body.strip(), "plain"))
+
+    # Send email over a pooled session
+    started = time.perf_counter()
+    try:
+        await get_smtp_pool().send_message(message)
+    except BaseException:
+        observe_smtp_send("error", time.perf_counter() - started)
+        governor.release(to_email)
+        raise
+    observe_smtp_send("ok", time.perf_counter() - started)
+
+    logger.info(f"✅ Email sent to {to_email}")
 
 
 async def test_email_connection() -> bool:
     """Test SMTP connection"""
     try:
-        
         # Use direct TLS for port 465, STARTTLS for 587
         use_tls = settings.smtp_port == 465
-        
+
         server = aiosmtplib.SMTP(
-            hostname=settings.smtp_host, 
-            port=settings.smtp_port, 
-            use_tls=use_tls
+            hostname=settings.smtp_host, port=settings.smtp_port, use_tls=use_tls
         )
         await server.connect()
-        
+
         # If not using direct TLS, we need to upgrade the connection
         if not use_tls:
             await server.starttls()
-            
+
         await server.login(settings.smtp_user, settings.smtp_password)
         await server.quit()
         logger.info("✅ SMTP connection test successful")
         return True
     except Exception as e:
         logger.error(f"❌ SMTP connection test failed: {str(e)}")
-        return False 
\ No newline at end of file
+        return False
@@ -1,211 +1,867 @@
-import pandas as pd
+import asyncio
 import io
-from typing import List, Dict, Any, Optional
-from fastapi import UploadFile, HTTPException
 import logging
-from datetime import datetime
 import re
-from functools import lru_cache
+import time
+from datetime import datetime
+from functools import lru_cache, partial
+from itertools import islice
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
-from app.services.review_service import create_and_process_review
+import openpyxl
+import pandas as pd
+from fastapi import HTTPException, UploadFile
+
+from app.agents.review_agent import analyze_reviews_batch, pack_review_batches
+from app.core.config import settings
+from app.models.review import Review
+from app.services.metrics import observe_upload_throughput, record_upload_row
+from app.services.review_service import (
+    create_and_process_review,
+    create_review_write_buffer,
+    is_review_unchanged,
+    prefetch_existing_reviews,
+)
 
 logger = logging.getLogger(__name__)
 
 # Configuration constants
-SUPPORTED_EXTENSIONS = ['.xlsx', '.xls', '.csv']
+SUPPORTED_EXTENSIONS = [".xlsx", ".xls", ".csv"]
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_ROWS = 1000
+ROW_QUEUE_SIZE_PER_WORKER = 4  # Validated rows read ahead of the processing workers
+
+DUPLICATE_POLICIES = ("last", "first", "concatenate")
+CONCATENATED_REVIEW_SEPARATOR = "\n\n"
+
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
 
 
 @lru_cache(maxsize=1)
 def get_file_config() -> Dict[str, Any]:
     """Get file processing configuration"""
     return {
-        'supported_extensions': SUPPORTED_EXTENSIONS,
-        'max_file_size': MAX_FILE_SIZE,
-        'required_columns': ['customer_name', 'customer_email', 'review']
+        "supported_extensions": SUPPORTED_EXTENSIONS,
+        "max_file_size": MAX_FILE_SIZE,
+        # CSV and XLSX files are parsed in chunks
+        "max_streamed_file_size": settings.upload_max_file_size_mb * 1024 * 1024,
+        "required_columns": ["customer_name", "customer_email", "review"],
     }
 
 
+def is_streamed_file(filename: str) -> bool:
+    """Whether a file is parsed in chunks rather than loaded whole"""
+    return filename.lower().endswith((".csv", ".xlsx"))
+
+
+def get_max_file_size(filename: str) -> int:
+    config = get_file_config()
+    return (
+        config["max_streamed_file_size"]
+        if is_streamed_file(filename)
+        else config["max_file_size"]
+    )
+
+
+def file_too_large_error(filename: str) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=(
+            "File size too large. Maximum size: "
+            f"{get_max_file_size(filename) / (1024*1024):.1f}MB"
+        ),
+    )
+
+
 async def validate_file(file: UploadFile) -> bool:
     """Validate uploaded file"""
     config = get_file_config()
-    
+
     # Check file extension
-    if not any(file.filename.lower().endswith(ext) for ext in config['supported_extensions']):
+    if not any(
+        file.filename.lower().endswith(ext) for ext in config["supported_extensions"]
+    ):
         raise HTTPException(
-            status_code=400, 
-            detail=f"Unsupported file type. Supported types: {', '.join(config['supported_extensions'])}"
+            status_code=400,
+            detail=(
+                "Unsupported file type. Supported types: "
+                f"{', '.join(config['supported_extensions'])}"
+            ),
         )
-    
+
     # Check file size
-    if file.size and file.size > config['max_file_size']:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"File size too large. Maximum size: {config['max_file_size'] / (1024*1024):.1f}MB"
-        )
-    
+    if file.size and file.size > get_max_file_size(file.filename):
+        raise file_too_large_error(file.filename)
+
     return True
 
 
 def validate_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_PATTERN.fullmatch(email) is not None
 
 
-async def parse_excel_file(file: UploadFile) -> pd.DataFrame:
-    """Parse Excel file and return DataFrame"""
-    try:
-        content = await file.read()
-        
-        # Parse based on file type
-        if file.filename.lower().endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(content))
+def clean_column(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Stripped string values of a column and a mask of the missing ones"""
+    cleaned = values.astype(str).str.strip()
+    return cleaned, values.isna() | (cleaned == "") | (cleaned == "nan")
+
+
+def validate_review_rows(
+    chunk: pd.DataFrame,
+    column_mapping: Dict[str, Any],
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Tuple[int, str]]]:
+    """Split upload rows into valid rows and (index, error message) pairs, vectorized"""
+    # Extract data using column mapping
+    names, missing_name = clean_column(chunk[column_mapping["customer_name"]])
+    emails, missing_email = clean_column(chunk[column_mapping["customer_email"]])
+    reviews, missing_review = clean_column(chunk[column_mapping["review"]])
+    invalid_email = ~emails.str.fullmatch(EMAIL_PATTERN)
+
+    rejected = missing_name | missing_email | missing_review | invalid_email
+
+    # Report the first failing check of each row, in the order they were always checked
+    errors = []
+    for index in chunk.index[rejected]:
+        if missing_name.at[index]:
+            errors.append((index, f"Row {index + 1}: Missing customer name"))
+        elif missing_email.at[index]:
+            errors.append((index, f"Row {index + 1}: Missing customer email"))
+        elif missing_review.at[index]:
+            errors.append((index, f"Row {index + 1}: Missing review text"))
         else:
-            df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
-        
-        return df
-    
-    except Exception as e:
-        logger.error(f"Failed to parse file {file.filename}: {str(e)}")
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Failed to parse file: {str(e)}"
+            errors.append(
+                (index, f"Row {index + 1}: Invalid email format: {emails.at[index]}")
+            )
+
+    accepted = ~rejected
+    valid_rows = [
+        (
+            index,
+            {
+                "customer_name": customer_name,
+                "customer_email": customer_email,
+                "review_text": review_text,
+            },
+        )
+        for index, customer_name, customer_email, review_text in zip(
+            chunk.index[accepted], names[accepted], emails[accepted], reviews[accepted]
+        )
+    ]
+
+    return valid_rows, errors
+
+
+def take_upload_stream(file: UploadFile) -> BinaryIO:
+    """Take over the spooled file behind an upload instead of copying it.
+
+    The request closes its UploadFile once the endpoint returns, while streamed
+    and background processing keep reading rows after that, so an empty buffer is
+    left in its place. The caller must close the returned file.
+    """
+    stream = file.file
+    stream.seek(0, io.SEEK_END)
+    if stream.tell() > get_max_file_size(file.filename):
+        raise file_too_large_error(file.filename)
+    stream.seek(0)
+    file.file = io.BytesIO()
+    return stream
+
+
+async def parse_excel_file(stream) -> pd.DataFrame:
+    """Parse an Excel workbook and return DataFrame"""
+    return await asyncio.to_thread(pd.read_excel, stream, engine="openpyxl")
+
+
+def read_csv_header(stream) -> pd.Index:
+    """Column names of a CSV file"""
+    stream.seek(0)
+    columns = pd.read_csv(stream, nrows=0).columns
+    stream.seek(0)
+    return columns
+
+
+async def iter_csv_chunks(stream) -> AsyncIterator[pd.DataFrame]:
+    """Parse a CSV file UPLOAD_CHUNK_ROWS rows at a time, off the event loop"""
+    stream.seek(0)
+    reader = await asyncio.to_thread(
+        pd.read_csv, stream, dtype=str, chunksize=UPLOAD_CHUNK_ROWS
+    )
+    try:
+        while (chunk := await asyncio.to_thread(next, reader, None)) is not None:
+            chunk.columns = normalize_column_names(chunk.columns)
+            yield chunk
+    finally:
+        reader.close()
+
+
+def open_xlsx_workbook(stream) -> openpyxl.Workbook:
+    """Open a workbook in openpyxl's read-only mode.
+
+    Sheet rows are parsed lazily on every pass, but the shared strings table is
+    loaded whole here, so an upload opens its workbook once and reuses it.
+    """
+    stream.seek(0)
+    return openpyxl.load_workbook(stream, read_only=True, data_only=True)
+
+
+def read_xlsx_header(workbook: openpyxl.Workbook) -> pd.Index:
+    """Column names of a workbook's active sheet"""
+    return xlsx_column_names(
+        next(workbook.active.iter_rows(values_only=True, max_row=1), ())
+    )
+
+
+def xlsx_column_names(header: Tuple[Any, ...]) -> pd.Index:
+    """Header cells as column names, naming blank ones like pandas does"""
+    return pd.Index(
+        [
+            f"Unnamed: {position}" if value is None else str(value)
+            for position, value in enumerate(header)
+        ]
+    )
+
+
+def iter_xlsx_row_values(rows, width: int) -> Iterator[List[str]]:
+    """Sheet rows as strings, padded or cut to the header width.
+
+    Blank rows inside the data are kept, so validation reports them under their row
+    number as pd.read_excel did; a run of blank rows is only yielded once a non-blank
+    row follows it, which drops the trailing blank rows left by formatted cells.
+    """
+    blank_rows = 0
+    for row in rows:
+        if all(value is None for value in row):
+            blank_rows += 1
+            continue
+        for _ in range(blank_rows):
+            yield [""] * width
+        blank_rows = 0
+        cells = ["" if value is None else str(value) for value in row[:width]]
+        yield cells + [""] * (width - len(cells))
+
+
+def read_xlsx_rows(values: Iterator[List[str]], limit: int) -> List[List[str]]:
+    """Up to limit rows of a sheet"""
+    return list(islice(values, limit))
+
+
+async def iter_xlsx_chunks(workbook: openpyxl.Workbook) -> AsyncIterator[pd.DataFrame]:
+    """Read the active sheet of a read-only workbook UPLOAD_CHUNK_ROWS rows at a time,
+    so its rows are never all in memory. Every call is a new pass over the sheet."""
+    rows = workbook.active.iter_rows(values_only=True)
+    columns = normalize_column_names(
+        xlsx_column_names(await asyncio.to_thread(next, rows, ()))
+    )
+    values = iter_xlsx_row_values(rows, len(columns))
+    start = 0
+    while chunk := await asyncio.to_thread(read_xlsx_rows, values, UPLOAD_CHUNK_ROWS):
+        yield pd.DataFrame(
+            chunk, columns=columns, index=range(start, start + len(chunk))
         )
+        start += len(chunk)
+
+
+async def iter_dataframe_chunks(df: pd.DataFrame) -> AsyncIterator[pd.DataFrame]:
+    for start in range(0, len(df), UPLOAD_CHUNK_ROWS):
+        yield df.iloc[start : start + UPLOAD_CHUNK_ROWS]
+
+
+class ReviewUpload:
+    """A parsed upload: its row count, column mapping, emails found on several rows
+    and rows as DataFrame chunks.
+
+    Chunks keep the file's row positions as their index. close() releases the
+    uploaded file and open workbook of streamed uploads.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        total_rows: int,
+        column_mapping: Dict[str, Any],
+        duplicate_emails: Dict[str, Tuple[int, int]],
+        chunks: Callable[[], AsyncIterator[pd.DataFrame]],
+        stream: Optional[BinaryIO] = None,
+        workbook: Optional[openpyxl.Workbook] = None,
+    ):
+        self.filename = filename
+        self.total_rows = total_rows
+        self.column_mapping = column_mapping
+        self.duplicate_emails = duplicate_emails
+        self._chunks = chunks
+        self._stream = stream
+        self._workbook = workbook
+
+    def iter_chunks(self) -> AsyncIterator[pd.DataFrame]:
+        return self._chunks()
+
+    def close(self) -> None:
+        close_upload_files(self._stream, self._workbook)
+
+
+def close_upload_files(
+    stream: Optional[BinaryIO], workbook: Optional[openpyxl.Workbook]
+) -> None:
+    # Closing a workbook opened from a file object leaves the file itself open
+    if workbook is not None:
+        workbook.close()
+    if stream is not None:
+        stream.close()
+
+
+def normalize_column_names(columns: pd.Index) -> pd.Index:
+    """Normalize column names (handle different cases and spaces)"""
+    return columns.str.strip().str.lower().str.replace(" ", "_")
 
 
 def validate_dataframe_structure(df: pd.DataFrame) -> Dict[str, Any]:
     """Validate that the DataFrame has the required columns"""
+    df.columns = normalize_column_names(df.columns)
+
+    return map_required_columns(df.columns)
+
+
+def map_required_columns(columns: pd.Index) -> Dict[str, Any]:
+    """Map each required column to a normalized file column, raising if one is absent"""
     config = get_file_config()
-    required_columns = config['required_columns']
-    
-    # Normalize column names (handle different cases and spaces)
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    
+    required_columns = config["required_columns"]
+
     # Check for required columns
     missing_columns = []
     column_mapping = {}
-    
+
     for col in required_columns:
         found = False
-        for df_col in df.columns:
+        for df_col in columns:
             # Flexible matching for common variations
             if col in df_col or df_col in col:
                 column_mapping[col] = df_col
                 found = True
                 break
             # Handle specific variations
-            elif col == 'customer_name' and any(x in df_col for x in ['name', 'customer']):
+            elif col == "customer_name" and any(
+                x in df_col for x in ["name", "customer"]
+            ):
                 column_mapping[col] = df_col
                 found = True
                 break
-            elif col == 'customer_email' and any(x in df_col for x in ['email', 'mail']):
+            elif col == "customer_email" and any(
+                x in df_col for x in ["email", "mail"]
+            ):
                 column_mapping[col] = df_col
                 found = True
                 break
-            elif col == 'review' and any(x in df_col for x in ['review', 'comment', 'feedback']):
+            elif col == "review" and any(
+                x in df_col for x in ["review", "comment", "feedback"]
+            ):
                 column_mapping[col] = df_col
                 found = True
                 break
-        
+
         if not found:
             missing_columns.append(col)
-    
+
     if missing_columns:
         raise HTTPException(
             status_code=400,
             detail=f"Missing required columns: {', '.join(missing_columns)}. "
-                   f"Required columns: customer_name, customer_email, review. "
-                   f"Found columns: {', '.join(df.columns)}"
+            f"Required columns: customer_name, customer_email, review. "
+            f"Found columns: {', '.join(columns)}",
         )
-    
+
     return column_mapping
 
 
+# Awaited with (index, review_result, error, duplicate) as each row completes:
+# review_result for a processed row, error for a rejected or failed one and duplicate,
+# the message of a row collapsed into another row with the same email; the other two are
+# None
+RowCallback = Callable[
+    [int, Optional[Dict[str, Any]], Optional[str], Optional[str]], Awaitable[None]
+]
+
+
+def new_upload_results(total_rows: int) -> Dict[str, Any]:
+    """Empty aggregated results for an upload"""
+    return {
+        "total_rows": total_rows,
+        "processed": 0,
+        "errors": [],
+        "reviews_created": [],
+        "duplicates": [],
+        "save_errors": [],
+        "unchanged": 0,
+        "emails_queued": 0,
+        # Same as emails_queued, under the key clients read before emails went through
+        # the outbox
+        "emails_sent": 0,
+        "sentiment_summary": {"positive": 0, "negative": 0, "neutral": 0},
+    }
+
+
+def record_review_counts(
+    results: Dict[str, Any], review_result: Dict[str, Any]
+) -> None:
+    """Add a processed review to the aggregated upload counters"""
+    results["processed"] += 1
+
+    if review_result.get("unchanged"):
+        results["unchanged"] += 1
+
+    if review_result["email_queued"]:
+        results["emails_queued"] += 1
+        results["emails_sent"] += 1
+
+    if review_result["analysis"]["sentiment"] == "negative":
+        results["sentiment_summary"]["negative"] += 1
+    elif review_result["analysis"]["sentiment"] == "positive":
+        results["sentiment_summary"]["positive"] += 1
+    else:
+        results["sentiment_summary"]["neutral"] += 1
+
+
+async def process_rows_concurrently(
+    rows: AsyncIterator[Tuple[int, Dict[str, Any]]],
+    concurrency: int,
+    on_row_complete: RowCallback,
+    queue_size: int = 0,
+) -> None:
+    """Run create_and_process_review for each row through a bounded worker pool.
+
+    Rows are pulled from the iterator only as the workers keep up, at most queue_size
+    ahead of them. on_row_complete is awaited with (index, review_result, error_message,
+    duplicate) as each row finishes; duplicate is always None here, since rows are
+    collapsed before they reach the workers.
+    """
+    worker_count = max(1, concurrency)
+    queue: asyncio.Queue = asyncio.Queue(
+        maxsize=max(queue_size, worker_count * ROW_QUEUE_SIZE_PER_WORKER)
+    )
+
+    async def produce():
+        async for row in rows:
+            await queue.put(row)
+        for _ in range(worker_count):
+            await queue.put(None)
+
+    async def worker():
+        while (row := await queue.get()) is not None:
+            index, row_data = row
+            try:
+                review_result = await create_and_process_review(**row_data)
+            except Exception as row_error:
+                logger.error(f"Failed to process row {index + 1}: {str(row_error)}")
+                await on_row_complete(
+                    index, None, f"Row {index + 1}: {str(row_error)}", None
+                )
+            else:
+                await on_row_complete(index, review_result, None, None)
+
+    tasks = [asyncio.create_task(produce())]
+    tasks += [asyncio.create_task(worker()) for _ in range(worker_count)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def get_duplicate_policy() -> str:
+    policy = settings.upload_duplicate_policy
+    if policy not in DUPLICATE_POLICIES:
+        logger.warning(f"⚠️ Unknown upload duplicate policy '{policy}', using 'last'")
+        return "last"
+    return policy
+
+
+async def scan_upload_rows(
+    chunks: AsyncIterator[pd.DataFrame],
+    column_mapping: Dict[str, Any],
+) -> Tuple[int, Dict[str, Tuple[int, int]]]:
+    """Row count of an upload, and the first and last row index of every normalized
+    email found on more than one valid row, collected in one pass"""
+    total_rows = 0
+    occurrences: Dict[str, List[int]] = {}
+    async for chunk in chunks:
+        total_rows += len(chunk)
+        chunk_rows, _ = validate_review_rows(chunk, column_mapping)
+        for index, row_data in chunk_rows:
+            email = normalize_email(row_data["customer_email"])
+            seen = occurrences.get(email)
+            if seen is None:
+                occurrences[email] = [index, index, 1]
+            else:
+                seen[1] = index
+                seen[2] += 1
+
+    return total_rows, {
+        email: (first, last)
+        for email, (first, last, count) in occurrences.items()
+        if count > 1
+    }
+
+
+async def analyze_rows_in_batches(
+    rows: List[Tuple[int, Dict[str, Any]]],
+    concurrency: int,
+) -> Dict[int, Dict[str, Any]]:
+    """Analyze rows with multi-review LLM requests, returning analysis fields by row"""
+    reviews = [
+        {
+            "row_id": str(index),
+            "customer_name": row_data["customer_name"],
+            "customer_email": row_data["customer_email"],
+            "review_text": row_data["review_text"],
+        }
+        for index, row_data in rows
+    ]
+    batches = pack_review_batches(
+        reviews, settings.upload_batch_size, settings.upload_batch_token_budget
+    )
+    logger.info(f"📦 Packed {len(reviews)} rows into {len(batches)} analysis batches")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(batch):
+        async with semaphore:
+            return await analyze_reviews_batch(batch)
+
+    analyses: Dict[int, Dict[str, Any]] = {}
+    for batch_result in await asyncio.gather(*(run(batch) for batch in batches)):
+        for row_id, analysis in batch_result.items():
+            analyses[int(row_id)] = analysis
+    return analyses
+
+
+async def open_upload(file: UploadFile) -> ReviewUpload:
+    """Validate an uploaded file and map its header columns, without reading its rows.
+
+    CSV and XLSX files are streamed: total_rows and duplicate_emails stay empty until
+    scan_upload() makes a first pass over the rows, and processing makes a second one.
+    An XLSX workbook is opened once for both passes. The caller must close() the upload.
+    """
+    await validate_file(file)
+
+    stream = take_upload_stream(file)
+    workbook = None
+    try:
+        try:
+            if file.filename.lower().endswith(".csv"):
+                columns = await asyncio.to_thread(read_csv_header, stream)
+                chunks = partial(iter_csv_chunks, stream)
+            elif file.filename.lower().endswith(".xlsx"):
+                workbook = await asyncio.to_thread(open_xlsx_workbook, stream)
+                columns = await asyncio.to_thread(read_xlsx_header, workbook)
+                chunks = partial(iter_xlsx_chunks, workbook)
+            else:
+                df = await parse_excel_file(stream)
+                stream.close()
+                stream = None
+                df.columns = normalize_column_names(df.columns)
+                columns = df.columns
+                chunks = partial(iter_dataframe_chunks, df)
+
+            column_mapping = map_required_columns(normalize_column_names(columns))
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to parse file {file.filename}: {str(e)}")
+            raise HTTPException(
+                status_code=400, detail=f"Failed to parse file: {str(e)}"
+            )
+    except BaseException:
+        close_upload_files(stream, workbook)
+        raise
+
+    return ReviewUpload(file.filename, 0, column_mapping, {}, chunks, stream, workbook)
+
+
+async def scan_upload(upload: ReviewUpload) -> None:
+    """Count the rows of an opened upload and find emails shared by several rows"""
+    try:
+        total_rows, duplicate_emails = await scan_upload_rows(
+            upload.iter_chunks(), upload.column_mapping
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to parse file {upload.filename}: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
+
+    if total_rows == 0:
+        raise HTTPException(status_code=400, detail="Excel file is empty")
+
+    upload.total_rows = total_rows
+    upload.duplicate_emails = duplicate_emails
+    logger.info(f"📊 Found {total_rows} rows in Excel file")
+
+
+async def load_upload(file: UploadFile) -> ReviewUpload:
+    """Validate and parse an uploaded file, with its rows counted. The caller must
+    close() the upload."""
+    upload = await open_upload(file)
+    try:
+        await scan_upload(upload)
+    except BaseException:
+        upload.close()
+        raise
+    return upload
+
+
+async def process_review_rows(
+    upload: ReviewUpload,
+    results: Optional[Dict[str, Any]] = None,
+    on_row_complete: Optional[RowCallback] = None,
+    collect_reviews: bool = True,
+) -> Dict[str, Any]:
+    """Validate and process every row of an upload, aggregating the results.
+
+    Rows are read chunk by chunk and validated as the processing workers keep up.
+    Rows sharing a customer email are collapsed first according to the upload duplicate
+    policy, so only one row per email is analyzed and emailed.
+    Counters in results are updated as rows complete, and on_row_complete is awaited for
+    every row, including rows rejected by validation or collapsed as duplicates. With
+    collect_reviews=False the per-row review results are not kept in memory.
+
+    Reviews are saved through a write-behind buffer that is flushed before returning;
+    reviews that failed to save are listed in results['save_errors'].
+    """
+    results = results if results is not None else new_upload_results(upload.total_rows)
+    column_mapping = upload.column_mapping
+
+    # Validation errors and processing outcomes are keyed by row index so
+    # reviews_created and the error list keep file order regardless of completion order
+    row_errors: Dict[int, str] = {}
+    row_duplicates: Dict[int, str] = {}
+    reviews_by_index: Dict[int, Dict[str, Any]] = {}
+
+    # Rows waiting for their buffered write before they are reported
+    pending_rows: Set[asyncio.Task] = set()
+
+    async def complete_row(
+        index: int,
+        review_result: Optional[Dict[str, Any]],
+        error: Optional[str],
+        duplicate: Optional[str] = None,
+    ) -> None:
+        if duplicate is not None:
+            row_duplicates[index] = duplicate
+            record_upload_row("duplicate")
+        elif error is not None:
+            row_errors[index] = error
+            record_upload_row("error")
+        else:
+            record_review_counts(results, review_result)
+            record_upload_row(
+                "unchanged" if review_result.get("unchanged") else "processed"
+            )
+            if collect_reviews:
+                reviews_by_index[index] = review_result
+        if on_row_complete:
+            try:
+                await on_row_complete(index, review_result, error, duplicate)
+            except Exception as callback_error:
+                logger.error(
+                    f"Row {index + 1} completion callback failed: {str(callback_error)}"
+                )
+
+    async def complete_row_when_written(
+        index: int, review_result: Dict[str, Any], pending_write: asyncio.Task
+    ) -> None:
+        await asyncio.gather(pending_write, return_exceptions=True)
+        await complete_row(index, review_result, None)
+
+    async def handle_row(
+        index: int,
+        review_result: Optional[Dict[str, Any]],
+        error: Optional[str],
+        duplicate: Optional[str] = None,
+    ) -> None:
+        pending_write = (
+            review_result.pop("pending_write", None) if review_result else None
+        )
+        if pending_write is None:
+            await complete_row(index, review_result, error, duplicate)
+            return
+        # Whether the row created or updated a review is known once its batch is
+        # written; the worker moves on meanwhile
+        task = asyncio.create_task(
+            complete_row_when_written(index, review_result, pending_write)
+        )
+        pending_rows.add(task)
+        task.add_done_callback(pending_rows.discard)
+
+    concurrency = settings.upload_concurrency
+    # With batched analysis, rows are analyzed in windows of one batch per worker
+    batch_window = settings.upload_batch_size * max(1, concurrency)
+
+    async def prefill(
+        rows: List[Tuple[int, Dict[str, Any]]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        # Rows whose stored review already has an analysis of the same text are not
+        # re-analyzed
+        needs_analysis = [
+            (index, row_data)
+            for index, row_data in rows
+            if not (
+                row_data["existing_review"]
+                and row_data["existing_review"].review_text_hash
+                and is_review_unchanged(
+                    row_data["existing_review"],
+                    Review.hash_review_text(row_data["review_text"]),
+                )
+            )
+        ]
+        if needs_analysis:
+            analyses = await analyze_rows_in_batches(needs_analysis, concurrency)
+            for index, row_data in needs_analysis:
+                row_data["precomputed_analysis"] = analyses.get(index)
+        return rows
+
+    duplicate_policy = get_duplicate_policy()
+    duplicate_emails = upload.duplicate_emails
+    if duplicate_emails:
+        logger.info(
+            f"🔁 {len(duplicate_emails)} emails appear on several rows, "
+            f"keeping '{duplicate_policy}'"
+        )
+
+    async def valid_rows() -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        pending: List[Tuple[int, Dict[str, Any]]] = []
+        merged_reviews: Dict[str, List[str]] = {}
+
+        async for chunk in upload.iter_chunks():
+            chunk_rows, chunk_errors = validate_review_rows(chunk, column_mapping)
+
+            # Skip rows with missing essential data
+            for index, error in chunk_errors:
+                await handle_row(index, None, error)
+
+            survivors: List[Tuple[int, Dict[str, Any]]] = []
+            for index, row_data in chunk_rows:
+                email = normalize_email(row_data["customer_email"])
+                if email in duplicate_emails:
+                    first, last = duplicate_emails[email]
+                    survivor = first if duplicate_policy == "first" else last
+
+                    if duplicate_policy == "concatenate":
+                        merged_reviews.setdefault(email, []).append(
+                            row_data["review_text"]
+                        )
+                        if index == last:
+                            row_data[
+                                "review_text"
+                            ] = CONCATENATED_REVIEW_SEPARATOR.join(
+                                merged_reviews.pop(email)
+                            )
+
+                    if index != survivor:
+                        action = (
+                            "review merged into it"
+                            if duplicate_policy == "concatenate"
+                            else "skipped"
+                        )
+                        await handle_row(
+                            index,
+                            None,
+                            None,
+                            f"Row {index + 1}: Duplicate of row {survivor + 1} "
+                            f"({row_data['customer_email']}), {action}",
+                        )
+                        continue
+
+                survivors.append((index, row_data))
+
+            # One query for the stored reviews of the whole chunk instead of one per row
+            existing_reviews = await prefetch_existing_reviews(
+                [row_data["customer_email"] for _, row_data in survivors]
+            )
+
+            for index, row_data in survivors:
+                row_data["existing_review"] = existing_reviews.get(
+                    row_data["customer_email"]
+                )
+                row_data["prefetched"] = True
+                row_data["write_buffer"] = write_buffer
+
+                if not batch_window:
+                    yield index, row_data
+                    continue
+
+                pending.append((index, row_data))
+                if len(pending) >= batch_window:
+                    for item in await prefill(pending):
+                        yield item
+                    pending = []
+
+        if pending:
+            for item in await prefill(pending):
+                yield item
+
+    logger.info(
+        f"⚙️ Processing {results['total_rows']} rows with concurrency {concurrency}"
+    )
+
+    write_buffer = create_review_write_buffer()
+    started = time.perf_counter()
+    try:
+        # Create reviews in the database and process them through the complete AI +
+        # email workflow
+        await process_rows_concurrently(
+            valid_rows(), concurrency, handle_row, queue_size=batch_window
+        )
+    finally:
+        if write_buffer is not None:
+            await write_buffer.close()
+            results["save_errors"] = write_buffer.errors
+        if pending_rows:
+            await asyncio.gather(*pending_rows, return_exceptions=True)
+    observe_upload_throughput(results["total_rows"], time.perf_counter() - started)
+
+    results["reviews_created"] = [
+        reviews_by_index[index] for index in sorted(reviews_by_index)
+    ]
+    results["errors"] = [row_errors[index] for index in sorted(row_errors)]
+    results["duplicates"] = [row_duplicates[index] for index in sorted(row_duplicates)]
+
+    return results
+
+
 async def process_excel_reviews(
-    file: UploadFile, 
+    file: UploadFile,
 ) -> Dict[str, Any]:
     """Process Excel file with customer reviews"""
     try:
         logger.info(f"📁 Processing Excel file: {file.filename}")
-        
-        await validate_file(file)
-        
-        df = await parse_excel_file(file)
-        
-        if df.empty:
-            raise HTTPException(status_code=400, detail="Excel file is empty")
-        
-        logger.info(f"📊 Found {len(df)} rows in Excel file")
-        
-        column_mapping = validate_dataframe_structure(df)
-        
-        results = {
-            'total_rows': len(df),
-            'processed': 0,
-            'errors': [],
-            'reviews_created': [],
-            'emails_sent': 0,
-            'sentiment_summary': {
-                'positive': 0,
-                'negative': 0,
-                'neutral': 0
-            },
-        }
-        
-        for index, row in df.iterrows():
-            try:
-                # Extract data using column mapping
-                customer_name = str(row[column_mapping['customer_name']]).strip()
-                customer_email = str(row[column_mapping['customer_email']]).strip()
-                review_text = str(row[column_mapping['review']]).strip()
-                
-                # Skip rows with missing essential data
-                if not customer_name or customer_name == 'nan':
-                    results['errors'].append(f"Row {index + 1}: Missing customer name")
-                    continue
-                
-                if not customer_email or customer_email == 'nan':
-                    results['errors'].append(f"Row {index + 1}: Missing customer email")
-                    continue
-                
-                if not review_text or review_text == 'nan':
-                    results['errors'].append(f"Row {index + 1}: Missing review text")
-                    continue
-                
-                if not validate_email(customer_email):
-                    results['errors'].append(f"Row {index + 1}: Invalid email format: {customer_email}")
-                    continue
-                
-                # Create review in the database and process it through the complete AI + email workflow
-                review_result = await create_and_process_review(
-                    customer_name=customer_name,
-                    customer_email=customer_email,
-                    review_text=review_text,
-                )
-            
-                results['reviews_created'].append(review_result)
-                results['processed'] += 1
-
-                if review_result['email_sent']:
-                    results['emails_sent'] += 1
-                
-                if review_result['analysis']['sentiment'] == 'negative':
-                    results['sentiment_summary']['negative'] += 1
-                elif review_result['analysis']['sentiment'] == 'positive':
-                    results['sentiment_summary']['positive'] += 1
-                else:
-                    results['sentiment_summary']['neutral'] += 1
-                
-            except Exception as row_error:
-                logger.error(f"Failed to process row {index + 1}: {str(row_error)}")
-                results['errors'].append(f"Row {index + 1}: {str(row_error)}")
-                continue
-        
+
+        upload = await load_upload(file)
+        try:
+            results = await process_review_rows(upload)
+        finally:
+            upload.close()
+
         logger.info(f"✅ Processed {results['processed']} reviews from Excel file")
-        
+
         return results
-        
+
     except Exception as e:
         logger.error(f"❌ Failed to process Excel file: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from beanie.operators import In, Set
+from fastapi import HTTPException, UploadFile
+
+from app.models.upload_job import UploadJob, UploadJobResult, UploadJobStatus
+from app.services.file_service import (
+    ReviewUpload,
+    new_upload_results,
+    open_upload,
+    process_review_rows,
+    scan_upload,
+)
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes to the job document
+PROGRESS_SAVE_INTERVAL_SECONDS = 1.0
+
+# Per-row results are inserted in batches of this size, or with the next progress write
+RESULT_INSERT_BATCH_SIZE = 100
+
+# A running job refreshes its heartbeat this often; one silent for JOB_STALE_SECONDS
+# was lost with its instance (OOM, scale-in, deploy) and is marked failed
+HEARTBEAT_INTERVAL_SECONDS = 10
+JOB_STALE_SECONDS = 60
+
+# Progress streams poll the job this often and end before Cloud Run's request timeout;
+# the client reconnects with the last cursor while the job keeps running
+JOB_EVENTS_POLL_SECONDS = 1.0
+JOB_EVENTS_MAX_SECONDS = 240
+JOB_EVENTS_PAGE_SIZE = 500
+
+# Keep references so background jobs are not garbage collected mid-run
+_running_jobs: Dict[str, asyncio.Task] = {}
+
+
+def _apply_counters(job: UploadJob, results: Dict[str, Any]) -> None:
+    job.total_rows = results["total_rows"]
+    job.processed = results["processed"]
+    job.unchanged = results["unchanged"]
+    job.emails_queued = results["emails_queued"]
+    job.sentiment_summary = dict(results["sentiment_summary"])
+    job.save_errors = list(results["save_errors"])
+    job.updated_at = datetime.utcnow()
+
+
+async def run_upload_job(job: UploadJob, upload: ReviewUpload) -> None:
+    """Process an upload in the background, persisting per-row results and progress"""
+    job_id = str(job.id)
+    results = new_upload_results(0)
+    last_saved = time.monotonic()
+    saving = asyncio.Lock()
+    pending_results: List[UploadJobResult] = []
+
+    async def insert_results() -> None:
+        nonlocal pending_results
+        batch, pending_results = pending_results, []
+        if batch:
+            await UploadJobResult.insert_many(batch)
+
+    async def save_progress() -> None:
+        nonlocal last_saved
+        if (
+            saving.locked()
+            or time.monotonic() - last_saved < PROGRESS_SAVE_INTERVAL_SECONDS
+        ):
+            return
+        async with saving:
+            await insert_results()
+            _apply_counters(job, results)
+            job.heartbeat_at = datetime.utcnow()
+            await job.save()
+            last_saved = time.monotonic()
+
+    async def beat() -> None:
+        # A single row can take longer than JOB_STALE_SECONDS, so the heartbeat has its
+        # own loop
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+            job.heartbeat_at = datetime.utcnow()
+            try:
+                await UploadJob.find_one(UploadJob.id == job.id).update(
+                    Set({UploadJob.heartbeat_at: job.heartbeat_at})
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Heartbeat of upload job {job_id} failed: {str(e)}")
+
+    async def on_row_complete(
+        index: int,
+        review_result: Optional[Dict[str, Any]],
+        error: Optional[str],
+        duplicate: Optional[str],
+    ) -> None:
+        pending_results.append(
+            UploadJobResult(
+                job_id=job_id,
+                row_number=index + 1,
+                review=review_result,
+                error=error,
+                duplicate=duplicate,
+            )
+        )
+        job.rows_completed += 1
+        if error is not None:
+            job.error_count += 1
+        if duplicate is not None:
+            job.duplicate_count += 1
+        if len(pending_results) >= RESULT_INSERT_BATCH_SIZE:
+            await insert_results()
+        await save_progress()
+
+    heartbeat = asyncio.create_task(beat())
+    try:
+        logger.info(f"🏃 Starting upload job {job_id}")
+        job.status = UploadJobStatus.PROCESSING
+        job.started_at = datetime.utcnow()
+        await job.save()
+
+        # The row count is only known once the file has been read through
+        await scan_upload(upload)
+        results["total_rows"] = upload.total_rows
+        job.total_rows = upload.total_rows
+        job.updated_at = datetime.utcnow()
+        await job.save()
+
+        await process_review_rows(
+            upload,
+            results=results,
+            on_row_complete=on_row_complete,
+            collect_reviews=False,
+        )
+
+        job.status = UploadJobStatus.COMPLETED
+        logger.info(
+            f"✅ Upload job {job_id} completed: {results['processed']}/{job.total_rows} "
+            "reviews processed"
+        )
+
+    except asyncio.CancelledError:
+        job.status = UploadJobStatus.FAILED
+        job.failure_reason = "Interrupted by server shutdown"
+        logger.warning(f"⚠️ Upload job {job_id} interrupted")
+        raise
+
+    except HTTPException as e:
+        job.status = UploadJobStatus.FAILED
+        job.failure_reason = e.detail
+        logger.error(f"❌ Upload job {job_id} failed: {e.detail}")
+
+    except Exception as e:
+        job.status = UploadJobStatus.FAILED
+        job.failure_reason = str(e)
+        logger.error(f"❌ Upload job {job_id} failed: {str(e)}")
+
+    finally:
+        heartbeat.cancel()
+        upload.close()
+        async with saving:
+            try:
+                await insert_results()
+            except Exception as e:
+                logger.error(
+                    f"❌ Failed to save results of upload job {job_id}: {str(e)}"
+                )
+                if job.status == UploadJobStatus.COMPLETED:
+                    job.status = UploadJobStatus.FAILED
+                    job.failure_reason = f"Failed to save row results: {str(e)}"
+            _apply_counters(job, results)
+            job.finished_at = datetime.utcnow()
+            await job.save()
+
+
+async def create_upload_job(file: UploadFile) -> UploadJob:
+    """Validate an upload's headers, store a job for it and start processing in the
+    background.
+
+    The rows are counted by the job, which sets total_rows once it has read the whole
+    file.
+    """
+    logger.info(f"📁 Creating upload job for file: {file.filename}")
+
+    upload = await open_upload(file)
+
+    job = UploadJob(
+        filename=file.filename, total_rows=0, heartbeat_at=datetime.utcnow()
+    )
+    try:
+        await job.insert()
+    except Exception:
+        upload.close()
+        raise
+
+    job_id = str(job.id)
+    task = asyncio.create_task(run_upload_job(job, upload))
+    _running_jobs[job_id] = task
+    task.add_done_callback(lambda _: _running_jobs.pop(job_id, None))
+
+    return job
+
+
+async def fail_if_stale(job: UploadJob) -> UploadJob:
+    """Mark an unfinished job failed when its heartbeat stopped with its instance"""
+    if job.status not in (UploadJobStatus.PENDING, UploadJobStatus.PROCESSING):
+        return job
+    stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    # Jobs stored before heartbeats were added only have updated_at
+    if (job.heartbeat_at or job.updated_at) >= stale_before:
+        return job
+
+    # Conditional on the heartbeat so a job that just beat again is left alone
+    now = datetime.utcnow()
+    result = await UploadJob.find_one(
+        UploadJob.id == job.id,
+        In(UploadJob.status, [UploadJobStatus.PENDING, UploadJobStatus.PROCESSING]),
+        UploadJob.updated_at < stale_before,
+        {"$or": [{"heartbeat_at": None}, {"heartbeat_at": {"$lt": stale_before}}]},
+    ).update(
+        Set(
+            {
+                UploadJob.status: UploadJobStatus.FAILED,
+                UploadJob.failure_reason: (
+                    "Processing stopped unexpectedly "
+                    "(no heartbeat from the server running it)"
+                ),
+                UploadJob.finished_at: now,
+                UploadJob.updated_at: now,
+            }
+        )
+    )
+    # Nothing matches when the job beat again or finished since it was loaded
+    if result is not None and result.modified_count == 1:
+        logger.warning(f"⚠️ Upload job {job.id} lost its heartbeat, marked as failed")
+    return await UploadJob.get(job.id)
+
+
+async def get_upload_job(job_id: str) -> Optional[UploadJob]:
+    """Load a job by ID, or None if the ID is unknown or malformed"""
+    try:
+        job = await UploadJob.get(PydanticObjectId(job_id))
+    except Exception:
+        return None
+    return await fail_if_stale(job) if job else None
+
+
+def upload_job_summary(job: UploadJob) -> Dict[str, Any]:
+    """Status and progress counters of a job as returned by the API"""
+    return {
+        "job_id": str(job.id),
+        "filename": job.filename,
+        "status": job.status,
+        "total_rows": job.total_rows,
+        "rows_completed": job.rows_completed,
+        "processed": job.processed,
+        "unchanged": job.unchanged,
+        "emails_queued": job.emails_queued,
+        "emails_sent": job.emails_queued,
+        "error_count": job.error_count,
+        "duplicate_count": job.duplicate_count,
+        "sentiment_summary": job.sentiment_summary,
+        "save_errors": job.save_errors,
+        "failure_reason": job.failure_reason,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "heartbeat_at": job.heartbeat_at,
+    }
+
+
+async def iter_upload_job_events(
+    job_id: str,
+    cursor: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Follow a job, yielding ("row", ...) for each stored row result after cursor,
+    ("progress", ...) with the job counters, and finally ("complete", ...),
+    ("reconnect", {"cursor": ...}) when the stream reaches JOB_EVENTS_MAX_SECONDS, or
+    ("error", ...).
+
+    Processing runs in the job, so a dropped stream never interrupts it.
+    """
+    try:
+        after = PydanticObjectId(cursor) if cursor else None
+    except Exception:
+        yield "error", {"detail": f"Invalid cursor: {cursor}"}
+        return
+
+    started = time.monotonic()
+    while True:
+        job = await get_upload_job(job_id)
+        if job is None:
+            yield "error", {"detail": f"Upload job not found: {job_id}"}
+            return
+
+        # Read after the job: a finished job has already stored all of its rows
+        query = UploadJobResult.find(UploadJobResult.job_id == job_id)
+        if after is not None:
+            query = query.find(UploadJobResult.id > after)
+        rows = await query.sort("_id").limit(JOB_EVENTS_PAGE_SIZE).to_list()
+        for row in rows:
+            after = row.id
+            yield "row", {
+                "cursor": str(row.id),
+                "row_number": row.row_number,
+                "review": row.review,
+                "error": row.error,
+                "duplicate": row.duplicate,
+            }
+
+        summary = upload_job_summary(job)
+        yield "progress", summary
+        if len(rows) == JOB_EVENTS_PAGE_SIZE:
+            continue
+        if job.status in (UploadJobStatus.COMPLETED, UploadJobStatus.FAILED):
+            yield "complete", summary
+            return
+        if time.monotonic() - started >= JOB_EVENTS_MAX_SECONDS:
+            yield "reconnect", {"cursor": str(after) if after else None}
+            return
+        await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+
+async def get_upload_job_results(
+    job_id: str, page: int, page_size: int
+) -> Dict[str, Any]:
+    """Page through a job's per-row results in file order"""
+    query = UploadJobResult.find(UploadJobResult.job_id == job_id)
+    total = await query.count()
+    rows = (
+        await query.sort("row_number")
+        .skip((page - 1) * page_size)
+        .limit(page_size)
+        .to_list()
+    )
+
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "results": [
+            {
+                "row_number": row.row_number,
+                "review": row.review,
+                "error": row.error,
+                "duplicate": row.duplicate,
+            }
+            for row in rows
+        ],
+    }
+
+
+async def shutdown_upload_jobs() -> None:
+    """Cancel running jobs so they are marked as interrupted before the process exits"""
+    tasks = list(_running_jobs.values())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"🛑 Interrupted {len(tasks)} running upload jobs")
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_input(value: Any) -> Any:
+    """Normalize a prompt input so whitespace-only differences share a cache entry"""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [normalize_input(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize_input(item) for key, item in sorted(value.items())}
+    return value
+
+
+def make_cache_key(
+    node: str,
+    prompt_version: str,
+    model: str,
+    temperature: float,
+    inputs: Dict[str, Any],
+) -> str:
+    """Build a content-addressed cache key for an LLM call"""
+    payload = json.dumps(
+        {
+            "node": node,
+            "prompt_version": prompt_version,
+            "model": model,
+            "temperature": temperature,
+            "inputs": normalize_input(inputs),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return f"llm:{node}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class LLMResultCache:
+    """Two-tier LLM result cache: in-process LRU with TTL, plus optional Redis"""
+
+    def __init__(
+        self, max_entries: int, ttl_seconds: int, redis_url: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis_url = redis_url
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._redis = None
+        self.stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "redis_errors": 0,
+        }
+
+    def _get_redis(self):
+        if self.redis_url and self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    def _get_memory(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_memory(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        value = self._get_memory(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                raw = await redis_client.get(key)
+                if raw is not None:
+                    value = json.loads(raw)
+                    self._set_memory(key, value)
+                    self.stats["redis_hits"] += 1
+                    return value
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"⚠️ LLM cache Redis read failed: {str(e)}")
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value in every configured tier"""
+        self._set_memory(key, value)
+
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                await redis_client.set(key, json.dumps(value), ex=self.ttl_seconds)
+            except Exception as e:
+                self.stats["redis_errors"] += 1
+                logger.warning(f"⚠️ LLM cache Redis write failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        hits = self.stats["memory_hits"] + self.stats["redis_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        """Drop all in-process entries"""
+        self._entries.clear()
+
+
+_cache_instance: Optional[LLMResultCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResultCache]:
+    """Get or create the shared LLM result cache, or None when caching is disabled"""
+    global _cache_instance
+    if not settings.llm_cache_enabled:
+        return None
+    if _cache_instance is None:
+        _cache_instance = LLMResultCache(
+            max_entries=settings.llm_cache_max_entries,
+            ttl_seconds=settings.llm_cache_ttl_seconds,
+            redis_url=settings.redis_url,
+        )
+    return _cache_instance
@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.core.config import settings
+from app.services.metrics import register_stats_collector
+
+logger = logging.getLogger(__name__)
+
+# Status codes that mean the provider is overloaded or throttling us
+OVERLOAD_STATUS_CODES = {429, 500, 502, 503, 504}
+OVERLOAD_MARKERS = (
+    "429",
+    "resource exhausted",
+    "resourceexhausted",
+    "quota",
+    "rate limit",
+    "503",
+    "unavailable",
+)
+
+# Requests already in flight when the limit drops fail together; only the first of them
+# lowers it
+DECREASE_COOLDOWN_SECONDS = 5.0
+
+
+def is_overload_error(error: Exception) -> bool:
+    """Check whether an LLM error is throttling (429) or a server-side failure (5xx)"""
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        code = code() if callable(code) else code
+        code = getattr(code, "value", code)
+        if isinstance(code, tuple):
+            code = code[0]
+        if isinstance(code, int) and code in OVERLOAD_STATUS_CODES:
+            return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in OVERLOAD_MARKERS)
+
+
+def is_timeout_error(error: Exception) -> bool:
+    return isinstance(error, (asyncio.TimeoutError, TimeoutError))
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Check whether an LLM error is transient: timeout, lost connection or overload"""
+    if is_timeout_error(error) or isinstance(error, ConnectionError):
+        return True
+    return is_overload_error(error)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate, holding a minute's worth
+    by default"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.capacity = float(per_minute if capacity is None else capacity)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waits = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until amount tokens are available and take them (FIFO across callers)"""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            if self.tokens < amount:
+                self.waits += 1
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def is_idle(self) -> bool:
+        """Whether nobody is waiting and the bucket is full, so it is no different from
+        a new one"""
+        return not self._lock.locked() and self.available() >= self.capacity
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: additive increase on success, multiplicative decrease on
+    overload, at most once per decrease cooldown"""
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = DECREASE_COOLDOWN_SECONDS,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self.successes = 0
+        self.overloads = 0
+        self._last_decrease: Optional[float] = None
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, overloaded: bool, count: bool = True) -> None:
+        """Free a slot, adjusting the limit unless count is False (request cancelled)"""
+        async with self._condition:
+            self.in_flight -= 1
+            if count and overloaded:
+                self.overloads += 1
+                now = time.monotonic()
+                if (
+                    self._last_decrease is None
+                    or now - self._last_decrease >= self.decrease_cooldown
+                ):
+                    self._last_decrease = now
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    logger.warning(
+                        "⚠️ LLM overloaded, concurrency limit lowered to "
+                        f"{int(self.limit)}"
+                    )
+            elif count:
+                self.successes += 1
+                # Roughly +1 per full window of successful requests
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class LLMThrottle:
+    """Shared requests/min and tokens/min limiter with adaptive Gemini concurrency"""
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        initial_concurrency: int,
+        min_concurrency: int,
+        max_concurrency: int,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial_concurrency, min_concurrency, max_concurrency
+        )
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0):
+        """Hold a rate-limited concurrency slot for one LLM request"""
+        if self.requests:
+            await self.requests.acquire(1)
+        if self.tokens and estimated_tokens:
+            await self.tokens.acquire(estimated_tokens)
+        await self.concurrency.acquire()
+        overloaded = False
+        count = True
+        try:
+            yield
+        except BaseException as e:
+            if isinstance(e, Exception):
+                # A timeout is the provider slowing down under load, not a success
+                overloaded = is_timeout_error(e) or is_overload_error(e)
+            else:
+                # Cancelled by a deadline, a disconnected client or shutdown: says
+                # nothing about load
+                count = False
+            raise
+        finally:
+            await self.concurrency.release(overloaded, count=count)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current limits and counters"""
+        return {
+            "concurrency_limit": int(self.concurrency.limit),
+            "concurrency_in_flight": self.concurrency.in_flight,
+            "successes": self.concurrency.successes,
+            "overloads": self.concurrency.overloads,
+            "requests_per_minute": self.requests.capacity if self.requests else None,
+            "requests_available": self.requests.available() if self.requests else None,
+            "request_waits": self.requests.waits if self.requests else 0,
+            "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+            "tokens_available": self.tokens.available() if self.tokens else None,
+            "token_waits": self.tokens.waits if self.tokens else 0,
+        }
+
+
+_throttle_instance: Optional[LLMThrottle] = None
+
+
+def get_llm_throttle() -> LLMThrottle:
+    """Get or create the LLM throttle shared by all agent nodes"""
+    global _throttle_instance
+    if _throttle_instance is None:
+        _throttle_instance = LLMThrottle(
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            initial_concurrency=settings.llm_initial_concurrency,
+            min_concurrency=settings.llm_min_concurrency,
+            max_concurrency=settings.llm_max_concurrency,
+        )
+    return _throttle_instance
+
+
+register_stats_collector(
+    lambda: get_llm_throttle().get_stats(),
+    [
+        (
+            GaugeMetricFamily,
+            "llm_concurrency_limit",
+            "Current AIMD concurrency limit for LLM calls",
+            "concurrency_limit",
+        ),
+        (
+            GaugeMetricFamily,
+            "llm_concurrency_in_flight",
+            "LLM calls holding a concurrency slot",
+            "concurrency_in_flight",
+        ),
+        (
+            CounterMetricFamily,
+            "llm_throttle_successes",
+            "LLM calls that raised the concurrency limit",
+            "successes",
+        ),
+        (
+            CounterMetricFamily,
+            "llm_throttle_overloads",
+            "LLM calls that failed with an overload or timeout",
+            "overloads",
+        ),
+        (
+            GaugeMetricFamily,
+            "llm_rate_limit_available",
+            "Tokens left in each LLM rate-limit bucket",
+            (
+                "bucket",
+                {"requests": "requests_available", "tokens": "tokens_available"},
+            ),
+        ),
+        (
+            CounterMetricFamily,
+            "llm_rate_limit_waits",
+            "LLM calls that waited for a rate-limit bucket",
+            ("bucket", {"requests": "request_waits", "tokens": "token_waits"}),
+        ),
+    ],
+)
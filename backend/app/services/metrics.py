@@ -0,0 +1,244 @@
+import functools
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+from pymongo import monitoring
+
+# Labels only take values from fixed sets (node names, command names, outcomes) so the
+# number of series stays bounded and recording is a dictionary lookup plus a lock
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    20.0,
+    30.0,
+    60.0,
+)
+MONGO_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+THROUGHPUT_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0)
+
+# Commands reported under their own name; anything else is grouped as "other"
+MONGO_COMMANDS = frozenset(
+    {
+        "find",
+        "insert",
+        "update",
+        "delete",
+        "findAndModify",
+        "aggregate",
+        "count",
+        "distinct",
+        "getMore",
+        "createIndexes",
+        "listIndexes",
+        "dropIndexes",
+        "ping",
+    }
+)
+
+NODE_DURATION = Histogram(
+    "review_node_duration_seconds",
+    "Duration of one review analysis node run",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+NODE_ERRORS = Counter(
+    "review_node_errors_total",
+    "Node runs that caught an error and continued",
+    ["node"],
+)
+NODE_FALLBACKS = Counter(
+    "review_node_fallbacks_total",
+    "Analysis values replaced by a default instead of the LLM's answer",
+    ["node", "field"],
+)
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds",
+    "Duration of one LLM call attempt, excluding rate-limit waits",
+    ["node", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+SMTP_SEND_DURATION = Histogram(
+    "smtp_send_duration_seconds",
+    "Duration of one SMTP send over the pool",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_OPERATION_DURATION = Histogram(
+    "mongo_operation_duration_seconds",
+    "Server round trip of one MongoDB command",
+    ["command", "outcome"],
+    buckets=MONGO_BUCKETS,
+)
+UPLOAD_ROWS = Counter(
+    "upload_rows_total",
+    "Upload rows completed, by outcome; rate() gives rows per second",
+    ["outcome"],
+)
+UPLOAD_THROUGHPUT = Histogram(
+    "upload_rows_per_second",
+    "Rows per second of each finished upload",
+    buckets=THROUGHPUT_BUCKETS,
+)
+
+
+def observe_node(
+    node: str,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """Decorator recording the duration of an async node function"""
+    histogram = NODE_DURATION.labels(node)
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def record_node_error(node: str, fallback_fields: Iterable[str] = ()) -> None:
+    """Count a caught node error and the fields it set to defaults"""
+    NODE_ERRORS.labels(node).inc()
+    record_node_fallbacks(node, fallback_fields)
+
+
+def record_node_fallbacks(node: str, fields: Iterable[str], count: int = 1) -> None:
+    for field in fields:
+        NODE_FALLBACKS.labels(node, field).inc(count)
+
+
+def observe_llm_call(node: str, outcome: str, seconds: float) -> None:
+    LLM_CALL_DURATION.labels(node, outcome).observe(seconds)
+
+
+def observe_smtp_send(outcome: str, seconds: float) -> None:
+    SMTP_SEND_DURATION.labels(outcome).observe(seconds)
+
+
+def record_upload_row(outcome: str) -> None:
+    UPLOAD_ROWS.labels(outcome).inc()
+
+
+def observe_upload_throughput(rows: int, seconds: float) -> None:
+    if rows and seconds > 0:
+        UPLOAD_THROUGHPUT.observe(rows / seconds)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener recording the latency of every command sent"""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._observe(event.command_name, "ok", event.duration_micros)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._observe(event.command_name, "error", event.duration_micros)
+
+    @staticmethod
+    def _observe(command: str, outcome: str, duration_micros: int) -> None:
+        command = command if command in MONGO_COMMANDS else "other"
+        MONGO_OPERATION_DURATION.labels(command, outcome).observe(
+            duration_micros / 1_000_000
+        )
+
+
+# A stats key, or a label name and the stats key of each of its values
+StatsKeys = Union[str, Tuple[str, Dict[str, str]]]
+
+
+class StatsCollector(Collector):
+    """Exposes values from a component's get_stats() as gauges and counters, read when
+    /metrics is scraped so the component's hot path records nothing extra.
+
+    Each metric is (GaugeMetricFamily or CounterMetricFamily, name, documentation,
+    keys). Values that are None, e.g. of a disabled limit, are left out.
+    """
+
+    def __init__(
+        self,
+        get_stats: Callable[[], Optional[Dict[str, Any]]],
+        metrics: Iterable[Tuple[Type[Metric], str, str, StatsKeys]],
+    ):
+        self.get_stats = get_stats
+        self.metrics = list(metrics)
+
+    def collect(self) -> Iterator[Metric]:
+        stats = self.get_stats()
+        if stats is None:
+            return
+        for family_type, name, documentation, keys in self.metrics:
+            if isinstance(keys, str):
+                if stats.get(keys) is not None:
+                    yield family_type(name, documentation, value=stats[keys])
+                continue
+            label, label_keys = keys
+            family = family_type(name, documentation, labels=[label])
+            for label_value, key in label_keys.items():
+                if stats.get(key) is not None:
+                    family.add_metric([label_value], stats[key])
+            yield family
+
+
+def register_stats_collector(
+    get_stats: Callable[[], Optional[Dict[str, Any]]],
+    metrics: Iterable[Tuple[Type[Metric], str, str, StatsKeys]],
+) -> StatsCollector:
+    collector = StatsCollector(get_stats, metrics)
+    REGISTRY.register(collector)
+    return collector
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """All metrics in the Prometheus text exposition format, with its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
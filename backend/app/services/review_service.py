@@ -1,79 +1,401 @@
+import asyncio
+import logging
 from datetime import datetime
-from typing import Dict, Any
-from app.models.review import Review
+from typing import Any, Dict, List, Optional
+from typing import Set as SetType
+from typing import Union
+
+from beanie import PydanticObjectId
+from beanie.operators import In, Set
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
 from app.agents.review_agent import analyze_review
-import logging
+from app.core.config import settings
+from app.models.review import ExistingReview, Review
 
 logger = logging.getLogger(__name__)
 
 
+class ReviewWriteBuffer:
+    """Write-behind buffer that saves processed reviews as unordered bulk_write upserts.
+
+    Writes are flushed when max_batch_size are pending or every flush_interval_seconds.
+    Documents that fail to save are reported in errors.
+    """
+
+    # Outcomes of a queued write, resolved from the bulk_write result
+    INSERTED = "inserted"
+    UPDATED = "updated"
+    FAILED = "failed"
+
+    def __init__(self, max_batch_size: int, flush_interval_seconds: float):
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.written = 0
+        self.flushes = 0
+        self.errors: List[str] = []
+        self._operations: List[UpdateOne] = []
+        self._emails: List[str] = []
+        self._outcomes: List[asyncio.Future] = []
+        self._lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        _active_write_buffers.add(self)
+        if self.flush_interval_seconds > 0:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(
+                    self._stopping.wait(), timeout=self.flush_interval_seconds
+                )
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    async def add(
+        self, customer_email: str, update: Dict[str, Any], upsert: bool = True
+    ) -> asyncio.Future:
+        """Queue an update of the customer's review, flushing if the batch is full.
+
+        Returns a future resolved with INSERTED, UPDATED or FAILED once the batch is
+        written.
+        """
+        outcome = asyncio.get_running_loop().create_future()
+        self._operations.append(
+            UpdateOne({"customer_email": customer_email}, update, upsert=upsert)
+        )
+        self._emails.append(customer_email)
+        self._outcomes.append(outcome)
+        if len(self._operations) >= self.max_batch_size:
+            await self.flush()
+        return outcome
+
+    async def flush(self) -> None:
+        """Write all pending updates in one unordered bulk_write"""
+        async with self._lock:
+            operations, emails, outcomes = (
+                self._operations,
+                self._emails,
+                self._outcomes,
+            )
+            self._operations, self._emails, self._outcomes = [], [], []
+            if not operations:
+                return
+
+            self.flushes += 1
+            upserted: SetType[int] = set()
+            failed: SetType[int] = set(range(len(operations)))
+            try:
+                result = await Review.get_motor_collection().bulk_write(
+                    operations, ordered=False
+                )
+                upserted, failed = set(result.upserted_ids), set()
+                self.written += len(operations)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                upserted = {item["index"] for item in e.details.get("upserted", [])}
+                failed = {error["index"] for error in write_errors}
+                self.written += len(operations) - len(write_errors)
+                for error in write_errors:
+                    self.errors.append(
+                        f"Failed to save review for {emails[error['index']]}: "
+                        f"{error.get('errmsg')}"
+                    )
+                logger.error(
+                    f"❌ {len(write_errors)} of {len(operations)} review writes failed"
+                )
+            except Exception as e:
+                self.errors.extend(
+                    f"Failed to save review for {email}: {str(e)}" for email in emails
+                )
+                logger.error(f"❌ Failed to write {len(operations)} reviews: {str(e)}")
+            finally:
+                for index, outcome in enumerate(outcomes):
+                    if outcome.done():
+                        continue
+                    if index in failed:
+                        outcome.set_result(self.FAILED)
+                    else:
+                        outcome.set_result(
+                            self.INSERTED if index in upserted else self.UPDATED
+                        )
+
+    async def close(self) -> None:
+        """Stop the periodic flush and write everything still pending"""
+        if self._flusher is not None:
+            # Let an in-flight flush finish instead of cancelling it, which would drop
+            # its batch
+            self._stopping.set()
+            await self._flusher
+            self._flusher = None
+        await self.flush()
+        _active_write_buffers.discard(self)
+        logger.info(f"💾 Saved {self.written} reviews in {self.flushes} bulk writes")
+
+
+# Open buffers, flushed on shutdown in case their upload was interrupted
+_active_write_buffers: SetType[ReviewWriteBuffer] = set()
+
+
+def create_review_write_buffer() -> Optional[ReviewWriteBuffer]:
+    """Start an upload's write buffer, or None if REVIEW_WRITE_BATCH_SIZE disables it"""
+    if settings.review_write_batch_size <= 0:
+        return None
+    buffer = ReviewWriteBuffer(
+        settings.review_write_batch_size, settings.review_write_flush_seconds
+    )
+    buffer.start()
+    return buffer
+
+
+async def flush_review_write_buffers() -> None:
+    """Flush every open write buffer"""
+    for buffer in list(_active_write_buffers):
+        await buffer.close()
+
+
+def is_review_unchanged(
+    review: Union[Review, ExistingReview], review_text_hash: str
+) -> bool:
+    """Check whether a stored review already has a clean analysis of identical text"""
+    if not review.ai_analysis_data or review.ai_processing_error:
+        return False
+    if review.review_text_hash:
+        return review.review_text_hash == review_text_hash
+    # Documents stored before hashing was introduced
+    return Review.hash_review_text(review.review_text) == review_text_hash
+
+
+async def prefetch_existing_reviews(
+    customer_emails: List[str],
+) -> Dict[str, ExistingReview]:
+    """Load the stored reviews of many customers in one query, keyed by email"""
+    if not customer_emails:
+        return {}
+    reviews = (
+        await Review.find(In(Review.customer_email, list(set(customer_emails))))
+        .project(ExistingReview)
+        .to_list()
+    )
+    return {review.customer_email: review for review in reviews}
+
+
+def review_saved_message(is_update: bool) -> str:
+    return f"Review {'updated' if is_update else 'created'} and processed successfully"
+
+
+async def apply_write_outcome(
+    result: Dict[str, Any],
+    outcome: asyncio.Future,
+    new_review_id: PydanticObjectId,
+) -> None:
+    """Correct is_update and review_id of a buffered review once its batch is written.
+
+    The prefetch only predicts whether the upsert inserts; another writer may have
+    created or removed the customer's review in between.
+    """
+    written = await outcome
+    if written == ReviewWriteBuffer.FAILED:
+        # Reported in the buffer's errors
+        return
+
+    is_update = written == ReviewWriteBuffer.UPDATED
+    if is_update == result["is_update"]:
+        return
+
+    if is_update:
+        stored = await Review.get_motor_collection().find_one(
+            {"customer_email": result["customer_email"]}, projection={"_id": 1}
+        )
+        review_id = stored["_id"] if stored else None
+    else:
+        review_id = new_review_id
+
+    logger.info(
+        f"🔀 Review for {result['customer_email']} was "
+        f"{'updated' if is_update else 'created'}, "
+        f"not {'created' if is_update else 'updated'} as prefetched"
+    )
+    result.update(
+        {
+            "review_id": str(review_id),
+            "is_update": is_update,
+            "message": review_saved_message(is_update),
+        }
+    )
+
+
 async def create_and_process_review(
     customer_name: str,
     customer_email: str,
     review_text: str,
+    precomputed_analysis: Optional[Dict[str, Any]] = None,
+    existing_review: Optional[ExistingReview] = None,
+    prefetched: bool = False,
+    write_buffer: Optional[ReviewWriteBuffer] = None,
 ) -> Dict[str, Any]:
-    """Create a new review or update existing one and process it through the complete AI + email workflow"""
-    
+    """Create a new review or update existing one and process it through the complete AI
+    + email workflow.
+
+    With prefetched=True, existing_review is the customer's stored review loaded by
+    prefetch_existing_reviews (None when there is none) and no lookup is made. With a
+    write_buffer the review is saved when the buffer flushes, not before returning; the
+    result then carries a 'pending_write' task that settles is_update and review_id from
+    the bulk_write outcome, and the caller must pop it and await it before reporting the
+    row.
+    """
+
     try:
         # Check if a review from this customer email already exists
-        existing_review = await Review.find_one(Review.customer_email == customer_email)
-        
+        if not prefetched:
+            existing_review = await Review.find_one(
+                Review.customer_email == customer_email
+            )
+        elif existing_review and not existing_review.review_text_hash:
+            # Stored before hashing was introduced: the projection leaves out the text
+            # to compare
+            existing_review = await Review.get(existing_review.id)
+        review_text_hash = Review.hash_review_text(review_text)
+
+        if existing_review and is_review_unchanged(existing_review, review_text_hash):
+            logger.info(
+                f"⏭️ Review text unchanged for {customer_name} ({customer_email}), "
+                "reusing stored analysis"
+            )
+
+            if (
+                existing_review.customer_name != customer_name
+                or existing_review.review_text_hash != review_text_hash
+            ):
+                if write_buffer is not None:
+                    await write_buffer.add(
+                        customer_email,
+                        {
+                            "$set": {
+                                "customer_name": customer_name,
+                                "review_text_hash": review_text_hash,
+                                "updated_at": datetime.utcnow(),
+                            }
+                        },
+                        upsert=False,
+                    )
+                else:
+                    await Review.find_one(Review.id == existing_review.id).update(
+                        Set(
+                            {
+                                Review.customer_name: customer_name,
+                                Review.review_text_hash: review_text_hash,
+                                Review.updated_at: datetime.utcnow(),
+                            }
+                        )
+                    )
+
+            return {
+                "review_id": str(existing_review.id),
+                "customer_name": customer_name,
+                "customer_email": existing_review.customer_email,
+                "analysis": existing_review.ai_analysis_data,
+                "email_queued": False,
+                "email_sent": False,
+                "is_update": True,
+                "unchanged": True,
+                "message": "Review unchanged, stored analysis reused",
+            }
+
         if existing_review:
-            logger.info(f"🔄 Updating existing review for customer: {customer_name} ({customer_email})")
+            logger.info(
+                f"🔄 Updating existing review for customer: {customer_name} "
+                f"({customer_email})"
+            )
             is_update = True
         else:
-            logger.info(f"🆕 Processing new review from {customer_name} ({customer_email})")
+            logger.info(
+                f"🆕 Processing new review from {customer_name} ({customer_email})"
+            )
             is_update = False
-        
+
         logger.info(f"🧠 Analyzing review with AI")
 
         analysis = await analyze_review(
             review_text=review_text,
             customer_name=customer_name,
             customer_email=customer_email,
-            rating=None
+            rating=None,
+            precomputed_analysis=precomputed_analysis,
         )
-        
-        if existing_review:
-            existing_review.customer_name = customer_name
-            existing_review.review_text = review_text
-            existing_review.ai_processed = True
-            existing_review.ai_processing_error = analysis.get("error", None)
-            existing_review.ai_analysis_data = analysis
-            existing_review.email_sent = analysis['email_sent']
-            existing_review.updated_at = datetime.utcnow()
-            
-            review = existing_review
-            await review.save()
-            
-            logger.info(f"💾 Updated existing review in database with ID: {review.id}")
+
+        now = datetime.utcnow()
+        new_review_id = PydanticObjectId()
+        update = {
+            "$set": {
+                "customer_name": customer_name,
+                "review_text": review_text,
+                "review_text_hash": review_text_hash,
+                "ai_processed": True,
+                "ai_processing_error": analysis.get("error", None),
+                "ai_analysis_data": analysis,
+                "email_queued": analysis["email_queued"],
+                "updated_at": now,
+            },
+            "$setOnInsert": {"_id": new_review_id, "created_at": now},
+        }
+        # email_sent is set by the outbox dispatcher once the new email is delivered; it
+        # waits for this write to store review_text_hash first. Without a new email it
+        # is left alone
+        if analysis["email_queued"]:
+            update["$set"]["email_sent"] = False
+        else:
+            update["$setOnInsert"]["email_sent"] = False
+
+        if write_buffer is not None:
+            review_id = existing_review.id if existing_review else new_review_id
+            outcome = await write_buffer.add(customer_email, update)
+
+            logger.info(f"💾 Review {review_id} queued for saving")
         else:
-            review = Review(
-                customer_name=customer_name,
-                customer_email=customer_email,
-                review_text=review_text,
-                ai_analysis_data=analysis,
-                email_sent=analysis['email_sent'],
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+            # A single atomic upsert on the unique email index, so concurrent rows for
+            # the same customer cannot both insert
+            previous = await Review.get_motor_collection().find_one_and_update(
+                {"customer_email": customer_email},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+                projection={"_id": 1},
             )
-            
-            await review.save()
-            
-            logger.info(f"💾 New review saved to database with ID: {review.id}")
-        
-        logger.info(f"✅ AI analysis complete: {analysis['sentiment']} sentiment, {analysis['urgency_level']} urgency")
-
-        return {
-            "review_id": str(review.id),
-            "customer_name": review.customer_name,
-            "customer_email": review.customer_email,
+            is_update = previous is not None
+            review_id = previous["_id"] if is_update else new_review_id
+
+            logger.info(
+                f"💾 {'Updated existing' if is_update else 'New'} review saved to "
+                f"database with ID: {review_id}"
+            )
+
+        logger.info(
+            f"✅ AI analysis complete: {analysis['sentiment']} sentiment, "
+            f"{analysis['urgency_level']} urgency"
+        )
+
+        result = {
+            "review_id": str(review_id),
+            "customer_name": customer_name,
+            "customer_email": customer_email,
             "analysis": analysis,
-            "email_sent": review.email_sent,
+            "email_queued": analysis["email_queued"],
+            "email_sent": analysis["email_queued"],
             "is_update": is_update,
-            "message": f"Review {'updated' if is_update else 'created'} and processed successfully"
+            "unchanged": False,
+            "message": review_saved_message(is_update),
         }
-        
+        if write_buffer is not None:
+            result["pending_write"] = asyncio.create_task(
+                apply_write_outcome(result, outcome, new_review_id)
+            )
+        return result
+
     except Exception as e:
         logger.error(f"❌ Failed to process review: {str(e)}")
-        raise
\ No newline at end of file
+        raise
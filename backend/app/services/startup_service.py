@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Taken when the app package is first imported, before the heavy framework and LLM
+# imports
+PROCESS_STARTED_AT = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+
+# Checks that must pass before the instance can serve requests; the rest only report
+# status
+REQUIRED_CHECKS = ("mongodb",)
+
+_checks: Dict[str, Dict[str, Any]] = {}
+_check_tasks: List[asyncio.Task] = []
+_first_request_logged = False
+
+
+def elapsed_ms(since: float = PROCESS_STARTED_AT) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+async def run_check(name: str, check: Callable[[], Awaitable[bool]]) -> bool:
+    """Run one startup check and record its status and duration"""
+    started = time.perf_counter()
+    _checks[name] = {"status": "pending"}
+    error = None
+    try:
+        ok = await check()
+    except asyncio.CancelledError:
+        _checks[name] = {"status": "cancelled", "duration_ms": elapsed_ms(started)}
+        raise
+    except Exception as e:
+        ok = False
+        error = str(e)
+
+    _checks[name] = {
+        "status": "ok" if ok else "failed",
+        "duration_ms": elapsed_ms(started),
+        "error": error,
+    }
+    logger.info(
+        f"{'✅' if ok else '❌'} Startup check {name} {'passed' if ok else 'failed'} "
+        f"in {_checks[name]['duration_ms']} ms"
+    )
+    return ok
+
+
+def start_startup_checks(checks: Dict[str, Callable[[], Awaitable[bool]]]) -> None:
+    """Start every check concurrently in the background so none delays serving"""
+    for name, check in checks.items():
+        _checks[name] = {"status": "pending"}
+        _check_tasks.append(asyncio.create_task(run_check(name, check)))
+
+    async def log_completion(tasks: List[asyncio.Task]) -> None:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(
+            f"🏁 All startup checks finished {elapsed_ms()} ms after process start"
+        )
+
+    _check_tasks.append(asyncio.create_task(log_completion(list(_check_tasks))))
+
+
+async def cancel_startup_checks() -> None:
+    """Stop checks still running at shutdown"""
+    pending = [task for task in _check_tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    _check_tasks.clear()
+
+
+def get_readiness() -> Dict[str, Any]:
+    """Status of every startup check and whether the required ones have passed"""
+    ready = all(_checks.get(name, {}).get("status") == "ok" for name in REQUIRED_CHECKS)
+    return {
+        "ready": ready,
+        "required": list(REQUIRED_CHECKS),
+        "checks": {name: dict(check) for name, check in _checks.items()},
+        "uptime_ms": elapsed_ms(),
+    }
+
+
+def record_first_request(path: Optional[str] = None) -> None:
+    """Log the cold-start time the first time a request is served"""
+    global _first_request_logged
+    if _first_request_logged:
+        return
+    _first_request_logged = True
+    logger.info(
+        f"⏱️ Cold start: first request ({path}) served {elapsed_ms()} ms "
+        "after process start"
+    )
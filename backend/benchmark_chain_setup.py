@@ -0,0 +1,71 @@
+"""Micro-benchmark of per-review chain setup overhead in the review agent.
+
+Compares building the prompt template, output parser and runnable on every
+node call (the previous behaviour) with looking them up in the precompiled
+chain registry. No LLM calls are made.
+
+Usage:
+    python benchmark_chain_setup.py [iterations]
+"""
+import sys
+import time
+
+from script_env import use_placeholder_settings
+
+use_placeholder_settings()
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.agents import review_agent
+from app.models.review import ReviewCategory, UrgencyLevel
+
+# Nodes a negative review goes through in the sequential graph
+REVIEW_NODES = [
+    "analyze_sentiment",
+    "categorize_issues",
+    "determine_urgency",
+    "generate_email_content",
+]
+
+
+def per_call_setup(llm) -> None:
+    """Per-review work done before the chain registry existed"""
+    for node in REVIEW_NODES:
+        ", ".join([cat.value for cat in ReviewCategory])
+        ", ".join([level.value for level in UrgencyLevel])
+        review_agent.build_chain(node, llm)
+
+
+def registry_setup() -> None:
+    """Per-review work with the precompiled chain registry"""
+    for node in REVIEW_NODES:
+        review_agent.get_chain(node)
+
+
+def measure(label: str, func, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    per_review_us = (time.process_time() - start) / iterations * 1_000_000
+    print(f"{label:<28} {per_review_us:>10.1f} µs CPU per review")
+    return per_review_us
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    llm = FakeListChatModel(responses=["{}"])
+    review_agent._chain_registry = {
+        name: review_agent.build_chain(name, llm) for name in review_agent.CHAIN_SPECS
+    }
+
+    print(
+        f"Chain setup overhead over {iterations} reviews "
+        f"({len(REVIEW_NODES)} nodes each)"
+    )
+    before = measure("per-call construction", lambda: per_call_setup(llm), iterations)
+    after = measure("precompiled registry", registry_setup, iterations)
+    print(f"Speedup: {before / max(after, 1e-3):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
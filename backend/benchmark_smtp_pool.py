@@ -0,0 +1,120 @@
+"""Benchmark of email delivery: one SMTP connection per message vs the session pool.
+
+Starts a local aiosmtpd server that accepts and discards messages. Each new
+session is delayed by a configurable handshake latency, which stands in for the
+TCP, TLS and AUTH round-trips to a real provider. The same number of messages is
+then sent through aiosmtplib.send (the previous behaviour) and through
+SMTPConnectionPool.
+
+Requires the dev dependencies (aiosmtpd).
+
+Usage:
+    python benchmark_smtp_pool.py [messages] [handshake_ms]
+"""
+import asyncio
+import sys
+import time
+from email.mime.text import MIMEText
+
+from script_env import use_placeholder_settings
+
+use_placeholder_settings()
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP as SMTPServer
+
+from app.services.email_service import SMTPConnectionPool
+
+HOSTNAME = "127.0.0.1"
+PORT = 8025
+CONCURRENCY = 8
+
+
+class SinkHandler:
+    async def handle_DATA(self, server, session, envelope):
+        return "250 Message accepted for delivery"
+
+
+class SlowHandshakeSMTP(SMTPServer):
+    """Server that delays the greeting of every new session"""
+
+    handshake_seconds = 0.0
+
+    async def smtp_EHLO(self, hostname):
+        await asyncio.sleep(self.handshake_seconds)
+        return await super().smtp_EHLO(hostname)
+
+
+class SinkController(Controller):
+    def factory(self):
+        return SlowHandshakeSMTP(self.handler)
+
+
+def build_message(i: int) -> MIMEText:
+    message = MIMEText(f"We are sorry about your experience (message {i}).")
+    message["From"] = "Support <support@example.com>"
+    message["To"] = f"customer{i}@example.com"
+    message["Subject"] = "About your review"
+    return message
+
+
+async def send_all(send, messages: int) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def send_one(i: int) -> None:
+        async with semaphore:
+            await send(build_message(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send_one(i) for i in range(messages)))
+    return time.perf_counter() - start
+
+
+async def run(messages: int) -> None:
+    per_message = await send_all(
+        lambda message: aiosmtplib.send(message, hostname=HOSTNAME, port=PORT),
+        messages,
+    )
+
+    pool = SMTPConnectionPool(
+        hostname=HOSTNAME,
+        port=PORT,
+        username=None,
+        password=None,
+        size=CONCURRENCY,
+        max_messages_per_connection=100,
+        idle_check_seconds=30.0,
+    )
+    pooled = await send_all(pool.send_message, messages)
+    stats = pool.get_stats()
+    await pool.close()
+
+    print(f"Sending {messages} messages with {CONCURRENCY} concurrent senders")
+    print(
+        f"{'connection per message':<24} {per_message:>8.2f} s "
+        f"{messages / per_message:>8.1f} msg/s"
+    )
+    print(
+        f"{'pooled sessions':<24} {pooled:>8.2f} s {messages / pooled:>8.1f} msg/s "
+        f"({stats['connections_opened']} connections opened)"
+    )
+    print(f"Speedup: {per_message / pooled:.1f}x")
+
+
+def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    SlowHandshakeSMTP.handshake_seconds = (
+        float(sys.argv[2]) if len(sys.argv) > 2 else 50.0
+    ) / 1000
+
+    controller = SinkController(SinkHandler(), hostname=HOSTNAME, port=PORT)
+    controller.start()
+    try:
+        asyncio.run(run(messages))
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
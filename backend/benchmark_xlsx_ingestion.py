@@ -0,0 +1,121 @@
+"""Benchmark of XLSX ingestion: whole-file pandas read vs read-only chunked reader.
+
+Writes a sheet of synthetic reviews, then reads every row of it in a fresh
+interpreter per reader so peak RSS is not shared between runs. "pandas"
+is the previous path (pd.read_excel + iterrows); "streaming" is the chunked
+openpyxl read-only reader used for .xlsx uploads. No LLM, database or SMTP
+calls are made.
+
+Usage:
+    python benchmark_xlsx_ingestion.py [rows]
+"""
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from script_env import use_placeholder_settings
+
+use_placeholder_settings()
+
+READERS = ["pandas", "streaming"]
+
+
+def write_sheet(path: str, rows: int) -> None:
+    """Write a sheet with the upload columns using openpyxl's write-only mode"""
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["Customer Name", "Customer Email", "Review"])
+    for i in range(rows):
+        sheet.append(
+            [
+                f"Customer {i}",
+                f"customer{i}@example.com",
+                f"Review number {i}: the delivery was late but the support team "
+                "was helpful and friendly.",
+            ]
+        )
+    workbook.save(path)
+
+
+def read_with_pandas(path: str) -> int:
+    import pandas as pd
+
+    with open(path, "rb") as f:
+        df = pd.read_excel(f, engine="openpyxl")
+    return sum(1 for _ in df.iterrows())
+
+
+async def read_streaming(path: str) -> int:
+    from app.services.file_service import iter_xlsx_chunks, open_xlsx_workbook
+
+    count = 0
+    with open(path, "rb") as f:
+        workbook = open_xlsx_workbook(f)
+        try:
+            async for chunk in iter_xlsx_chunks(workbook):
+                count += sum(1 for _ in chunk.iterrows())
+        finally:
+            workbook.close()
+    return count
+
+
+def run_reader(reader: str, path: str) -> None:
+    """Read the sheet with one reader and print rows, seconds and peak RSS in MB"""
+    # Both readers pay for the same imports so RSS differences come from reading
+    import app.services.file_service  # noqa: F401
+
+    start = time.perf_counter()
+    rows = (
+        read_with_pandas(path)
+        if reader == "pandas"
+        else asyncio.run(read_streaming(path))
+    )
+    elapsed = time.perf_counter() - start
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(rows, elapsed, peak_rss_mb)
+
+
+def main() -> None:
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        run_reader(sys.argv[2], sys.argv[3])
+        return
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reviews.xlsx")
+        write_sheet(path, rows)
+        print(
+            f"XLSX ingestion of {rows} rows "
+            f"({os.path.getsize(path) / (1024 * 1024):.1f}MB file)"
+        )
+
+        for reader in READERS:
+            output = (
+                subprocess.run(
+                    [sys.executable, __file__, "--run", reader, path],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+                .stdout.splitlines()[-1]
+                .split()
+            )
+            read_rows, elapsed, peak_rss_mb = (
+                int(output[0]),
+                float(output[1]),
+                float(output[2]),
+            )
+            print(
+                f"{reader:<10} {read_rows:>8} rows {elapsed:>8.2f} s "
+                f"{peak_rss_mb:>8.1f} MB peak RSS"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Merge duplicate reviews so the unique customer_email index can be created.
+
+Keeps the most recently updated review of every customer email that has more than
+one. By default it is a dry run that only lists the reviews it would remove. With
+--apply each removed review is first copied to the backup collection, with the _id
+of the review it was merged into, then deleted, and the unique index is created.
+Run it once, with the app stopped or idle, when startup logs duplicate customer emails.
+
+Usage:
+    python merge_duplicate_reviews.py [--apply] [--backup-collection NAME]
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pymongo import ReplaceOne
+
+from app.database import (
+    close_mongo_connection,
+    connect_to_mongo,
+    ensure_review_email_index,
+    get_database,
+)
+from app.models.review import Review
+
+BACKUP_COLLECTION = "reviews_duplicates_backup"
+
+# Reviews copied and deleted per round trip
+BATCH_SIZE = 1000
+
+
+async def find_duplicate_reviews(collection) -> Dict[Any, Any]:
+    """_id of every review to remove, mapped to the _id of its email's newest review"""
+    groups = collection.aggregate(
+        [
+            {"$sort": {"updated_at": -1, "_id": -1}},
+            {"$group": {"_id": "$customer_email", "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ],
+        allowDiskUse=True,
+    )
+
+    merged_into = {}
+    async for group in groups:
+        kept, *stale = group["ids"]
+        for review_id in stale:
+            merged_into[review_id] = kept
+    return merged_into
+
+
+async def backup_and_delete(collection, backup, merged_into: Dict[Any, Any]) -> int:
+    """Copy the given reviews to the backup collection, then delete them from reviews"""
+    stale_ids: List[Any] = list(merged_into)
+    deleted = 0
+    for start in range(0, len(stale_ids), BATCH_SIZE):
+        batch = stale_ids[start : start + BATCH_SIZE]
+        now = datetime.utcnow()
+        documents = await collection.find({"_id": {"$in": batch}}).to_list(None)
+        if not documents:
+            continue
+        # Replacing by _id keeps a rerun after an interrupted one from failing on copies
+        await backup.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": document["_id"]},
+                    {
+                        **document,
+                        "merged_into": merged_into[document["_id"]],
+                        "backed_up_at": now,
+                    },
+                    upsert=True,
+                )
+                for document in documents
+            ],
+            ordered=False,
+        )
+        result = await collection.delete_many(
+            {"_id": {"$in": [document["_id"] for document in documents]}}
+        )
+        deleted += result.deleted_count
+    return deleted
+
+
+async def merge(apply: bool, backup_collection: str) -> None:
+    if not await connect_to_mongo():
+        raise SystemExit("❌ Could not connect to MongoDB")
+    try:
+        database = await get_database()
+        collection = database[Review.Settings.name]
+
+        merged_into = await find_duplicate_reviews(collection)
+        emails = len(set(merged_into.values()))
+        print(
+            f"Found {len(merged_into)} older reviews duplicating {emails} "
+            "customer emails"
+        )
+        for review_id, kept in merged_into.items():
+            print(f"  {review_id} -> kept {kept}")
+
+        if not apply:
+            print("Dry run, nothing changed. Rerun with --apply to merge them.")
+            return
+
+        deleted = await backup_and_delete(
+            collection, database[backup_collection], merged_into
+        )
+        print(
+            f"✅ Deleted {deleted} reviews, "
+            f"copies kept in the '{backup_collection}' collection"
+        )
+
+        if await ensure_review_email_index(collection):
+            print("✅ Unique customer_email index is in place")
+        else:
+            raise SystemExit(
+                "❌ Duplicates were added while merging; run the script again"
+            )
+    finally:
+        await close_mongo_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--apply", action="store_true", help="back up and delete the duplicates"
+    )
+    parser.add_argument("--backup-collection", default=BACKUP_COLLECTION)
+    args = parser.parse_args()
+
+    asyncio.run(merge(args.apply, args.backup_collection))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Import-time profile of the app entry point, checked against a regression budget.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter, prints
+the slowest modules by cumulative import time and fails when importing
+app.main takes longer than the budget or pulls in any of the heavy
+dependencies that are meant to load lazily (pandas, openpyxl, LangChain,
+LangGraph, Gemini). Run it before deploying and after adding imports.
+
+Usage:
+    python profile_import_time.py [--budget-ms MS] [--top N] [--runs N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from script_env import use_placeholder_settings
+
+# Import time of app.main the deployed image is expected to stay under
+IMPORT_TIME_BUDGET_MS = 1500
+
+# Loaded by the startup preload or on first upload, never by importing the app module
+LAZY_PACKAGES = [
+    "pandas",
+    "openpyxl",
+    "langchain",
+    "langchain_core",
+    "langchain_google_genai",
+    "langgraph",
+    "google.generativeai",
+]
+
+# The profiled interpreter inherits this environment
+use_placeholder_settings("profile")
+
+
+def profile_import(module: str) -> Dict[str, Tuple[int, int]]:
+    """Self and cumulative import microseconds of every module imported by `module`"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stderr
+
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument(
+        "--top", type=int, default=15, help="number of slowest modules to print"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=3, help="take the fastest of this many runs"
+    )
+    args = parser.parse_args()
+
+    # The fastest run is the least disturbed by the OS page cache and other processes
+    runs = [profile_import("app.main") for _ in range(args.runs)]
+    timings = min(runs, key=lambda run: run["app.main"][1])
+    total_ms = timings["app.main"][1] / 1000
+
+    print("Slowest imports of app.main (cumulative ms, self ms):")
+    slowest: List[Tuple[str, Tuple[int, int]]] = sorted(
+        timings.items(), key=lambda item: item[1][1], reverse=True
+    )[: args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {cumulative_us / 1000:>9.1f} {self_us / 1000:>9.1f}  {name}")
+
+    failures = []
+    eager = [package for package in LAZY_PACKAGES if package in timings]
+    if eager:
+        failures.append(f"❌ Imported eagerly, should load lazily: {', '.join(eager)}")
+    if total_ms > args.budget_ms:
+        failures.append(
+            f"❌ import app.main took {total_ms:.1f} ms, "
+            f"budget is {args.budget_ms:.0f} ms"
+        )
+
+    print(f"\nimport app.main: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if failures:
+        print("\n".join(failures))
+        raise SystemExit(1)
+    print("✅ Within import-time budget")
+
+
+if __name__ == "__main__":
+    main()
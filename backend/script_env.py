@@ -0,0 +1,21 @@
+"""Placeholder values for the settings the app requires at import time.
+
+The profiling and benchmark scripts import app modules but never call Gemini or
+SMTP, so they call use_placeholder_settings() before their first app import.
+Values already set in the environment are kept.
+"""
+import os
+
+REQUIRED_SETTINGS = [
+    "GOOGLE_API_KEY",
+    "SMTP_HOST",
+    "SMTP_USER",
+    "SMTP_PASSWORD",
+    "FROM_EMAIL",
+    "FROM_NAME",
+]
+
+
+def use_placeholder_settings(value: str = "benchmark") -> None:
+    for name in REQUIRED_SETTINGS:
+        os.environ.setdefault(name, value)
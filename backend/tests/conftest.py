@@ -0,0 +1,23 @@
+from script_env import use_placeholder_settings
+
+# Settings are read when the tests first import an app module
+use_placeholder_settings("test")
+
+import pytest_asyncio  # noqa: E402
+from beanie import init_beanie  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+from app.models.email_outbox import OutboxEmail  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.upload_job import UploadJob, UploadJobResult  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def mongo_db():
+    """In-memory database with every document model initialized"""
+    database = AsyncMongoMockClient()["test"]
+    await init_beanie(
+        database=database,
+        document_models=[Review, UploadJob, UploadJobResult, OutboxEmail],
+    )
+    return database
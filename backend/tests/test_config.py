@@ -0,0 +1,34 @@
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+
+
+@pytest.mark.parametrize("mode", ["off", "shadow", "on"])
+def test_pre_classifier_mode_accepts_the_documented_modes(monkeypatch, mode):
+    monkeypatch.setenv("PRE_CLASSIFIER_MODE", mode)
+
+    assert Settings().pre_classifier_mode == mode
+
+
+@pytest.mark.parametrize("mode", ["ON", "enabled", ""])
+def test_unknown_pre_classifier_mode_fails_at_startup(monkeypatch, mode):
+    monkeypatch.setenv("PRE_CLASSIFIER_MODE", mode)
+
+    with pytest.raises(ValidationError, match="pre_classifier_mode"):
+        Settings()
+
+
+@pytest.mark.parametrize("mode", ["sequential", "fused", "parallel"])
+def test_analysis_mode_accepts_the_documented_graphs(monkeypatch, mode):
+    monkeypatch.setenv("ANALYSIS_MODE", mode)
+
+    assert Settings().analysis_mode == mode
+
+
+@pytest.mark.parametrize("mode", ["Fused", "prefilled", "batch"])
+def test_unknown_analysis_mode_fails_at_startup(monkeypatch, mode):
+    monkeypatch.setenv("ANALYSIS_MODE", mode)
+
+    with pytest.raises(ValidationError, match="analysis_mode"):
+        Settings()
@@ -0,0 +1,73 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import ASCENDING
+
+from app.database import REVIEW_EMAIL_INDEX, ensure_review_email_index
+from merge_duplicate_reviews import backup_and_delete, find_duplicate_reviews
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["test"]
+
+
+async def insert_reviews(collection, *emails):
+    for updated_at, email in enumerate(emails):
+        await collection.insert_one({"customer_email": email, "updated_at": updated_at})
+
+
+@pytest.mark.asyncio
+async def test_unique_index_is_created_when_emails_are_distinct(db):
+    await insert_reviews(db.reviews, "a@example.com", "b@example.com")
+
+    assert await ensure_review_email_index(db.reviews)
+
+    assert (await db.reviews.index_information())[REVIEW_EMAIL_INDEX]["unique"]
+
+
+@pytest.mark.asyncio
+async def test_non_unique_index_is_replaced(db):
+    await db.reviews.create_index(
+        [("customer_email", ASCENDING)], name=REVIEW_EMAIL_INDEX
+    )
+
+    assert await ensure_review_email_index(db.reviews)
+    assert await ensure_review_email_index(db.reviews)
+
+    assert (await db.reviews.index_information())[REVIEW_EMAIL_INDEX]["unique"]
+
+
+@pytest.mark.asyncio
+async def test_duplicates_are_kept_and_block_the_unique_index(db):
+    await insert_reviews(db.reviews, "a@example.com", "a@example.com", "b@example.com")
+
+    assert not await ensure_review_email_index(db.reviews)
+
+    assert await db.reviews.count_documents({}) == 3
+    assert not (await db.reviews.index_information())[REVIEW_EMAIL_INDEX].get("unique")
+
+
+@pytest.mark.asyncio
+async def test_merge_backs_up_older_duplicates_before_deleting_them(db):
+    await insert_reviews(
+        db.reviews, "a@example.com", "a@example.com", "b@example.com", "a@example.com"
+    )
+    newest_a = await db.reviews.find_one(
+        {"customer_email": "a@example.com", "updated_at": 3}
+    )
+
+    merged_into = await find_duplicate_reviews(db.reviews)
+    assert set(merged_into.values()) == {newest_a["_id"]}
+    assert len(merged_into) == 2
+
+    assert await backup_and_delete(db.reviews, db.backup, merged_into) == 2
+    # A rerun finds nothing left to merge
+    assert await find_duplicate_reviews(db.reviews) == {}
+
+    assert [
+        review["updated_at"] async for review in db.reviews.find().sort("updated_at")
+    ] == [2, 3]
+    backups = await db.backup.find().sort("updated_at").to_list(None)
+    assert [backup["updated_at"] for backup in backups] == [0, 1]
+    assert all(backup["merged_into"] == newest_a["_id"] for backup in backups)
+    assert await ensure_review_email_index(db.reviews)
@@ -0,0 +1,262 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.models.email_outbox import OutboxEmail, OutboxEmailStatus
+from app.models.review import Review
+from app.services import email_outbox_service
+from app.services.email_outbox_service import EmailOutboxDispatcher, enqueue_email
+
+COOLDOWN_SECONDS = 3600
+
+
+def make_dispatcher(**kwargs):
+    options = dict(
+        batch_size=10,
+        poll_seconds=1,
+        max_attempts=3,
+        retry_base_seconds=30,
+        lease_seconds=300,
+        recipient_cooldown_seconds=COOLDOWN_SECONDS,
+    )
+    return EmailOutboxDispatcher(**{**options, **kwargs})
+
+
+@pytest.fixture
+def deliver(monkeypatch):
+    deliver = AsyncMock()
+    monkeypatch.setattr(email_outbox_service, "deliver_email", deliver)
+    return deliver
+
+
+async def add_email(key, to_email="ada@example.com", **fields):
+    email = OutboxEmail(
+        idempotency_key=key,
+        to_email=to_email,
+        to_email_normalized=to_email.lower(),
+        subject="Thanks",
+        body="Hello",
+        **fields,
+    )
+    await email.insert()
+    return email
+
+
+async def add_review(customer_email="ada@example.com"):
+    await Review.get_motor_collection().insert_one(
+        {"customer_email": customer_email, "email_sent": False}
+    )
+
+
+async def stored(email):
+    return await OutboxEmail.get_motor_collection().find_one({"_id": email.id})
+
+
+async def deliver_claimed(dispatcher):
+    for email in await dispatcher._claim_batch():
+        await dispatcher._deliver(email)
+
+
+@pytest.mark.asyncio
+async def test_email_is_deferred_while_the_outbox_sent_the_recipient_one_recently(
+    mongo_db, deliver
+):
+    sent_at = datetime.utcnow() - timedelta(minutes=10)
+    await add_email("earlier", status=OutboxEmailStatus.SENT, sent_at=sent_at)
+    email = await add_email("new")
+    await add_review()
+    dispatcher = make_dispatcher()
+
+    await deliver_claimed(dispatcher)
+
+    deliver.assert_not_called()
+    document = await stored(email)
+    assert document["status"] == OutboxEmailStatus.PENDING
+    assert document["attempts"] == 0
+    assert document["locked_until"] is None
+    retry_in = (document["next_attempt_at"] - datetime.utcnow()).total_seconds()
+    assert 49 * 60 < retry_in <= 50 * 60
+    assert dispatcher.deferred == 1
+
+
+@pytest.mark.asyncio
+async def test_email_is_sent_once_the_cooldown_has_passed(mongo_db, deliver):
+    await add_email(
+        "earlier",
+        status=OutboxEmailStatus.SENT,
+        sent_at=datetime.utcnow() - timedelta(hours=2),
+    )
+    await add_email(
+        "other recipient",
+        to_email="bob@example.com",
+        status=OutboxEmailStatus.SENT,
+        sent_at=datetime.utcnow(),
+    )
+    email = await add_email("new")
+    await add_review()
+
+    await deliver_claimed(make_dispatcher())
+
+    deliver.assert_awaited_once_with("ada@example.com", "Thanks", "Hello")
+    assert (await stored(email))["status"] == OutboxEmailStatus.SENT
+
+
+@pytest.mark.asyncio
+async def test_cooldown_ignores_the_case_of_the_recipient_address(mongo_db, deliver):
+    await add_email(
+        "earlier",
+        status=OutboxEmailStatus.SENT,
+        sent_at=datetime.utcnow() - timedelta(minutes=10),
+    )
+    assert await enqueue_email(" Ada@Example.com", "Thanks", "Hello", "new")
+    await add_review(" Ada@Example.com")
+    dispatcher = make_dispatcher()
+
+    await deliver_claimed(dispatcher)
+
+    deliver.assert_not_called()
+    assert dispatcher.deferred == 1
+    document = await OutboxEmail.get_motor_collection().find_one(
+        {"idempotency_key": "new"}
+    )
+    assert document["to_email_normalized"] == "ada@example.com"
+
+
+@pytest.mark.asyncio
+async def test_mixed_case_recipient_is_delivered_and_marks_its_review(
+    mongo_db, deliver
+):
+    await enqueue_email(
+        "Ada@Example.com", "Thanks", "Hello", "new", review_text_hash="hash-1"
+    )
+    await Review.get_motor_collection().insert_one(
+        {
+            "customer_email": "Ada@Example.com",
+            "review_text_hash": "hash-1",
+            "email_sent": False,
+        }
+    )
+
+    await deliver_claimed(make_dispatcher())
+
+    deliver.assert_awaited_once_with("Ada@Example.com", "Thanks", "Hello")
+    review = await Review.get_motor_collection().find_one(
+        {"customer_email": "Ada@Example.com"}
+    )
+    assert review["email_sent"] is True
+
+
+@pytest.mark.asyncio
+async def test_cooldown_of_zero_does_not_check_the_outbox(mongo_db, deliver):
+    await add_email("earlier", status=OutboxEmailStatus.SENT, sent_at=datetime.utcnow())
+    await add_email("new")
+    await add_review()
+
+    await deliver_claimed(make_dispatcher(recipient_cooldown_seconds=0))
+
+    deliver.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_claim_takes_due_emails_and_expired_leases_only(mongo_db):
+    now = datetime.utcnow()
+    due = await add_email("due")
+    await add_email("later", next_attempt_at=now + timedelta(minutes=5))
+    abandoned = await add_email(
+        "abandoned",
+        status=OutboxEmailStatus.SENDING,
+        locked_until=now - timedelta(seconds=1),
+    )
+    await add_email(
+        "leased",
+        status=OutboxEmailStatus.SENDING,
+        locked_until=now + timedelta(minutes=5),
+    )
+    await add_email(
+        "sent", status=OutboxEmailStatus.SENT, sent_at=now - timedelta(days=1)
+    )
+
+    batch = await make_dispatcher()._claim_batch()
+
+    assert sorted(email["_id"] for email in batch) == sorted([due.id, abandoned.id])
+    for email in batch:
+        assert email["status"] == OutboxEmailStatus.SENDING
+        assert email["locked_until"] > now + timedelta(seconds=299)
+    assert await make_dispatcher()._claim_batch() == []
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried_with_backoff(mongo_db, deliver):
+    deliver.side_effect = ConnectionError("SMTP down")
+    email = await add_email("new", attempts=1)
+    await add_review()
+    dispatcher = make_dispatcher()
+
+    await deliver_claimed(dispatcher)
+
+    document = await stored(email)
+    assert document["status"] == OutboxEmailStatus.PENDING
+    assert document["attempts"] == 2
+    assert document["last_error"] == "SMTP down"
+    retry_in = (document["next_attempt_at"] - datetime.utcnow()).total_seconds()
+    assert 59 < retry_in <= 60
+    assert dispatcher.retried == 1
+
+
+@pytest.mark.asyncio
+async def test_email_is_dead_lettered_after_the_last_attempt(mongo_db, deliver):
+    deliver.side_effect = ConnectionError("SMTP down")
+    email = await add_email("new", attempts=2)
+    await add_review()
+    dispatcher = make_dispatcher()
+
+    await deliver_claimed(dispatcher)
+
+    document = await stored(email)
+    assert document["status"] == OutboxEmailStatus.DEAD_LETTER
+    assert document["attempts"] == 3
+    assert dispatcher.dead_lettered == 1
+    assert await dispatcher._claim_batch() == []
+
+
+@pytest.mark.asyncio
+async def test_delivery_marks_the_review_with_the_answered_text_as_emailed(
+    mongo_db, deliver
+):
+    await add_email("new", review_text_hash="hash-1")
+    await Review.get_motor_collection().insert_one(
+        {
+            "customer_email": "ada@example.com",
+            "review_text_hash": "hash-1",
+            "email_sent": False,
+        }
+    )
+
+    await deliver_claimed(make_dispatcher())
+
+    review = await Review.get_motor_collection().find_one(
+        {"customer_email": "ada@example.com"}
+    )
+    assert review["email_sent"] is True
+
+
+@pytest.mark.asyncio
+async def test_delivery_waits_for_the_review_to_store_the_answered_text(
+    mongo_db, deliver
+):
+    email = await add_email("new", review_text_hash="hash-2")
+    await Review.get_motor_collection().insert_one(
+        {
+            "customer_email": "ada@example.com",
+            "review_text_hash": "hash-1",
+            "email_sent": True,
+        }
+    )
+
+    await deliver_claimed(make_dispatcher())
+
+    deliver.assert_not_called()
+    document = await stored(email)
+    assert document["status"] == OutboxEmailStatus.PENDING
+    assert document["attempts"] == 0
@@ -0,0 +1,167 @@
+import asyncio
+from email.message import Message
+
+import aiosmtplib
+import pytest
+
+from app.services.email_service import (
+    PooledSMTPConnection,
+    RecipientCooldownError,
+    SendRateGovernor,
+    SMTPConnectionPool,
+)
+
+
+class FakeSMTPClient:
+    """SMTP session whose server may have hung up since its last message"""
+
+    def __init__(self, disconnected=False):
+        self.is_connected = True
+        self.disconnected = disconnected
+        self.sent = []
+
+    async def send_message(self, message):
+        if self.disconnected:
+            raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+        self.sent.append(message)
+
+    async def noop(self):
+        pass
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+class FakeSMTPConnectionPool(SMTPConnectionPool):
+    def __init__(self, clients, idle_check_seconds=30):
+        super().__init__(
+            "smtp.example.com",
+            587,
+            None,
+            None,
+            size=2,
+            max_messages_per_connection=0,
+            idle_check_seconds=idle_check_seconds,
+        )
+        self.clients = list(clients)
+
+    async def _connect(self):
+        self.connections_opened += 1
+        return PooledSMTPConnection(self.clients.pop(0))
+
+
+@pytest.mark.asyncio
+async def test_session_is_reused_for_the_next_message():
+    client = FakeSMTPClient()
+    pool = FakeSMTPConnectionPool([client])
+
+    await pool.send_message(Message())
+    await pool.send_message(Message())
+
+    assert len(client.sent) == 2
+    assert pool.connections_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_message_is_resent_on_a_new_session_when_a_reused_one_was_closed():
+    stale, fresh = FakeSMTPClient(), FakeSMTPClient()
+    pool = FakeSMTPConnectionPool([stale, fresh])
+    await pool.send_message(Message())
+
+    stale.disconnected = True
+    await pool.send_message(Message())
+
+    assert len(stale.sent) == 1
+    assert len(fresh.sent) == 1
+    assert not stale.is_connected
+    assert pool.reconnects == 1
+    assert pool.messages_sent == 2
+
+
+@pytest.mark.asyncio
+async def test_a_new_session_that_disconnects_is_not_retried():
+    pool = FakeSMTPConnectionPool([FakeSMTPClient(disconnected=True), FakeSMTPClient()])
+
+    with pytest.raises(aiosmtplib.SMTPServerDisconnected):
+        await pool.send_message(Message())
+
+    assert pool.connections_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_idle_session_failing_noop_is_replaced_before_sending():
+    stale, fresh = FakeSMTPClient(), FakeSMTPClient()
+    pool = FakeSMTPConnectionPool([stale, fresh], idle_check_seconds=0)
+    await pool.send_message(Message())
+
+    async def noop():
+        raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+
+    stale.noop = noop
+    await pool.send_message(Message())
+
+    assert len(fresh.sent) == 1
+    assert pool.reconnects == 1
+
+
+def make_governor(cooldown=3600):
+    return SendRateGovernor(
+        messages_per_second=0,
+        domain_messages_per_minute=0,
+        recipient_cooldown_seconds=cooldown,
+    )
+
+
+@pytest.mark.asyncio
+async def test_second_send_to_a_recipient_is_deferred_until_the_cooldown_ends():
+    governor = make_governor()
+    await governor.acquire("ada@example.com")
+
+    with pytest.raises(RecipientCooldownError) as deferred:
+        await governor.acquire("ADA@example.com")
+
+    assert 3599 < deferred.value.retry_after <= 3600
+    assert governor.deferred == 1
+    assert governor.get_stats()["recipients_in_cooldown"] == 1
+
+
+@pytest.mark.asyncio
+async def test_released_cooldown_lets_the_retry_through():
+    governor = make_governor()
+    await governor.acquire("ada@example.com")
+
+    governor.release("ada@example.com")
+
+    await governor.acquire("ada@example.com")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_wait_releases_the_claimed_cooldown():
+    governor = SendRateGovernor(
+        messages_per_second=1,
+        domain_messages_per_minute=0,
+        recipient_cooldown_seconds=3600,
+    )
+    await governor.acquire("ada@example.com")
+
+    waiting = asyncio.create_task(governor.acquire("bob@example.com"))
+    await asyncio.sleep(0.01)
+    assert governor.waiting == 1
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+
+    assert governor.waiting == 0
+    assert "bob@example.com" not in governor.last_sent
+
+
+@pytest.mark.asyncio
+async def test_zero_cooldown_never_defers():
+    governor = make_governor(cooldown=0)
+
+    await governor.acquire("ada@example.com")
+    await governor.acquire("ada@example.com")
+
+    assert governor.deferred == 0
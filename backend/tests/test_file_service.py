@@ -0,0 +1,374 @@
+import asyncio
+import io
+from unittest.mock import AsyncMock
+
+import openpyxl
+import pandas as pd
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.services import file_service
+from app.services.file_service import validate_review_rows
+
+COLUMN_MAPPING = {
+    "customer_name": "name",
+    "customer_email": "email",
+    "review": "review",
+}
+
+
+def make_chunk(rows, start=0):
+    return pd.DataFrame(
+        rows, columns=["name", "email", "review"], index=range(start, start + len(rows))
+    )
+
+
+def test_valid_rows_are_stripped_and_keep_their_index():
+    chunk = make_chunk([["  Ada ", " ada@example.com ", " Great service "]], start=7)
+
+    valid_rows, errors = validate_review_rows(chunk, COLUMN_MAPPING)
+
+    assert errors == []
+    assert valid_rows == [
+        (
+            7,
+            {
+                "customer_name": "Ada",
+                "customer_email": "ada@example.com",
+                "review_text": "Great service",
+            },
+        ),
+    ]
+
+
+def test_error_messages_use_one_based_row_numbers():
+    chunk = make_chunk(
+        [
+            [None, "a@example.com", "Fine"],
+            ["Bob", "", "Fine"],
+            ["Cy", "c@example.com", "   "],
+            ["Di", "not-an-email", "Fine"],
+            ["Ed", "e@example.com", "nan"],
+        ],
+        start=10,
+    )
+
+    valid_rows, errors = validate_review_rows(chunk, COLUMN_MAPPING)
+
+    assert valid_rows == []
+    assert errors == [
+        (10, "Row 11: Missing customer name"),
+        (11, "Row 12: Missing customer email"),
+        (12, "Row 13: Missing review text"),
+        (13, "Row 14: Invalid email format: not-an-email"),
+        (14, "Row 15: Missing review text"),
+    ]
+
+
+def test_only_the_first_failing_check_is_reported():
+    chunk = make_chunk([[None, "not-an-email", None]])
+
+    _, errors = validate_review_rows(chunk, COLUMN_MAPPING)
+
+    assert errors == [(0, "Row 1: Missing customer name")]
+
+
+def test_valid_and_invalid_rows_are_split():
+    chunk = make_chunk(
+        [
+            ["Ada", "ada@example.com", "Great"],
+            ["Bob", "bob@", "Slow"],
+            ["Cy", "cy@example.com", "Late"],
+        ]
+    )
+
+    valid_rows, errors = validate_review_rows(chunk, COLUMN_MAPPING)
+
+    assert [index for index, _ in valid_rows] == [0, 2]
+    assert errors == [(1, "Row 2: Invalid email format: bob@")]
+
+
+def make_workbook(rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    # Formatted but empty cells below the data, as spreadsheet apps often leave them
+    sheet.cell(row=len(rows) + 3, column=1).number_format = "0.00"
+    stream = io.BytesIO()
+    workbook.save(stream)
+    return stream
+
+
+@pytest.mark.asyncio
+async def test_xlsx_chunks_keep_blank_rows_and_drop_trailing_ones():
+    stream = make_workbook(
+        [
+            ["Name", "Email", "Review"],
+            ["Ada", "ada@example.com", "Great"],
+            [None, None, None],
+            ["Bob", "bob@example.com", "Slow"],
+            [None, None, None],
+        ]
+    )
+
+    workbook = file_service.open_xlsx_workbook(stream)
+    chunks = [chunk async for chunk in file_service.iter_xlsx_chunks(workbook)]
+    chunk = pd.concat(chunks)
+
+    assert len(chunk) == len(pd.read_excel(stream, engine="openpyxl")) == 3
+    valid_rows, errors = validate_review_rows(chunk, COLUMN_MAPPING)
+    assert [index for index, _ in valid_rows] == [0, 2]
+    assert errors == [(1, "Row 2: Missing customer name")]
+
+
+def make_chunks(*chunks):
+    async def iter_chunks():
+        for chunk in chunks:
+            yield chunk
+
+    return iter_chunks
+
+
+@pytest.mark.asyncio
+async def test_scan_finds_emails_repeated_on_valid_rows_across_chunks():
+    chunks = make_chunks(
+        make_chunk(
+            [["Ada", "ada@example.com", "Great"], ["Bob", "bob@example.com", "Slow"]]
+        ),
+        make_chunk(
+            [
+                ["Ada", " ADA@example.com", "Still great"],
+                ["Bob", "bob@example.com", None],
+            ],
+            start=2,
+        ),
+    )
+
+    total_rows, duplicate_emails = await file_service.scan_upload_rows(
+        chunks(), COLUMN_MAPPING
+    )
+
+    assert total_rows == 4
+    # Bob's second row is invalid, so only Ada's email is repeated
+    assert duplicate_emails == {"ada@example.com": (0, 2)}
+
+
+DUPLICATE_ROWS = [
+    ["Ada", "ada@example.com", "First visit"],
+    ["Bob", "bob@example.com", "Slow"],
+    ["Ada", "Ada@Example.com", "Second visit"],
+    ["Ada", "ada@example.com", "Third visit"],
+]
+
+
+async def process_duplicates(monkeypatch, policy):
+    processed = {}
+
+    async def process_review(customer_email, review_text, **_):
+        processed[customer_email] = review_text
+        return {"email_queued": False, "analysis": {"sentiment": "positive"}}
+
+    monkeypatch.setattr(file_service, "create_and_process_review", process_review)
+    monkeypatch.setattr(
+        file_service, "prefetch_existing_reviews", AsyncMock(return_value={})
+    )
+    monkeypatch.setattr(file_service, "create_review_write_buffer", lambda: None)
+    monkeypatch.setattr(file_service.settings, "upload_batch_size", 0)
+    monkeypatch.setattr(file_service.settings, "upload_duplicate_policy", policy)
+
+    upload = file_service.ReviewUpload(
+        "reviews.csv",
+        len(DUPLICATE_ROWS),
+        COLUMN_MAPPING,
+        {},
+        make_chunks(make_chunk(DUPLICATE_ROWS)),
+    )
+    await file_service.scan_upload(upload)
+    results = await file_service.process_review_rows(upload)
+    return processed, results
+
+
+@pytest.mark.asyncio
+async def test_last_policy_processes_only_the_last_duplicate_row(monkeypatch):
+    processed, results = await process_duplicates(monkeypatch, "last")
+
+    assert processed == {"ada@example.com": "Third visit", "bob@example.com": "Slow"}
+    assert results["duplicates"] == [
+        "Row 1: Duplicate of row 4 (ada@example.com), skipped",
+        "Row 3: Duplicate of row 4 (Ada@Example.com), skipped",
+    ]
+    assert results["processed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_first_policy_processes_only_the_first_duplicate_row(monkeypatch):
+    processed, results = await process_duplicates(monkeypatch, "first")
+
+    assert processed == {"ada@example.com": "First visit", "bob@example.com": "Slow"}
+    assert results["duplicates"] == [
+        "Row 3: Duplicate of row 1 (Ada@Example.com), skipped",
+        "Row 4: Duplicate of row 1 (ada@example.com), skipped",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concatenate_policy_merges_the_reviews_into_the_last_row(monkeypatch):
+    processed, results = await process_duplicates(monkeypatch, "concatenate")
+
+    separator = file_service.CONCATENATED_REVIEW_SEPARATOR
+    assert processed["ada@example.com"] == separator.join(
+        ["First visit", "Second visit", "Third visit"]
+    )
+    assert results["duplicates"] == [
+        "Row 1: Duplicate of row 4 (ada@example.com), review merged into it",
+        "Row 3: Duplicate of row 4 (Ada@Example.com), review merged into it",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unknown_policy_falls_back_to_last(monkeypatch):
+    processed, _ = await process_duplicates(monkeypatch, "newest")
+
+    assert processed["ada@example.com"] == "Third visit"
+
+
+def test_queued_emails_are_also_counted_under_emails_sent():
+    results = file_service.new_upload_results(1)
+
+    file_service.record_review_counts(
+        results, {"email_queued": True, "analysis": {"sentiment": "negative"}}
+    )
+
+    assert results["emails_queued"] == results["emails_sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rows_finishing_out_of_order_are_reported_in_row_order(monkeypatch):
+    in_flight = []
+    peak = 0
+    completed = []
+
+    async def process_review(customer_email, **_):
+        nonlocal peak
+        row = int(customer_email.split("@")[0].removeprefix("row"))
+        in_flight.append(row)
+        peak = max(peak, len(in_flight))
+        # Later rows finish first
+        await asyncio.sleep(0.001 * (8 - row))
+        in_flight.remove(row)
+        completed.append(row)
+        if row % 3 == 0:
+            raise RuntimeError("analysis failed")
+        return {
+            "customer_email": customer_email,
+            "email_queued": False,
+            "analysis": {"sentiment": "positive"},
+        }
+
+    monkeypatch.setattr(file_service, "create_and_process_review", process_review)
+    monkeypatch.setattr(
+        file_service, "prefetch_existing_reviews", AsyncMock(return_value={})
+    )
+    monkeypatch.setattr(file_service, "create_review_write_buffer", lambda: None)
+    monkeypatch.setattr(file_service.settings, "upload_batch_size", 0)
+    monkeypatch.setattr(file_service.settings, "upload_concurrency", 3)
+    rows = [["A", f"row{i}@example.com", "Fine"] for i in range(8)]
+    rows[4][1] = "not-an-email"
+    upload = file_service.ReviewUpload(
+        "reviews.csv", len(rows), COLUMN_MAPPING, {}, make_chunks(make_chunk(rows))
+    )
+
+    results = await file_service.process_review_rows(upload)
+
+    assert completed != sorted(completed)
+    assert peak == 3
+    assert [review["customer_email"] for review in results["reviews_created"]] == [
+        f"row{i}@example.com" for i in (1, 2, 5, 7)
+    ]
+    assert results["errors"] == [
+        "Row 1: analysis failed",
+        "Row 4: analysis failed",
+        "Row 5: Invalid email format: not-an-email",
+        "Row 7: analysis failed",
+    ]
+
+
+def make_csv(row_count):
+    lines = ["Name,Email,Review,Zip"]
+    lines += [
+        f"Ada {i},ada{i}@example.com,Review {i},{i:05d}" for i in range(row_count)
+    ]
+    return ("\n".join(lines) + "\n").encode()
+
+
+@pytest.mark.asyncio
+async def test_csv_is_read_in_chunks_of_strings_with_continuous_row_positions(
+    monkeypatch,
+):
+    monkeypatch.setattr(file_service, "UPLOAD_CHUNK_ROWS", 10)
+
+    chunks = [
+        chunk async for chunk in file_service.iter_csv_chunks(io.BytesIO(make_csv(25)))
+    ]
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    rows = pd.concat(chunks)
+    assert list(rows.index) == list(range(25))
+    assert list(rows.columns) == ["name", "email", "review", "zip"]
+    # Nothing is parsed as a number, so leading zeros survive
+    assert rows["zip"].iloc[7] == "00007"
+    assert rows["email"].iloc[24] == "ada24@example.com"
+
+
+@pytest.mark.asyncio
+async def test_csv_upload_larger_than_a_chunk_is_counted_and_read_again(monkeypatch):
+    monkeypatch.setattr(file_service, "UPLOAD_CHUNK_ROWS", 10)
+    data = make_csv(25)
+    upload = await file_service.load_upload(
+        UploadFile(io.BytesIO(data), size=len(data), filename="reviews.csv")
+    )
+
+    try:
+        rows = pd.concat([chunk async for chunk in upload.iter_chunks()])
+    finally:
+        upload.close()
+
+    assert upload.total_rows == len(rows) == 25
+
+
+@pytest.fixture
+def one_mb_limit(monkeypatch):
+    monkeypatch.setattr(file_service.settings, "upload_max_file_size_mb", 1)
+    # The file config is cached
+    file_service.get_file_config.cache_clear()
+    yield
+    file_service.get_file_config.cache_clear()
+
+
+@pytest.mark.parametrize("size_declared", [False, True])
+@pytest.mark.asyncio
+async def test_csv_just_over_the_size_limit_is_rejected(one_mb_limit, size_declared):
+    limit = 1024 * 1024
+    data = make_csv(1)
+    data += b"x" * (limit + 1 - len(data))
+    size = len(data) if size_declared else None
+
+    with pytest.raises(HTTPException) as error:
+        await file_service.open_upload(
+            UploadFile(io.BytesIO(data), size=size, filename="reviews.csv")
+        )
+
+    assert error.value.status_code == 400
+    assert error.value.detail == "File size too large. Maximum size: 1.0MB"
+
+
+@pytest.mark.asyncio
+async def test_csv_at_the_size_limit_is_accepted(one_mb_limit):
+    data = make_csv(1)
+    data += b" " * (1024 * 1024 - len(data))
+
+    upload = await file_service.open_upload(
+        UploadFile(io.BytesIO(data), filename="reviews.csv")
+    )
+    upload.close()
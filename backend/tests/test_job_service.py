@@ -0,0 +1,125 @@
+import io
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import UploadFile
+
+from app.models.upload_job import UploadJob, UploadJobStatus
+from app.services import job_service
+
+
+def make_csv_upload(rows):
+    lines = ["name,email,review", *(",".join(row) for row in rows)]
+    data = "\n".join(lines).encode()
+    return UploadFile(io.BytesIO(data), size=len(data), filename="reviews.csv")
+
+
+async def run_job(monkeypatch, rows):
+    scanned = []
+
+    async def scan_upload(upload):
+        scanned.append(upload.filename)
+        await original_scan(upload)
+
+    original_scan = job_service.scan_upload
+    monkeypatch.setattr(job_service, "scan_upload", scan_upload)
+    monkeypatch.setattr(job_service, "process_review_rows", AsyncMock())
+
+    job = await job_service.create_upload_job(make_csv_upload(rows))
+    # The request only read the header
+    assert scanned == []
+    assert job.total_rows == 0
+
+    await job_service._running_jobs[str(job.id)]
+    return await UploadJob.get(job.id)
+
+
+@pytest.mark.asyncio
+async def test_job_counts_the_rows_in_the_background(mongo_db, monkeypatch):
+    job = await run_job(
+        monkeypatch,
+        [
+            ["Ada", "ada@example.com", "Great"],
+            ["Bob", "bob@example.com", "Slow"],
+            ["Ada", "ada@example.com", "Great again"],
+        ],
+    )
+
+    assert job.status == UploadJobStatus.COMPLETED
+    assert job.total_rows == 3
+    upload = job_service.process_review_rows.await_args.args[0]
+    assert upload.duplicate_emails == {"ada@example.com": (0, 2)}
+
+
+@pytest.mark.asyncio
+async def test_job_of_a_file_without_rows_fails(mongo_db, monkeypatch):
+    job = await run_job(monkeypatch, [])
+
+    assert job.status == UploadJobStatus.FAILED
+    assert job.failure_reason == "Excel file is empty"
+    job_service.process_review_rows.assert_not_awaited()
+
+
+async def insert_job(status, heartbeat_age):
+    beat = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+    job = UploadJob(
+        filename="reviews.csv", status=status, heartbeat_at=beat, updated_at=beat
+    )
+    await job.insert()
+    return job
+
+
+@pytest.mark.asyncio
+async def test_job_without_a_recent_heartbeat_is_marked_failed(mongo_db, caplog):
+    job = await insert_job(
+        UploadJobStatus.PROCESSING, job_service.JOB_STALE_SECONDS + 5
+    )
+
+    job = await job_service.get_upload_job(str(job.id))
+
+    assert job.status == UploadJobStatus.FAILED
+    assert "lost its heartbeat" in caplog.text
+    assert "no heartbeat" in job.failure_reason
+    assert job.finished_at is not None
+
+
+@pytest.mark.asyncio
+async def test_job_with_a_recent_heartbeat_is_left_running(mongo_db):
+    job = await insert_job(UploadJobStatus.PROCESSING, 5)
+
+    job = await job_service.get_upload_job(str(job.id))
+
+    assert job.status == UploadJobStatus.PROCESSING
+
+
+@pytest.mark.asyncio
+async def test_finished_job_is_never_stale(mongo_db):
+    job = await insert_job(
+        UploadJobStatus.COMPLETED, job_service.JOB_STALE_SECONDS * 10
+    )
+
+    job = await job_service.get_upload_job(str(job.id))
+
+    assert job.status == UploadJobStatus.COMPLETED
+    assert job.failure_reason is None
+
+
+@pytest.mark.asyncio
+async def test_job_that_beat_after_it_was_loaded_is_left_running(mongo_db, caplog):
+    job = await insert_job(
+        UploadJobStatus.PROCESSING, job_service.JOB_STALE_SECONDS + 5
+    )
+    await UploadJob.find_one(UploadJob.id == job.id).update(
+        {"$set": {"heartbeat_at": datetime.utcnow()}}
+    )
+
+    job = await job_service.fail_if_stale(job)
+
+    assert job.status == UploadJobStatus.PROCESSING
+    assert "lost its heartbeat" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_malformed_job_id_is_not_found(mongo_db):
+    assert await job_service.get_upload_job("not-an-id") is None
@@ -0,0 +1,137 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import ValidationError
+
+from app.agents import review_agent
+from app.agents.review_agent import (
+    SentimentAnalysis,
+    invoke_cached_chain,
+    is_complete_fused_analysis,
+)
+from app.services.llm_cache import LLMResultCache, make_cache_key
+
+COMPLETE_FUSED_RESPONSE = json.dumps(
+    {
+        "sentiment": "negative",
+        "confidence": 0.9,
+        "categories": ["delivery"],
+        "key_issues": ["late parcel"],
+        "urgency_level": "high",
+    }
+)
+
+SENTIMENT_INPUTS = {
+    "customer_name": "Ada",
+    "rating": "Not provided",
+    "review_text": "Great service",
+}
+FUSED_INPUTS = {
+    "categories": "delivery",
+    "urgency_levels": "high",
+    "customer_name": "Ada",
+    "rating": "Not provided",
+    "review_text": "Parcel was late",
+}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = LLMResultCache(max_entries=10, ttl_seconds=60)
+    monkeypatch.setattr(review_agent, "get_llm_cache", lambda: cache)
+    return cache
+
+
+def make_chain(*answers):
+    chain = MagicMock()
+    chain.ainvoke = AsyncMock(side_effect=answers)
+    return chain
+
+
+def test_cache_key_ignores_whitespace_but_not_content():
+    key = make_cache_key(
+        "analyze_sentiment", "1", "model", 0.1, {"review_text": "Great  service\n"}
+    )
+
+    assert key == make_cache_key(
+        "analyze_sentiment", "1", "model", 0.1, {"review_text": "Great service"}
+    )
+    assert key != make_cache_key(
+        "analyze_sentiment", "2", "model", 0.1, {"review_text": "Great service"}
+    )
+    assert key != make_cache_key(
+        "analyze_sentiment", "1", "model", 0.1, {"review_text": "Bad service"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_validated_result_is_served_from_the_cache(cache):
+    chain = make_chain({"sentiment": "positive", "confidence": 0.8})
+
+    first = await invoke_cached_chain(
+        "analyze_sentiment", chain, SENTIMENT_INPUTS, SentimentAnalysis
+    )
+    second = await invoke_cached_chain(
+        "analyze_sentiment", chain, SENTIMENT_INPUTS, SentimentAnalysis
+    )
+
+    assert first == second == SentimentAnalysis(sentiment="positive", confidence=0.8)
+    assert chain.ainvoke.await_count == 1
+    assert cache.stats["memory_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_response_that_fails_the_output_model_is_not_cached(cache):
+    chain = make_chain(None, {"sentiment": "positive", "confidence": 0.8})
+
+    with pytest.raises(ValidationError):
+        await invoke_cached_chain(
+            "analyze_sentiment", chain, SENTIMENT_INPUTS, SentimentAnalysis
+        )
+    result = await invoke_cached_chain(
+        "analyze_sentiment", chain, SENTIMENT_INPUTS, SentimentAnalysis
+    )
+
+    assert result.sentiment == "positive"
+    assert chain.ainvoke.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_incomplete_fused_response_is_retried_instead_of_cached(cache):
+    chain = make_chain('{"sentiment": "negative"}', COMPLETE_FUSED_RESPONSE, "unused")
+
+    for _ in range(3):
+        result = await invoke_cached_chain(
+            "analyze_review_fused",
+            chain,
+            FUSED_INPUTS,
+            validate=is_complete_fused_analysis,
+        )
+
+    assert result == COMPLETE_FUSED_RESPONSE
+    # The incomplete answer was asked again, then the complete one came from the cache
+    assert chain.ainvoke.await_count == 2
+    assert cache.get_stats()["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted():
+    cache = LLMResultCache(max_entries=2, ttl_seconds=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    await cache.get("a")
+    await cache.set("c", 3)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert cache.stats["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_a_miss():
+    cache = LLMResultCache(max_entries=2, ttl_seconds=-1)
+    await cache.set("a", 1)
+
+    assert await cache.get("a") is None
+    assert cache.stats["expirations"] == 1
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_throttle import AdaptiveConcurrencyLimiter, LLMThrottle
+
+
+def make_limiter(initial=4, minimum=1, maximum=8, decrease_cooldown=5.0):
+    return AdaptiveConcurrencyLimiter(
+        initial, minimum, maximum, decrease_cooldown=decrease_cooldown
+    )
+
+
+async def run_once(limiter, overloaded=False, count=True):
+    await limiter.acquire()
+    await limiter.release(overloaded, count=count)
+
+
+@pytest.mark.asyncio
+async def test_success_raises_the_limit_by_one_per_window():
+    limiter = make_limiter(initial=4)
+
+    for _ in range(4):
+        await run_once(limiter)
+
+    assert 4.9 < limiter.limit < 5.0
+    assert limiter.successes == 4
+
+
+@pytest.mark.asyncio
+async def test_success_never_raises_the_limit_above_the_maximum():
+    limiter = make_limiter(initial=8, maximum=8)
+
+    await run_once(limiter)
+
+    assert limiter.limit == 8
+
+
+@pytest.mark.asyncio
+async def test_overload_halves_the_limit_down_to_the_minimum():
+    limiter = make_limiter(initial=8, minimum=3, decrease_cooldown=0)
+
+    await run_once(limiter, overloaded=True)
+    assert limiter.limit == 4
+    await run_once(limiter, overloaded=True)
+    assert limiter.limit == 3
+    assert limiter.overloads == 2
+
+
+@pytest.mark.asyncio
+async def test_overloads_within_the_cooldown_lower_the_limit_once():
+    limiter = make_limiter(initial=8)
+
+    for _ in range(3):
+        await run_once(limiter, overloaded=True)
+
+    assert limiter.limit == 4
+    assert limiter.overloads == 3
+
+
+@pytest.mark.asyncio
+async def test_uncounted_release_frees_the_slot_only():
+    limiter = make_limiter(initial=4)
+
+    await run_once(limiter, overloaded=True, count=False)
+
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+    assert limiter.successes == limiter.overloads == 0
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_a_free_slot():
+    limiter = make_limiter(initial=1)
+    await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    await limiter.release(False)
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.in_flight == 1
+
+
+def make_throttle():
+    return LLMThrottle(
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        initial_concurrency=4,
+        min_concurrency=1,
+        max_concurrency=8,
+    )
+
+
+@pytest.mark.asyncio
+async def test_slot_counts_a_timeout_as_overload():
+    throttle = make_throttle()
+
+    with pytest.raises(asyncio.TimeoutError):
+        async with throttle.slot():
+            raise asyncio.TimeoutError()
+
+    assert throttle.concurrency.overloads == 1
+    assert throttle.concurrency.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_slot_counts_other_errors_as_success():
+    throttle = make_throttle()
+
+    with pytest.raises(ValueError):
+        async with throttle.slot():
+            raise ValueError("unparseable answer")
+
+    assert throttle.concurrency.successes == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_slot_is_released_without_changing_the_limit():
+    throttle = make_throttle()
+    entered = asyncio.Event()
+
+    async def call():
+        async with throttle.slot():
+            entered.set()
+            await asyncio.sleep(60)
+
+    task = asyncio.create_task(call())
+    await entered.wait()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert throttle.concurrency.in_flight == 0
+    assert throttle.concurrency.limit == 4
+    assert throttle.concurrency.successes == throttle.concurrency.overloads == 0
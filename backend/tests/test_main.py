@@ -0,0 +1,29 @@
+import pytest
+
+from app import main
+from app.agents import review_agent
+from app.services import startup_service
+
+
+@pytest.mark.asyncio
+async def test_llm_check_fails_when_gemini_rejects_the_api_key(monkeypatch):
+    def get_model(name, **_):
+        raise PermissionError("API key not valid")
+
+    monkeypatch.setattr(review_agent.genai, "get_model", get_model)
+
+    assert not await startup_service.run_check("llm", main.check_llm)
+    assert (
+        startup_service.get_readiness()["checks"]["llm"]["error"] == "API key not valid"
+    )
+
+
+@pytest.mark.asyncio
+async def test_llm_check_looks_up_the_configured_model(monkeypatch):
+    looked_up = []
+    monkeypatch.setattr(
+        review_agent.genai, "get_model", lambda name, **_: looked_up.append(name)
+    )
+
+    assert await startup_service.run_check("llm", main.check_llm)
+    assert looked_up == [f"models/{review_agent.LLM_MODEL}"]
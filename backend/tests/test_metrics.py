@@ -0,0 +1,62 @@
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.services.email_service import get_send_governor
+from app.services.llm_throttle import get_llm_throttle
+from app.services.metrics import StatsCollector, render_metrics
+
+
+def scrape(get_stats, metrics):
+    registry = CollectorRegistry()
+    registry.register(StatsCollector(get_stats, metrics))
+    return generate_latest(registry).decode()
+
+
+def test_stats_are_read_at_scrape_time():
+    stats = {"limit": 4, "waits": 1}
+    metrics = [
+        (GaugeMetricFamily, "test_limit", "Limit", "limit"),
+        (CounterMetricFamily, "test_waits", "Waits", "waits"),
+    ]
+    scrape(lambda: stats, metrics)
+
+    stats.update(limit=6, waits=3)
+    output = scrape(lambda: stats, metrics)
+
+    assert "test_limit 6.0" in output
+    assert "test_waits_total 3.0" in output
+
+
+def test_labelled_stats_skip_values_that_are_none():
+    output = scrape(
+        lambda: {"requests": 10, "tokens": None},
+        [
+            (
+                GaugeMetricFamily,
+                "test_available",
+                "Available",
+                ("bucket", {"requests": "requests", "tokens": "tokens"}),
+            )
+        ],
+    )
+
+    assert 'test_available{bucket="requests"} 10.0' in output
+    assert 'bucket="tokens"' not in output
+
+
+def test_missing_component_exports_nothing():
+    output = scrape(lambda: None, [(CounterMetricFamily, "test_sent", "Sent", "sent")])
+
+    assert "test_sent" not in output
+
+
+def test_throttle_and_governor_state_is_on_the_metrics_endpoint():
+    throttle = get_llm_throttle()
+    governor = get_send_governor()
+
+    output = render_metrics()[0].decode()
+
+    assert f"llm_concurrency_limit {float(int(throttle.concurrency.limit))}" in output
+    assert "llm_throttle_overloads_total" in output
+    assert f"email_governor_waiting {float(governor.waiting)}" in output
+    assert "email_recipients_in_cooldown" in output
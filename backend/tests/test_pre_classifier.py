@@ -0,0 +1,118 @@
+import pytest
+
+from app.agents import pre_classifier, review_agent
+from app.agents.pre_classifier import (
+    NaiveBayesSentimentModel,
+    classify_review,
+    is_confident,
+    tokenize,
+)
+
+
+@pytest.fixture(autouse=True)
+def lexicon_only(monkeypatch):
+    monkeypatch.setattr(pre_classifier, "get_model", lambda: None)
+    monkeypatch.setattr(pre_classifier.settings, "pre_classifier_threshold", 0.85)
+
+
+def test_two_positive_words_pass_the_default_threshold():
+    label, confidence = classify_review("Great service and friendly staff!")
+
+    assert (label, confidence) == ("positive", 0.875)
+    assert is_confident(confidence)
+
+
+def test_one_positive_word_falls_short_of_the_default_threshold():
+    label, confidence = classify_review("Great service")
+
+    assert (label, confidence) == ("positive", 0.75)
+    assert not is_confident(confidence)
+
+
+@pytest.mark.parametrize(
+    "review_text",
+    [
+        "Great food but the delivery was slow",
+        "Not great, not friendly",
+        "The staff wasn't friendly or helpful",
+        "Great service, friendly staff, late delivery",
+        "",
+    ],
+)
+def test_mixed_negated_or_empty_reviews_are_unknown(review_text):
+    assert classify_review(review_text) == ("unknown", 0.0)
+
+
+def test_long_reviews_are_unknown():
+    review_text = " ".join(["great"] * (pre_classifier.MAX_FAST_PATH_WORDS + 1))
+
+    assert classify_review(review_text) == ("unknown", 0.0)
+
+
+def test_threshold_is_inclusive_and_configurable(monkeypatch):
+    monkeypatch.setattr(pre_classifier.settings, "pre_classifier_threshold", 0.75)
+
+    assert is_confident(0.75)
+    assert not is_confident(0.7499)
+
+
+def test_naive_bayes_model_survives_a_round_trip():
+    texts = [
+        "great friendly staff",
+        "great fast delivery",
+        "slow rude staff",
+        "late cold delivery",
+    ] * 2
+    model = NaiveBayesSentimentModel.fit(texts, [True, True, False, False] * 2)
+    restored = NaiveBayesSentimentModel.from_dict(model.to_dict())
+
+    assert (
+        restored.predict_proba(tokenize("great friendly"))
+        > 0.5
+        > restored.predict_proba(tokenize("slow rude"))
+    )
+    assert restored.predict_proba(tokenize("great")) == model.predict_proba(
+        tokenize("great")
+    )
+
+
+def make_state(review_text):
+    return review_agent.build_initial_state(review_text, "Ada", "ada@example.com")
+
+
+@pytest.mark.asyncio
+async def test_on_mode_skips_the_llm_for_a_confident_positive(monkeypatch):
+    monkeypatch.setattr(review_agent.settings, "pre_classifier_mode", "on")
+
+    state = await review_agent.pre_classify(
+        make_state("Great service and friendly staff!")
+    )
+
+    assert state["pre_classified"]
+    assert state["sentiment"] == "positive"
+    assert not state["should_send_email"]
+    assert review_agent.should_run_analysis(state) == review_agent.END
+
+
+@pytest.mark.asyncio
+async def test_on_mode_sends_an_unconfident_review_to_the_llm(monkeypatch):
+    monkeypatch.setattr(review_agent.settings, "pre_classifier_mode", "on")
+
+    state = await review_agent.pre_classify(make_state("Great service"))
+
+    assert not state["pre_classified"]
+    assert state["pre_classifier_confidence"] == 0.75
+    assert review_agent.should_run_analysis(state) == "analyze"
+
+
+@pytest.mark.asyncio
+async def test_shadow_mode_only_records_the_confidence(monkeypatch):
+    monkeypatch.setattr(review_agent.settings, "pre_classifier_mode", "shadow")
+
+    state = await review_agent.pre_classify(
+        make_state("Great service and friendly staff!")
+    )
+
+    assert not state["pre_classified"]
+    assert state["pre_classifier_confidence"] == 0.875
+    assert review_agent.should_run_analysis(state) == "analyze"
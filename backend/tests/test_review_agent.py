@@ -0,0 +1,498 @@
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.agents import review_agent
+from app.agents.review_agent import (
+    FUSED_FIELD_DEFAULTS,
+    build_initial_state,
+    format_batch_reviews,
+    pack_review_batches,
+    parse_batch_analysis,
+    parse_fused_analysis,
+)
+from app.services.llm_throttle import LLMThrottle
+
+
+def make_review(row_id, review_text="x" * 39):
+    # "A" estimates as 1 token and 39 characters as 10, so each review costs 11 tokens
+    return {
+        "row_id": str(row_id),
+        "customer_name": "A",
+        "customer_email": "a@example.com",
+        "review_text": review_text,
+    }
+
+
+def batch_ids(batches):
+    return [[review["row_id"] for review in batch] for batch in batches]
+
+
+def test_pack_review_batches_limits_review_count():
+    reviews = [make_review(i) for i in range(5)]
+
+    batches = pack_review_batches(reviews, max_batch_size=2, token_budget=10_000)
+
+    assert batch_ids(batches) == [["0", "1"], ["2", "3"], ["4"]]
+
+
+def test_pack_review_batches_limits_estimated_tokens():
+    reviews = [make_review(i) for i in range(5)]
+
+    batches = pack_review_batches(reviews, max_batch_size=100, token_budget=33)
+
+    assert batch_ids(batches) == [["0", "1", "2"], ["3", "4"]]
+
+
+def test_pack_review_batches_gives_an_oversized_review_its_own_batch():
+    reviews = [make_review(0), make_review(1, "x" * 400), make_review(2)]
+
+    batches = pack_review_batches(reviews, max_batch_size=100, token_budget=30)
+
+    assert batch_ids(batches) == [["0"], ["1"], ["2"]]
+
+
+def test_pack_review_batches_of_nothing_is_empty():
+    assert pack_review_batches([], max_batch_size=10, token_budget=1000) == []
+
+
+def test_format_batch_reviews_introduces_each_review_by_its_row_id():
+    text = format_batch_reviews([make_review(1, "Late"), make_review(2, "Great")])
+
+    assert (
+        text == "Row ID: 1\nCustomer: A\nReview: Late\n---\n"
+        "Row ID: 2\nCustomer: A\nReview: Great"
+    )
+
+
+ANALYSIS = {
+    "row_id": 3,
+    "sentiment": "Negative",
+    "confidence": 1.7,
+    "categories": ["Delivery", "made-up"],
+    "key_issues": ["late parcel"],
+    "urgency_level": "high",
+}
+
+
+def test_parse_batch_analysis_reads_a_fenced_list():
+    text = f"```json\n{json.dumps([ANALYSIS])}\n```"
+
+    assert parse_batch_analysis(text) == {
+        "3": (
+            {
+                "sentiment": "negative",
+                "confidence": 1.0,
+                "categories": ["delivery"],
+                "key_issues": ["late parcel"],
+                "urgency_level": "high",
+            },
+            [],
+        ),
+    }
+
+
+def test_parse_batch_analysis_reads_an_analyses_object():
+    text = json.dumps({"analyses": [ANALYSIS, {**ANALYSIS, "row_id": " 4 "}]})
+
+    assert sorted(parse_batch_analysis(text)) == ["3", "4"]
+
+
+def test_parse_batch_analysis_falls_back_per_field():
+    text = json.dumps(
+        [
+            {
+                "row_id": "1",
+                "sentiment": "furious",
+                "categories": ["nonsense"],
+                "key_issues": "late",
+            }
+        ]
+    )
+
+    values, fallbacks = parse_batch_analysis(text)["1"]
+
+    assert fallbacks == [
+        "sentiment",
+        "confidence",
+        "categories",
+        "key_issues",
+        "urgency_level",
+    ]
+    assert values == {field: FUSED_FIELD_DEFAULTS[field] for field in fallbacks}
+
+
+def test_parse_batch_analysis_skips_items_without_a_row_id():
+    text = json.dumps(
+        [{k: v for k, v in ANALYSIS.items() if k != "row_id"}, "not an object"]
+    )
+
+    assert parse_batch_analysis(text) == {}
+
+
+def test_parse_batch_analysis_of_invalid_json_is_empty():
+    assert parse_batch_analysis("[{'row_id': 1,]") == {}
+    assert parse_batch_analysis("no JSON here") == {}
+
+
+COMPLETE_FUSED = {
+    "sentiment": "negative",
+    "confidence": 0.8,
+    "categories": ["delivery"],
+    "key_issues": ["late parcel"],
+    "urgency_level": "high",
+}
+
+
+def test_parse_fused_analysis_reads_a_complete_fenced_object():
+    values, fallbacks = parse_fused_analysis(
+        f"Here you go:\n```json\n{json.dumps(COMPLETE_FUSED)}\n```"
+    )
+
+    assert values == COMPLETE_FUSED
+    assert fallbacks == []
+
+
+@pytest.mark.parametrize(
+    "text", ['{"sentiment": "negative",', "no JSON here", '["negative"]']
+)
+def test_parse_fused_analysis_of_malformed_json_falls_back_on_every_field(text):
+    values, fallbacks = parse_fused_analysis(text)
+
+    assert fallbacks == list(FUSED_FIELD_DEFAULTS)
+    assert values == FUSED_FIELD_DEFAULTS
+
+
+def test_parse_fused_analysis_falls_back_on_a_missing_field_only():
+    payload = {
+        field: value
+        for field, value in COMPLETE_FUSED.items()
+        if field != "urgency_level"
+    }
+
+    values, fallbacks = parse_fused_analysis(json.dumps(payload))
+
+    assert fallbacks == ["urgency_level"]
+    assert values == {
+        **COMPLETE_FUSED,
+        "urgency_level": FUSED_FIELD_DEFAULTS["urgency_level"],
+    }
+
+
+def test_parse_fused_analysis_clamps_an_out_of_range_score():
+    values, fallbacks = parse_fused_analysis(
+        json.dumps({**COMPLETE_FUSED, "confidence": -3})
+    )
+
+    assert fallbacks == []
+    assert values["confidence"] == 0.0
+
+
+def test_parse_fused_analysis_falls_back_on_an_unreadable_score():
+    values, fallbacks = parse_fused_analysis(
+        json.dumps({**COMPLETE_FUSED, "confidence": "very"})
+    )
+
+    assert fallbacks == ["confidence"]
+    assert values["confidence"] == FUSED_FIELD_DEFAULTS["confidence"]
+
+
+def test_parse_fused_analysis_falls_back_on_wrong_typed_lists():
+    payload = {
+        **COMPLETE_FUSED,
+        "categories": "delivery",
+        "key_issues": {"issue": "late"},
+    }
+
+    values, fallbacks = parse_fused_analysis(json.dumps(payload))
+
+    assert fallbacks == ["categories", "key_issues"]
+    assert values["categories"] == FUSED_FIELD_DEFAULTS["categories"]
+    assert values["key_issues"] == FUSED_FIELD_DEFAULTS["key_issues"]
+    assert values["sentiment"] == "negative"
+
+
+def test_parse_fused_analysis_accepts_an_empty_category_list():
+    values, fallbacks = parse_fused_analysis(
+        json.dumps({**COMPLETE_FUSED, "categories": []})
+    )
+
+    assert fallbacks == []
+    assert values["categories"] == []
+
+
+@pytest.mark.asyncio
+async def test_fused_node_records_its_fallbacks_in_the_state(monkeypatch):
+    answer = json.dumps(
+        {**COMPLETE_FUSED, "sentiment": "furious", "urgency_level": None}
+    )
+    monkeypatch.setattr(review_agent, "get_chain", lambda node: None)
+    monkeypatch.setattr(
+        review_agent, "invoke_cached_chain", AsyncMock(return_value=answer)
+    )
+
+    state = await review_agent.analyze_review_fused(
+        build_initial_state("Late", "Ada", "ada@example.com")
+    )
+
+    assert state["fallbacks"] == ["sentiment", "urgency_level"]
+    assert state["sentiment"] == "neutral"
+    assert state["categories"] == ["delivery"]
+    assert state["error"] == "Fused analysis parsing fallback: sentiment, urgency_level"
+
+
+@pytest.mark.asyncio
+async def test_fused_node_keeps_the_call_error_when_the_llm_fails(monkeypatch):
+    monkeypatch.setattr(review_agent, "get_chain", lambda node: None)
+    monkeypatch.setattr(
+        review_agent,
+        "invoke_cached_chain",
+        AsyncMock(side_effect=TimeoutError("too slow")),
+    )
+
+    state = await review_agent.analyze_review_fused(
+        build_initial_state("Late", "Ada", "ada@example.com")
+    )
+
+    assert state["fallbacks"] == list(FUSED_FIELD_DEFAULTS)
+    assert state["error"] == "Fused analysis error: too slow"
+
+
+class FakeChain:
+    """Chain answering with a fixed result, or raising it when it is an exception"""
+
+    def __init__(self, answer):
+        self.answer = answer
+
+    async def ainvoke(self, inputs):
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+PARALLEL_ANSWERS = {
+    "analyze_sentiment": {"sentiment": "positive", "confidence": 0.9},
+    "categorize_issues": {"categories": ["quality"], "key_issues": ["tasty"]},
+    "determine_urgency": {"urgency_level": "low", "reasoning": "praise"},
+}
+
+
+async def run_parallel_graph(monkeypatch, **answers):
+    chains = {
+        node: FakeChain(answer)
+        for node, answer in {**PARALLEL_ANSWERS, **answers}.items()
+    }
+    monkeypatch.setattr(review_agent, "get_chain", chains.__getitem__)
+    monkeypatch.setattr(review_agent, "get_llm_cache", lambda: None)
+    monkeypatch.setattr(review_agent.settings, "pre_classifier_mode", "off")
+
+    graph = review_agent.create_parallel_review_analysis_graph()
+    return await graph.ainvoke(build_initial_state("Tasty", "Ada", "ada@example.com"))
+
+
+@pytest.mark.asyncio
+async def test_parallel_branches_only_write_the_keys_they_own(monkeypatch):
+    state = await run_parallel_graph(monkeypatch)
+
+    assert (state["sentiment"], state["sentiment_score"]) == ("positive", 0.9)
+    assert (state["categories"], state["key_issues"]) == (["quality"], ["tasty"])
+    assert state["urgency_level"] == "low"
+    assert state["error"] == ""
+    assert state["fallbacks"] == []
+    assert set(state["node_retries"]) == {
+        "analyze_sentiment",
+        "categorize_issues",
+        "determine_urgency",
+    }
+
+
+@pytest.mark.asyncio
+async def test_failing_branch_keeps_the_other_branch_result(monkeypatch):
+    state = await run_parallel_graph(
+        monkeypatch, categorize_issues=ValueError("unparseable")
+    )
+
+    assert (state["sentiment"], state["sentiment_score"]) == ("positive", 0.9)
+    assert (state["categories"], state["key_issues"]) == (["other"], [])
+    assert state["error"] == "Categorization error: unparseable"
+    assert state["fallbacks"] == ["categories", "key_issues"]
+    assert (
+        state["node_retries"]["analyze_sentiment"]
+        == state["node_retries"]["categorize_issues"]
+        == 0
+    )
+
+
+@pytest.mark.asyncio
+async def test_errors_and_fallbacks_of_both_branches_are_merged(monkeypatch):
+    state = await run_parallel_graph(
+        monkeypatch,
+        analyze_sentiment=ValueError("no sentiment"),
+        categorize_issues=ValueError("no categories"),
+    )
+
+    assert sorted(state["error"].split("; ")) == [
+        "Categorization error: no categories",
+        "Sentiment analysis error: no sentiment",
+    ]
+    assert sorted(state["fallbacks"]) == [
+        "categories",
+        "confidence",
+        "key_issues",
+        "sentiment",
+    ]
+    assert {"analyze_sentiment", "categorize_issues"} <= set(state["node_retries"])
+    assert state["sentiment"] == "neutral"
+    assert state["categories"] == ["other"]
+
+
+class ScriptedChain:
+    """Chain playing its answers in order, raising exceptions and sleeping on floats"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        answer = self.answers[min(self.calls, len(self.answers) - 1)]
+        self.calls += 1
+        if isinstance(answer, float):
+            await asyncio.sleep(answer)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+OVERLOADED = RuntimeError("429 Resource exhausted")
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(
+        review_agent, "get_llm_throttle", lambda: LLMThrottle(0, 0, 4, 1, 8)
+    )
+    monkeypatch.setattr(review_agent, "retry_delay", lambda attempt: 0)
+    monkeypatch.setattr(review_agent.settings, "llm_max_retries", 3)
+    monkeypatch.setattr(review_agent.settings, "llm_node_timeout_seconds", 30.0)
+
+
+def make_llm_state(deadline_in=60.0):
+    return {
+        "node_retries": {},
+        "node_latency_ms": {},
+        "deadline_at": time.monotonic() + deadline_in,
+    }
+
+
+@pytest.mark.asyncio
+async def test_invoke_llm_retries_an_overload_until_it_succeeds(fast_retries):
+    chain = ScriptedChain(OVERLOADED, OVERLOADED, "answer")
+    state = make_llm_state()
+
+    assert (
+        await review_agent.invoke_llm("analyze_sentiment", chain, {}, state) == "answer"
+    )
+    assert chain.calls == 3
+    assert state["node_retries"] == {"analyze_sentiment": 2}
+
+
+@pytest.mark.asyncio
+async def test_invoke_llm_gives_up_after_the_configured_retries(fast_retries):
+    chain = ScriptedChain(OVERLOADED)
+    state = make_llm_state()
+
+    with pytest.raises(RuntimeError):
+        await review_agent.invoke_llm("analyze_sentiment", chain, {}, state)
+    assert chain.calls == 4
+    assert state["node_retries"] == {"analyze_sentiment": 3}
+
+
+@pytest.mark.asyncio
+async def test_invoke_llm_does_not_retry_other_errors(fast_retries):
+    chain = ScriptedChain(ValueError("unparseable"), "answer")
+    state = make_llm_state()
+
+    with pytest.raises(ValueError):
+        await review_agent.invoke_llm("analyze_sentiment", chain, {}, state)
+    assert chain.calls == 1
+    assert state["node_retries"] == {"analyze_sentiment": 0}
+
+
+@pytest.mark.asyncio
+async def test_invoke_llm_times_out_a_slow_call_and_retries_it(
+    fast_retries, monkeypatch
+):
+    monkeypatch.setattr(review_agent.settings, "llm_node_timeout_seconds", 0.01)
+    chain = ScriptedChain(1.0, "answer")
+    state = make_llm_state()
+
+    assert (
+        await review_agent.invoke_llm("analyze_sentiment", chain, {}, state) == "answer"
+    )
+    assert state["node_retries"] == {"analyze_sentiment": 1}
+
+
+@pytest.mark.asyncio
+async def test_invoke_llm_stops_retrying_when_the_backoff_crosses_the_deadline(
+    fast_retries, monkeypatch
+):
+    monkeypatch.setattr(review_agent, "retry_delay", lambda attempt: 1.0)
+    chain = ScriptedChain(OVERLOADED, "answer")
+    state = make_llm_state(deadline_in=0.5)
+
+    with pytest.raises(RuntimeError):
+        await review_agent.invoke_llm("analyze_sentiment", chain, {}, state)
+    assert chain.calls == 1
+    assert state["node_retries"] == {"analyze_sentiment": 0}
+
+
+@pytest.mark.asyncio
+async def test_invoke_llm_caps_the_call_timeout_at_the_deadline(fast_retries):
+    chain = ScriptedChain(1.0, "answer")
+    state = make_llm_state(deadline_in=0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await review_agent.invoke_llm("analyze_sentiment", chain, {}, state)
+    assert chain.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_invoke_llm_past_the_deadline_makes_no_call(fast_retries):
+    chain = ScriptedChain("answer")
+    state = make_llm_state(deadline_in=-1)
+
+    with pytest.raises(asyncio.TimeoutError, match="Review deadline exceeded"):
+        await review_agent.invoke_llm("analyze_sentiment", chain, {}, state)
+    assert chain.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_node_past_the_deadline_falls_back(fast_retries, monkeypatch):
+    monkeypatch.setattr(review_agent, "get_chain", lambda node: ScriptedChain("unused"))
+    monkeypatch.setattr(review_agent, "get_llm_cache", lambda: None)
+    state = build_initial_state("Late", "Ada", "ada@example.com")
+    state["deadline_at"] = time.monotonic() - 1
+
+    state = await review_agent.analyze_sentiment(state)
+
+    assert (state["sentiment"], state["sentiment_score"]) == ("neutral", 0.0)
+    assert state["error"].startswith(
+        "Sentiment analysis error: Review deadline exceeded"
+    )
+    assert state["fallbacks"] == ["sentiment", "confidence"]
+
+
+def test_retry_delay_is_jittered_below_a_capped_exponential_ceiling(monkeypatch):
+    monkeypatch.setattr(review_agent.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(review_agent.settings, "llm_retry_base_delay_seconds", 0.5)
+    monkeypatch.setattr(review_agent.settings, "llm_retry_max_delay_seconds", 3.0)
+
+    assert [review_agent.retry_delay(attempt) for attempt in range(4)] == [
+        0.5,
+        1.0,
+        2.0,
+        3.0,
+    ]
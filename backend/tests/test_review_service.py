@@ -0,0 +1,396 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from beanie import PydanticObjectId
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.models.review import ExistingReview, Review
+from app.services import review_service
+from app.services.file_service import new_upload_results, record_review_counts
+
+
+def make_analysis(email_queued):
+    return {
+        "sentiment": "negative",
+        "urgency_level": "high",
+        "email_queued": email_queued,
+    }
+
+
+async def stored_review(customer_email="ada@example.com"):
+    return await Review.get_motor_collection().find_one(
+        {"customer_email": customer_email}
+    )
+
+
+async def save_review(monkeypatch, review_text, email_queued):
+    monkeypatch.setattr(
+        review_service,
+        "analyze_review",
+        AsyncMock(return_value=make_analysis(email_queued)),
+    )
+    return await review_service.create_and_process_review(
+        "Ada", "ada@example.com", review_text
+    )
+
+
+@pytest.mark.asyncio
+async def test_update_queueing_a_new_email_resets_email_sent(mongo_db, monkeypatch):
+    await save_review(monkeypatch, "Late parcel", email_queued=True)
+    await Review.get_motor_collection().update_one({}, {"$set": {"email_sent": True}})
+
+    result = await save_review(
+        monkeypatch, "Late parcel, and broken", email_queued=True
+    )
+
+    assert result["is_update"]
+    review = await stored_review()
+    assert review["email_queued"] is True
+    assert review["email_sent"] is False
+
+
+@pytest.mark.asyncio
+async def test_update_without_a_new_email_keeps_email_sent(mongo_db, monkeypatch):
+    await save_review(monkeypatch, "Late parcel", email_queued=True)
+    await Review.get_motor_collection().update_one({}, {"$set": {"email_sent": True}})
+
+    await save_review(monkeypatch, "Late parcel, but fixed", email_queued=False)
+
+    review = await stored_review()
+    assert review["email_queued"] is False
+    assert review["email_sent"] is True
+
+
+@pytest.mark.asyncio
+async def test_new_review_starts_without_email_sent(mongo_db, monkeypatch):
+    await save_review(monkeypatch, "Great", email_queued=False)
+
+    assert (await stored_review())["email_sent"] is False
+
+
+@pytest.mark.asyncio
+async def test_result_keeps_email_sent_as_an_alias_of_email_queued(
+    mongo_db, monkeypatch
+):
+    result = await save_review(monkeypatch, "Late parcel", email_queued=True)
+
+    assert result["email_queued"] is result["email_sent"] is True
+
+
+@pytest.mark.asyncio
+async def test_reupload_of_identical_text_skips_analysis_and_email(
+    mongo_db, monkeypatch
+):
+    await save_review(monkeypatch, "Late parcel", email_queued=True)
+    analyze = AsyncMock(return_value=make_analysis(True))
+    monkeypatch.setattr(review_service, "analyze_review", analyze)
+
+    result = await review_service.create_and_process_review(
+        "Ada Lovelace", "ada@example.com", "Late parcel"
+    )
+
+    analyze.assert_not_awaited()
+    assert result["unchanged"] is True
+    assert result["email_queued"] is False
+    assert result["analysis"] == make_analysis(True)
+    review = await stored_review()
+    assert review["customer_name"] == "Ada Lovelace"
+    results = new_upload_results(1)
+    record_review_counts(results, result)
+    assert (results["processed"], results["unchanged"], results["emails_queued"]) == (
+        1,
+        1,
+        0,
+    )
+
+
+@pytest.mark.asyncio
+async def test_reupload_of_changed_text_is_analyzed_again(mongo_db, monkeypatch):
+    await save_review(monkeypatch, "Late parcel", email_queued=False)
+
+    result = await save_review(monkeypatch, "Late and broken parcel", email_queued=True)
+
+    review_service.analyze_review.assert_awaited_once()
+    assert result["unchanged"] is False
+    assert result["email_queued"] is True
+    assert (await stored_review())["review_text_hash"] == Review.hash_review_text(
+        "Late and broken parcel"
+    )
+
+
+@pytest.mark.asyncio
+async def test_review_with_a_failed_analysis_is_analyzed_again(mongo_db, monkeypatch):
+    analysis = {**make_analysis(False), "error": "Sentiment analysis error: timeout"}
+    monkeypatch.setattr(
+        review_service, "analyze_review", AsyncMock(return_value=analysis)
+    )
+    await review_service.create_and_process_review(
+        "Ada", "ada@example.com", "Late parcel"
+    )
+
+    result = await save_review(monkeypatch, "Late parcel", email_queued=False)
+
+    review_service.analyze_review.assert_awaited_once()
+    assert result["unchanged"] is False
+
+
+async def add_stored_review(customer_email):
+    result = await Review.get_motor_collection().insert_one(
+        {"customer_email": customer_email, "customer_name": "A"}
+    )
+    return result.inserted_id
+
+
+def rename(customer_name):
+    return {"$set": {"customer_name": customer_name}}
+
+
+def mock_bulk_write(monkeypatch, **kwargs):
+    bulk_write = AsyncMock(**kwargs)
+    monkeypatch.setattr(type(Review.get_motor_collection()), "bulk_write", bulk_write)
+    return bulk_write
+
+
+@pytest.mark.asyncio
+async def test_flush_resolves_inserted_updated_and_failed_writes(mongo_db, monkeypatch):
+    mock_bulk_write(
+        monkeypatch,
+        side_effect=BulkWriteError(
+            {
+                "writeErrors": [
+                    {"index": 2, "code": 11000, "errmsg": "E11000 duplicate key"}
+                ],
+                "upserted": [{"index": 1, "_id": ObjectId()}],
+            }
+        ),
+    )
+    buffer = review_service.ReviewWriteBuffer(
+        max_batch_size=10, flush_interval_seconds=0
+    )
+
+    updated = await buffer.add("ada@example.com", rename("Ada"))
+    inserted = await buffer.add("cy@example.com", rename("Cy"))
+    failed = await buffer.add("bob@example.com", rename("Bob"))
+    await buffer.flush()
+
+    assert updated.result() == buffer.UPDATED
+    assert inserted.result() == buffer.INSERTED
+    assert failed.result() == buffer.FAILED
+    assert buffer.written == 2
+    assert buffer.errors == [
+        "Failed to save review for bob@example.com: E11000 duplicate key"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_flush_takes_inserts_from_the_bulk_write_result(mongo_db):
+    await add_stored_review("ada@example.com")
+    buffer = review_service.ReviewWriteBuffer(
+        max_batch_size=10, flush_interval_seconds=0
+    )
+
+    inserted = await buffer.add("cy@example.com", rename("Cy"))
+    updated = await buffer.add("ada@example.com", rename("Ada"))
+    await buffer.flush()
+
+    assert inserted.result() == buffer.INSERTED
+    assert updated.result() == buffer.UPDATED
+    assert buffer.written == 2
+    assert (await stored_review("cy@example.com"))["customer_name"] == "Cy"
+
+
+@pytest.mark.asyncio
+async def test_flush_fails_every_write_when_the_batch_fails(mongo_db, monkeypatch):
+    mock_bulk_write(monkeypatch, side_effect=ConnectionError("no primary"))
+    buffer = review_service.ReviewWriteBuffer(
+        max_batch_size=10, flush_interval_seconds=0
+    )
+
+    outcomes = [
+        await buffer.add(email, rename("A"))
+        for email in ("ada@example.com", "bob@example.com")
+    ]
+    await buffer.flush()
+
+    assert [outcome.result() for outcome in outcomes] == [buffer.FAILED, buffer.FAILED]
+    assert buffer.written == 0
+    assert len(buffer.errors) == 2
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_on_add(mongo_db):
+    buffer = review_service.ReviewWriteBuffer(
+        max_batch_size=2, flush_interval_seconds=0
+    )
+
+    first = await buffer.add("ada@example.com", rename("Ada"))
+    assert not first.done()
+    await buffer.add("bob@example.com", rename("Bob"))
+
+    assert first.result() == buffer.INSERTED
+    assert buffer.flushes == 1
+
+
+@pytest.mark.asyncio
+async def test_close_writes_what_is_still_pending(mongo_db):
+    buffer = review_service.ReviewWriteBuffer(
+        max_batch_size=10, flush_interval_seconds=60
+    )
+    buffer.start()
+
+    outcome = await buffer.add("ada@example.com", rename("Ada"))
+    await buffer.close()
+
+    assert outcome.result() == buffer.INSERTED
+    assert buffer not in review_service._active_write_buffers
+
+
+def make_result(is_update, review_id):
+    return {
+        "review_id": str(review_id),
+        "customer_email": "ada@example.com",
+        "is_update": is_update,
+        "message": review_service.review_saved_message(is_update),
+    }
+
+
+def resolved(outcome):
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(outcome)
+    return future
+
+
+@pytest.mark.asyncio
+async def test_write_outcome_turns_a_predicted_update_into_a_create(mongo_db):
+    new_review_id = PydanticObjectId()
+    result = make_result(True, PydanticObjectId())
+
+    await review_service.apply_write_outcome(
+        result, resolved(review_service.ReviewWriteBuffer.INSERTED), new_review_id
+    )
+
+    assert result["is_update"] is False
+    assert result["review_id"] == str(new_review_id)
+    assert result["message"] == review_service.review_saved_message(False)
+
+
+@pytest.mark.asyncio
+async def test_write_outcome_turns_a_predicted_create_into_an_update(
+    mongo_db,
+):
+    stored_id = await add_stored_review("ada@example.com")
+    new_review_id = PydanticObjectId()
+    result = make_result(False, new_review_id)
+
+    await review_service.apply_write_outcome(
+        result, resolved(review_service.ReviewWriteBuffer.UPDATED), new_review_id
+    )
+
+    assert result["is_update"] is True
+    assert result["review_id"] == str(stored_id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "outcome,is_update",
+    [
+        (review_service.ReviewWriteBuffer.UPDATED, True),
+        (review_service.ReviewWriteBuffer.INSERTED, False),
+        (review_service.ReviewWriteBuffer.FAILED, True),
+    ],
+)
+async def test_write_outcome_keeps_a_correct_prediction_or_a_failed_write(
+    mongo_db, outcome, is_update
+):
+    review_id = PydanticObjectId()
+    result = make_result(is_update, review_id)
+    expected = dict(result)
+
+    await review_service.apply_write_outcome(
+        result, resolved(outcome), PydanticObjectId()
+    )
+
+    assert result == expected
+
+
+async def add_analyzed_review(customer_email, review_text):
+    await Review.get_motor_collection().insert_one(
+        {
+            "customer_email": customer_email,
+            "customer_name": "A",
+            "review_text": review_text,
+            "review_text_hash": Review.hash_review_text(review_text),
+            "ai_analysis_data": make_analysis(False),
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_prefetch_loads_the_stored_reviews_of_many_customers_in_one_query(
+    mongo_db, monkeypatch
+):
+    await add_analyzed_review("ada@example.com", "Late parcel")
+    await add_analyzed_review("bob@example.com", "Great")
+    queries = []
+    find = Review.find
+    monkeypatch.setattr(
+        Review,
+        "find",
+        lambda *args, **kwargs: queries.append(args) or find(*args, **kwargs),
+    )
+
+    reviews = await review_service.prefetch_existing_reviews(
+        ["ada@example.com", "ada@example.com", "cy@example.com", "bob@example.com"]
+    )
+
+    assert len(queries) == 1
+    assert sorted(reviews) == ["ada@example.com", "bob@example.com"]
+    ada = reviews["ada@example.com"]
+    assert isinstance(ada, ExistingReview)
+    assert ada.review_text_hash == Review.hash_review_text("Late parcel")
+    # The projection leaves out the review text
+    assert not hasattr(ada, "review_text")
+
+
+@pytest.mark.asyncio
+async def test_prefetch_of_no_emails_makes_no_query(mongo_db, monkeypatch):
+    monkeypatch.setattr(Review, "find", lambda *args, **kwargs: pytest.fail("queried"))
+
+    assert await review_service.prefetch_existing_reviews([]) == {}
+
+
+@pytest.mark.asyncio
+async def test_prefetched_rows_skip_the_per_row_lookup(mongo_db, monkeypatch):
+    await add_analyzed_review("ada@example.com", "Late parcel")
+    prefetched = await review_service.prefetch_existing_reviews(
+        ["ada@example.com", "cy@example.com"]
+    )
+    monkeypatch.setattr(
+        Review,
+        "find_one",
+        lambda *args, **kwargs: pytest.fail("looked up a prefetched row"),
+    )
+    monkeypatch.setattr(
+        review_service, "analyze_review", AsyncMock(return_value=make_analysis(False))
+    )
+
+    unchanged = await review_service.create_and_process_review(
+        "A",
+        "ada@example.com",
+        "Late parcel",
+        existing_review=prefetched.get("ada@example.com"),
+        prefetched=True,
+    )
+    created = await review_service.create_and_process_review(
+        "Cy",
+        "cy@example.com",
+        "Great",
+        existing_review=prefetched.get("cy@example.com"),
+        prefetched=True,
+    )
+
+    assert unchanged["unchanged"] is True
+    assert created["is_update"] is False
+    review_service.analyze_review.assert_awaited_once()
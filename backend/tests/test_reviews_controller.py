@@ -0,0 +1,39 @@
+import io
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import UploadFile
+
+from app.controllers import reviews_controller
+from app.models.upload_job import UploadJob, UploadJobStatus
+from app.services import job_service
+
+
+def parse_sse(body):
+    events = []
+    for message in body.strip().split("\n\n"):
+        event, data = message.split("\n")
+        events.append(
+            (event.removeprefix("event: "), json.loads(data.removeprefix("data: ")))
+        )
+    return events
+
+
+@pytest.mark.asyncio
+async def test_stream_upload_follows_the_job_it_creates(mongo_db, monkeypatch):
+    monkeypatch.setattr(job_service, "process_review_rows", AsyncMock())
+    monkeypatch.setattr(job_service, "JOB_EVENTS_POLL_SECONDS", 0.01)
+    data = b"name,email,review\nAda,ada@example.com,Great\n"
+    file = UploadFile(io.BytesIO(data), size=len(data), filename="reviews.csv")
+
+    response = await reviews_controller.stream_excel_reviews(file)
+    events = parse_sse("".join([chunk async for chunk in response.body_iterator]))
+
+    assert events[0][0] == "job"
+    job = await UploadJob.get(events[0][1]["job_id"])
+    assert job.status == UploadJobStatus.COMPLETED
+    assert events[-1] == (
+        "complete",
+        json.loads(json.dumps(job_service.upload_job_summary(job), default=str)),
+    )
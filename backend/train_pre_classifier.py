@@ -0,0 +1,100 @@
+"""Train the local pre-classifier from reviews already analysed by the LLM.
+
+Loads every stored review with a clean ai_analysis_data, fits the naive Bayes
+"positive vs other" model, reports precision and coverage of the fast path at
+the configured threshold on a held-out split, and writes the model as JSON.
+Point PRE_CLASSIFIER_MODEL_PATH at the output file to use it.
+
+Usage:
+    python train_pre_classifier.py [output_path]
+"""
+import asyncio
+import json
+import random
+import sys
+
+from app.agents.pre_classifier import (
+    MAX_FAST_PATH_WORDS,
+    NaiveBayesSentimentModel,
+    tokenize,
+)
+from app.core.config import settings
+from app.database import close_mongo_connection, connect_to_mongo, init_database
+from app.models.review import Review
+
+
+async def load_examples():
+    """Review texts and positive labels from stored LLM analyses"""
+    if not await connect_to_mongo() or not await init_database():
+        raise SystemExit("❌ Could not connect to MongoDB")
+    try:
+        reviews = await Review.find(
+            Review.ai_analysis_data != None
+        ).to_list()  # noqa: E711
+    finally:
+        await close_mongo_connection()
+
+    examples = []
+    for review in reviews:
+        analysis = review.ai_analysis_data or {}
+        # Skip failed analyses and results produced by the pre-classifier itself
+        if (
+            review.ai_processing_error
+            or analysis.get("pre_classified")
+            or not analysis.get("sentiment")
+        ):
+            continue
+        examples.append((review.review_text, analysis["sentiment"] == "positive"))
+    return examples
+
+
+def evaluate(model: NaiveBayesSentimentModel, examples, threshold: float) -> None:
+    """Print precision and coverage of confident fast-path predictions"""
+    eligible = [
+        (text, label)
+        for text, label in examples
+        if 0 < len(tokenize(text)) <= MAX_FAST_PATH_WORDS
+    ]
+    confident = [
+        label
+        for text, label in eligible
+        if model.predict_proba(tokenize(text)) >= threshold
+    ]
+    precision = sum(confident) / len(confident) if confident else 0.0
+    coverage = len(confident) / len(examples) if examples else 0.0
+    print(f"Held-out reviews: {len(examples)}")
+    print(
+        f"Fast path at threshold {threshold}: {len(confident)} reviews "
+        f"({coverage:.1%} coverage), precision {precision:.1%}"
+    )
+
+
+def main() -> None:
+    output_path = sys.argv[1] if len(sys.argv) > 1 else "pre_classifier_model.json"
+
+    examples = asyncio.run(load_examples())
+    if len(examples) < 20:
+        raise SystemExit(
+            f"❌ Only {len(examples)} analysed reviews found, need at least 20 to train"
+        )
+
+    random.Random(42).shuffle(examples)
+    split = int(len(examples) * 0.8)
+    train, held_out = examples[:split], examples[split:]
+
+    model = NaiveBayesSentimentModel.fit(
+        [text for text, _ in train], [label for _, label in train]
+    )
+    evaluate(model, held_out, settings.pre_classifier_threshold)
+
+    # Refit on everything for the shipped model
+    model = NaiveBayesSentimentModel.fit(
+        [text for text, _ in examples], [label for _, label in examples]
+    )
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(model.to_dict(), f)
+    print(f"✅ Pre-classifier model saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import json
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from types import SimpleNamespace
 from dotenv import load_dotenv
 
@@ -71,6 +72,12 @@ st.markdown("""
 
 API_BASE_URL = os.environ.get("BACKEND_URL", "http://localhost:8000")
 UPLOAD_ENDPOINT = f"{API_BASE_URL}/api/v1/reviews/upload-excel"
+UPLOAD_JOBS_ENDPOINT = f"{API_BASE_URL}/api/v1/reviews/upload-jobs"
+STREAM_READ_TIMEOUT_SECONDS = 300
+STREAM_TABLE_VISIBLE_ROWS = 50
+JOB_POLL_INTERVAL_SECONDS = 2
+JOB_WAIT_TIMEOUT_SECONDS = 4 * 60 * 60
+JOB_RESULTS_PAGE_SIZE = 500
 
 def main():
     # Header
@@ -90,8 +97,14 @@ def main():
         - Excel (.xlsx, .xls)
         - CSV (.csv)
         
-        **Max file size:** 10MB
+        **Max file size:** 40MB for .xlsx and CSV, 10MB for .xls
         """)
+        st.checkbox(
+            "📡 Show results live while processing",
+            value=True,
+            key="stream_results",
+            help="Stream each review as soon as it is analyzed. Turn off to only follow the job's progress."
+        )
         st.markdown("---")
         st.markdown("## ℹ️ About AI Review Analysis System")
     
@@ -202,7 +215,7 @@ def upload_page():
             process_file(uploaded_file)
 
 def process_file(uploaded_file):
-    """Process the uploaded file with the API"""
+    """Process the uploaded file as a background job, streaming its results or polling its progress"""
     
     progress_bar = st.progress(0)
     status_text = st.empty()
@@ -211,25 +224,40 @@ def process_file(uploaded_file):
         files = {"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
         
         status_text.text("🔄 Uploading file to AI analysis system...")
-        progress_bar.progress(25)
         
-        response = requests.post(UPLOAD_ENDPOINT, files=files, timeout=300)
+        # Processing runs in a job on the server, so it is not bound to this request or stream
+        response = requests.post(UPLOAD_JOBS_ENDPOINT, files=files, timeout=60)
         
-        progress_bar.progress(75)
-        status_text.text("🧠 AI is analyzing reviews...")
+        if response.status_code != 202:
+            st.error(f"❌ Error processing file: {response.status_code}")
+            return
         
-        if response.status_code == 200:
+        if st.session_state.get("stream_results", True):
+            results = stream_job_results(response.json()["job_id"], progress_bar, status_text)
+            if results is None:
+                return
+            
             progress_bar.progress(100)
             status_text.text("✅ Analysis complete!")
             
-            result = response.json()
-            display_results(result)
-            
-        else:
-            st.error(f"❌ Error processing file: {response.status_code}")
+            display_results({"results": results})
+            return
+        
+        job = wait_for_job(response.json()["job_id"], progress_bar, status_text)
+        if job is None:
+            return
+        
+        if job["status"] == "failed":
+            st.error(f"❌ Error processing file: {job.get('failure_reason') or 'unknown error'}")
+            return
+        
+        progress_bar.progress(100)
+        status_text.text("✅ Analysis complete!")
+        
+        display_results({"results": fetch_job_results(job)})
                 
     except requests.exceptions.Timeout:
-        st.error("⏱️ Request timed out. Please try again with a smaller file.")
+        st.error("⏱️ Request timed out. Please try again.")
     except requests.exceptions.ConnectionError:
         st.error("🔌 Cannot connect to the AI service. Please ensure the backend is running.")
     except Exception as e:
@@ -238,6 +266,161 @@ def process_file(uploaded_file):
         progress_bar.empty()
         status_text.empty()
 
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a Server-Sent Events response"""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            field, _, value = line.partition(":")
+            if field == "event":
+                event = value.strip()
+            elif field == "data":
+                data_lines.append(value.lstrip())
+            continue
+        if data_lines:
+            yield event, json.loads("\n".join(data_lines))
+        event, data_lines = "message", []
+
+def stream_job_results(job_id: str, progress_bar, status_text) -> Optional[Dict[str, Any]]:
+    """Follow a job's event stream, rendering rows and totals as they arrive and reconnecting
+    with the last cursor when the server ends the stream before the job is done"""
+    live_metrics = st.empty()
+    live_table = st.empty()
+    reviews_created = []
+    errors = []
+    duplicates = []
+    cursor = None
+    deadline = time.monotonic() + JOB_WAIT_TIMEOUT_SECONDS
+    
+    while time.monotonic() < deadline:
+        try:
+            with requests.get(
+                f"{UPLOAD_JOBS_ENDPOINT}/{job_id}/events",
+                params={"cursor": cursor} if cursor else None,
+                stream=True,
+                timeout=(60, STREAM_READ_TIMEOUT_SECONDS)
+            ) as response:
+                if response.status_code != 200:
+                    st.error(f"❌ Error processing file: {response.status_code}")
+                    return None
+            
+                for event, data in iter_sse_events(response):
+                    if event == "error":
+                        st.error(f"❌ Error processing file: {data['detail']}")
+                        return None
+                
+                    if event == "row":
+                        cursor = data["cursor"]
+                        if data["error"]:
+                            errors.append(data["error"])
+                        elif data["duplicate"]:
+                            duplicates.append(data["duplicate"])
+                        elif data["review"]:
+                            reviews_created.append(data["review"])
+                        continue
+                
+                    if event == "complete":
+                        live_metrics.empty()
+                        live_table.empty()
+                        if data["status"] == "failed":
+                            st.error(f"❌ Error processing file: {data.get('failure_reason') or 'unknown error'}")
+                            return None
+                        return {
+                            "total_rows": data["total_rows"],
+                            "processed": data["processed"],
+                            "errors": errors + data["save_errors"],
+                            "duplicates": duplicates,
+                            "reviews_created": reviews_created,
+                            "unchanged": data["unchanged"],
+                            "emails_queued": data["emails_queued"],
+                            "sentiment_summary": data["sentiment_summary"],
+                        }
+                
+                    if event != "progress":
+                        continue
+                
+                    total_rows = max(data["total_rows"], 1)
+                    progress_bar.progress(min(data["rows_completed"] / total_rows, 1.0))
+                    status_text.text(f"🧠 AI is analyzing reviews... {data['rows_completed']}/{data['total_rows']} rows")
+                
+                    sentiment = data["sentiment_summary"]
+                    live_metrics.markdown(
+                        f"**✅ Processed:** {data['processed']} &nbsp; **❌ Errors:** {data['error_count']} &nbsp; "
+                        f"**📧 Emails queued:** {data['emails_queued']} &nbsp; "
+                        f"**😊 {sentiment['positive']} / 😐 {sentiment['neutral']} / 😞 {sentiment['negative']}**"
+                    )
+                    live_table.dataframe(pd.DataFrame([
+                        {
+                            "Customer": review["customer_name"],
+                            "Sentiment": review["analysis"]["sentiment"],
+                            "Urgency": review["analysis"]["urgency_level"],
+                            "Email Queued": review["email_queued"],
+                        }
+                        for review in reviews_created[-STREAM_TABLE_VISIBLE_ROWS:]
+                    ]), use_container_width=True)
+        except requests.exceptions.ChunkedEncodingError:
+            # Connection dropped mid-stream; the job is unaffected
+            pass
+        # The stream ended without "complete" (server limit or dropped connection): resume from the cursor
+    
+    st.warning(f"⏳ The job is still running after {JOB_WAIT_TIMEOUT_SECONDS // 3600} hours. Job ID: {job_id}")
+    return None
+
+def wait_for_job(job_id: str, progress_bar, status_text) -> Optional[Dict[str, Any]]:
+    """Poll an upload job until it finishes, updating the progress bar; None if it is still running at the deadline"""
+    deadline = time.monotonic() + JOB_WAIT_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        response = requests.get(f"{UPLOAD_JOBS_ENDPOINT}/{job_id}", timeout=30)
+        response.raise_for_status()
+        job = response.json()
+        
+        total_rows = max(job["total_rows"], 1)
+        progress_bar.progress(min(job["rows_completed"] / total_rows, 1.0))
+        status_text.text(f"🧠 AI is analyzing reviews... {job['rows_completed']}/{job['total_rows']} rows")
+        
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(JOB_POLL_INTERVAL_SECONDS)
+    
+    st.warning(f"⏳ The job is still running after {JOB_WAIT_TIMEOUT_SECONDS // 3600} hours. Job ID: {job_id}")
+    return None
+
+def fetch_job_results(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Collect all result pages of a finished job into the upload results format"""
+    reviews_created = []
+    errors = []
+    duplicates = []
+    page = 1
+    while True:
+        response = requests.get(
+            f"{UPLOAD_JOBS_ENDPOINT}/{job['job_id']}/results",
+            params={"page": page, "page_size": JOB_RESULTS_PAGE_SIZE},
+            timeout=60
+        )
+        response.raise_for_status()
+        data = response.json()
+        for row in data["results"]:
+            if row["error"]:
+                errors.append(row["error"])
+            elif row["duplicate"]:
+                duplicates.append(row["duplicate"])
+            else:
+                reviews_created.append(row["review"])
+        if page * JOB_RESULTS_PAGE_SIZE >= data["total"]:
+            break
+        page += 1
+    
+    return {
+        "total_rows": job["total_rows"],
+        "processed": job["processed"],
+        "errors": errors + job["save_errors"],
+        "duplicates": duplicates,
+        "reviews_created": reviews_created,
+        "unchanged": job["unchanged"],
+        "emails_queued": job["emails_queued"],
+        "sentiment_summary": job["sentiment_summary"],
+    }
+
 def display_results(result: Dict[str, Any]):
     """Display the processing results with beautiful visualizations"""
     
@@ -283,11 +466,11 @@ def display_results(result: Dict[str, Any]):
         """, unsafe_allow_html=True)
         
     with col5:
-        emails_sent = results_data.get('emails_sent', 0)
+        emails_queued = results_data.get('emails_queued', 0)
         st.markdown(f"""
         <div class="metric-card">
-            <h3>📧 Emails Sent</h3>
-            <h2>{emails_sent}</h2>
+            <h3>📧 Emails Queued</h3>
+            <h2>{emails_queued}</h2>
         </div>
         """, unsafe_allow_html=True)
     
@@ -363,6 +546,12 @@ def display_results(result: Dict[str, Any]):
         with st.expander(f"View {len(results_data['errors'])} errors"):
             for error in results_data['errors']:
                 st.error(error)
+    
+    if results_data.get('duplicates'):
+        st.markdown("### 🔁 Duplicate Rows")
+        with st.expander(f"View {len(results_data['duplicates'])} rows collapsed by customer email"):
+            for duplicate in results_data['duplicates']:
+                st.info(duplicate)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file